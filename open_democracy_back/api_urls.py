@@ -46,7 +46,9 @@ from .views.assessment_views import (
     CompletedQuestionsInitializationView,
     ExpertView,
     ZipCodeSurveysView,
+    LocalityAutocompleteView,
     AssessmentScoreView,
+    AssessmentChartDataView,
     get_chart_data,
     AssessmentDocumentView,
 )
@@ -140,6 +142,12 @@ urlpatterns = [
     path(
         "surveys/by-zip-code/<str:zip_code>/",
         ZipCodeSurveysView.as_view({"get": "list"}),
+        name="zip-code-surveys",
+    ),
+    path(
+        "localities/autocomplete/",
+        LocalityAutocompleteView.as_view(),
+        name="localities-autocomplete",
     ),
     path(
         "assessments/by-locality/",
@@ -180,6 +188,10 @@ urlpatterns = [
         "assessments/<int:assessment_id>/questions/<int:question_id>/chart-data/",
         get_chart_data,
     ),
+    path(
+        "assessments/<int:assessment_id>/chart-data/",
+        AssessmentChartDataView.as_view(),
+    ),
     path(
         "assessments/<int:assessment_id>/add-expert/",
         AssessmentAddExpertView.as_view(),
@@ -0,0 +1,83 @@
+"""
+Role of the user of a request on assessments.
+
+Permissions, views and serializers all need the role of the current user on an
+assessment, it is resolved once per request and memoized on the request. The roles
+of a list of assessments are preloaded with a single query.
+"""
+from typing import Dict, Iterable
+
+from django.db.models import Case, CharField, Exists, OuterRef, Value, When
+
+from open_democracy_back.models import Assessment, Participation
+
+ROLES_ATTRIBUTE = "assessment_roles"
+
+DETAILS_ACCESS_ROLES = ["expert", "initiator"]
+
+
+def get_role_annotation(user):
+    return Case(
+        When(initiated_by_user_id=user.pk, then=Value("initiator")),
+        When(
+            Exists(
+                Assessment.experts.through.objects.filter(
+                    assessment_id=OuterRef("pk"), user_id=user.pk
+                )
+            ),
+            then=Value("expert"),
+        ),
+        When(
+            Exists(
+                Participation.objects.filter(
+                    assessment_id=OuterRef("pk"), user_id=user.pk
+                )
+            ),
+            then=Value("participant"),
+        ),
+        default=Value(""),
+        output_field=CharField(),
+    )
+
+
+def get_roles_of_request(request) -> Dict[int, str]:
+    # rest framework requests wrap the django request, which is shared by all
+    # the rest framework requests of a view
+    request = getattr(request, "_request", request)
+    if not hasattr(request, ROLES_ATTRIBUTE):
+        setattr(request, ROLES_ATTRIBUTE, {})
+    return getattr(request, ROLES_ATTRIBUTE)
+
+
+def preload_assessment_roles(request, assessments: Iterable[Assessment]):
+    """Resolve with a single query the roles not resolved yet of assessments"""
+    if request.user.is_anonymous:
+        return
+    roles = get_roles_of_request(request)
+    assessment_ids = {
+        assessment.pk for assessment in assessments if assessment.pk not in roles
+    }
+    if assessment_ids:
+        roles.update(
+            Assessment.objects.filter(pk__in=assessment_ids)
+            .annotate(role=get_role_annotation(request.user))
+            .values_list("pk", "role")
+        )
+
+
+def get_assessment_role(request, assessment: Assessment):
+    if request.user.is_anonymous:
+        return {"role": None}
+    roles = get_roles_of_request(request)
+    if assessment.pk not in roles:
+        preload_assessment_roles(request, [assessment])
+    return roles[assessment.pk]
+
+
+def forget_assessment_role(request, assessment: Assessment):
+    """To be called when the role of the user on an assessment may have changed"""
+    get_roles_of_request(request).pop(assessment.pk, None)
+
+
+def has_details_access(assessment_role):
+    return assessment_role in DETAILS_ACCESS_ROLES
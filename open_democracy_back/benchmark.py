@@ -0,0 +1,345 @@
+"""
+Synthetic load benchmark of the scoring, the chart data and the representativity.
+
+An assessment with questions of every type is generated with the factories, its
+responses being built by batches and bulk inserted, then every measured function
+is run several times to get its median wall time and its number of queries, and
+once more under tracemalloc to get its peak of memory. The compiled scoring plans
+are cleared before each run, so that every run is a cold one.
+"""
+import math
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from typing import Callable, Dict, List
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from my_auth.models import User
+from open_democracy_back.chart_data import (
+    CHART_DATA_FN_BY_QUESTION_TYPE,
+    get_chart_data_of_assessment,
+)
+from open_democracy_back.factories import (
+    ALL_FACTORY_QUESTION_CLASSES,
+    AssessmentFactory,
+    AssessmentResponseFactory,
+    ClosedWithScaleCategoryResponseFactory,
+    CriteriaFactory,
+    MarkerFactory,
+    ParticipationFactory,
+    ParticipationResponseFactory,
+    PillarFactory,
+    RoleFactory,
+    SurveyFactory,
+    UniqueChoiceQuestionFactory,
+)
+from open_democracy_back.models import (
+    AssessmentRepresentativity,
+    ClosedWithScaleCategoryResponse,
+    Participation,
+    ParticipationResponse,
+    RepresentativityCriteria,
+    RepresentativityCriteriaRule,
+)
+from open_democracy_back.representativity_counts import (
+    rebuild_representativity_counts,
+)
+from open_democracy_back.score_aggregates import rebuild_score_aggregates
+from open_democracy_back.scoring import SCORES_FN_BY_ENGINE
+from open_democracy_back.scoring_plan import get_compiled_scoring_plan
+from open_democracy_back.utils import QuestionObjectivity, QuestionType
+
+PILLAR_COUNT = 2
+MARKERS_BY_PILLAR = 2
+CRITERIAS_BY_MARKER = 2
+SUBJECTIVE_QUESTIONS_BY_TYPE = 4
+ROLE_COUNT = 3
+PARTICIPATIONS_BY_BATCH = 500
+REPETITIONS = 5
+
+MultipleChoiceThrough = ParticipationResponse.multiple_choice_response.through
+
+
+def get_boolean_response(question) -> Dict:
+    return {"boolean_response": random.random() < 0.6}
+
+
+def get_unique_choice_response(question) -> Dict:
+    return {"unique_choice_response": random.choice(question.benchmark_choices)}
+
+
+def get_percentage_response(question) -> Dict:
+    return {"percentage_response": random.randint(0, 100)}
+
+
+def get_number_response(question) -> Dict:
+    return {"number_response": random.uniform(0, 100)}
+
+
+def get_no_response(question) -> Dict:
+    # choices of multiple choice and closed with scale questions are added once
+    # the responses are inserted
+    return {}
+
+
+RESPONSE_FN_BY_QUESTION_TYPE: Dict[str, Callable] = {
+    QuestionType.BOOLEAN.value: get_boolean_response,
+    QuestionType.UNIQUE_CHOICE.value: get_unique_choice_response,
+    QuestionType.MULTIPLE_CHOICE.value: get_no_response,
+    QuestionType.PERCENTAGE.value: get_percentage_response,
+    QuestionType.NUMBER.value: get_number_response,
+    QuestionType.CLOSED_WITH_SCALE.value: get_no_response,
+}
+
+
+def create_questions(survey, roles) -> List:
+    criterias = [
+        CriteriaFactory(marker=marker)
+        for pillar in PillarFactory.create_batch(PILLAR_COUNT, survey=survey)
+        for marker in MarkerFactory.create_batch(MARKERS_BY_PILLAR, pillar=pillar)
+        for _ in range(CRITERIAS_BY_MARKER)
+    ]
+    questions = []
+    for factory_class in ALL_FACTORY_QUESTION_CLASSES:
+        for index in range(SUBJECTIVE_QUESTIONS_BY_TYPE + 1):
+            question = factory_class(
+                criteria=random.choice(criterias),
+                # one objective question by type
+                objectivity=QuestionObjectivity.OBJECTIVE
+                if index == SUBJECTIVE_QUESTIONS_BY_TYPE
+                else QuestionObjectivity.SUBJECTIVE,
+            )
+            question.roles.set(roles)
+            question.benchmark_choices = list(question.response_choices.all())
+            question.benchmark_categories = list(question.categories.all())
+            questions.append(question)
+    return questions
+
+
+def create_representativity(assessment):
+    profiling_question = UniqueChoiceQuestionFactory(
+        profiling_question=True, criteria=None
+    )
+    profiling_question.benchmark_choices = list(
+        profiling_question.response_choices.all()
+    )
+    representativity_criteria = RepresentativityCriteria.objects.create(
+        survey_locality=assessment.survey.survey_locality,
+        name="Benchmark",
+        profiling_question_id=profiling_question.pk,
+        min_rate=10,
+    )
+    RepresentativityCriteriaRule.objects.create(
+        representativity_criteria=representativity_criteria,
+        response_choice=profiling_question.benchmark_choices[0],
+        ignore_for_acceptability_threshold=True,
+    )
+    return profiling_question
+
+
+def create_participation_responses(participations, questions):
+    responses = []
+    for participation in participations:
+        for question in questions:
+            responses.append(
+                ParticipationResponseFactory.build(
+                    participation=participation,
+                    question=question,
+                    **RESPONSE_FN_BY_QUESTION_TYPE[question.type](question),
+                )
+            )
+    ParticipationResponse.objects.bulk_create(responses)
+
+    multiple_choice_rows = []
+    closed_with_scale_responses = []
+    for response in responses:
+        question = response.question
+        if question.type == QuestionType.MULTIPLE_CHOICE:
+            for response_choice in random.sample(
+                question.benchmark_choices, random.randint(1, 2)
+            ):
+                multiple_choice_rows.append(
+                    MultipleChoiceThrough(
+                        participationresponse_id=response.pk,
+                        responsechoice_id=response_choice.pk,
+                    )
+                )
+        elif question.type == QuestionType.CLOSED_WITH_SCALE:
+            for category in question.benchmark_categories:
+                closed_with_scale_responses.append(
+                    ClosedWithScaleCategoryResponseFactory.build(
+                        participation_response=response,
+                        category=category,
+                        response_choice=random.choice(question.benchmark_choices),
+                    )
+                )
+    MultipleChoiceThrough.objects.bulk_create(multiple_choice_rows)
+    ClosedWithScaleCategoryResponse.objects.bulk_create(closed_with_scale_responses)
+
+
+def generate_assessment(response_count: int):
+    """
+    Assessment with about `response_count` subjective responses, each participation
+    responding to every subjective question and to the representativity profiling
+    question.
+    """
+    survey = SurveyFactory()
+    roles = RoleFactory.create_batch(ROLE_COUNT)
+    questions = create_questions(survey, roles)
+    assessment = AssessmentFactory(survey=survey)
+    profiling_question = create_representativity(assessment)
+
+    subjective_questions = [
+        question
+        for question in questions
+        if question.objectivity == QuestionObjectivity.SUBJECTIVE
+    ]
+    for question in questions:
+        if question.objectivity == QuestionObjectivity.OBJECTIVE:
+            response = AssessmentResponseFactory(
+                assessment=assessment,
+                question=question,
+                answered_by=assessment.initiated_by_user,
+                **RESPONSE_FN_BY_QUESTION_TYPE[question.type](question),
+            )
+            if question.type == QuestionType.MULTIPLE_CHOICE:
+                response.multiple_choice_response.set(question.benchmark_choices[:2])
+            elif question.type == QuestionType.CLOSED_WITH_SCALE:
+                for category in question.benchmark_categories:
+                    ClosedWithScaleCategoryResponseFactory(
+                        assessment_response=response,
+                        category=category,
+                        response_choice=random.choice(question.benchmark_choices),
+                    )
+
+    participation_count = math.ceil(response_count / len(subjective_questions))
+    run_id = uuid.uuid4().hex
+    for start in range(0, participation_count, PARTICIPATIONS_BY_BATCH):
+        stop = min(start + PARTICIPATIONS_BY_BATCH, participation_count)
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"benchmark-{run_id}-{index}",
+                    email=f"benchmark-{run_id}-{index}@example.com",
+                )
+                for index in range(start, stop)
+            ]
+        )
+        participations = Participation.objects.bulk_create(
+            [
+                ParticipationFactory.build(
+                    user=user,
+                    assessment=assessment,
+                    role=random.choice(roles),
+                    is_profiling_questions_completed=True,
+                )
+                for user in users
+            ]
+        )
+        create_participation_responses(
+            participations, subjective_questions + [profiling_question]
+        )
+
+    # bulk inserts do not send the signals maintaining the aggregates and counts
+    rebuild_score_aggregates(assessment_ids=[assessment.pk])
+    rebuild_representativity_counts(assessment_ids=[assessment.pk])
+    return assessment, subjective_questions
+
+
+def measure(function: Callable, repetitions: int = REPETITIONS) -> Dict[str, float]:
+    durations = []
+    for _ in range(repetitions):
+        get_compiled_scoring_plan.cache_clear()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            function()
+            durations.append(time.perf_counter() - start)
+
+    # tracemalloc slows the run down, it is not timed
+    get_compiled_scoring_plan.cache_clear()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "time": statistics.median(durations),
+        "queries": len(context.captured_queries),
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def get_measured_functions(assessment, questions) -> Dict[str, Callable]:
+    functions: Dict[str, Callable] = {
+        f"scores:{engine}": (lambda scores_fn=scores_fn: scores_fn(assessment.pk))
+        for engine, scores_fn in SCORES_FN_BY_ENGINE.items()
+    }
+    question_by_type = {}
+    for question in questions:
+        question_by_type.setdefault(question.type, question)
+    for question_type, chart_data_fn in CHART_DATA_FN_BY_QUESTION_TYPE.items():
+        question = question_by_type[question_type]
+        functions[
+            f"chart_data:{question_type}"
+        ] = lambda chart_data_fn=chart_data_fn, question=question: chart_data_fn(
+            question, assessment.pk
+        )
+    functions["chart_data:all"] = lambda: get_chart_data_of_assessment(assessment.pk)
+    functions["representativity:respected"] = lambda: [
+        representativity.respected
+        for representativity in AssessmentRepresentativity.objects.filter(
+            assessment=assessment
+        )
+    ]
+    return functions
+
+
+def run_benchmark(response_count: int, repetitions: int = REPETITIONS) -> Dict:
+    start = time.perf_counter()
+    assessment, questions = generate_assessment(response_count)
+    generation_time = time.perf_counter() - start
+    return {
+        "responses": ParticipationResponse.objects.filter(
+            participation__assessment=assessment
+        ).count(),
+        "generation_time": generation_time,
+        "measures": {
+            name: measure(function, repetitions)
+            for name, function in get_measured_functions(assessment, questions).items()
+        },
+    }
+
+
+def get_regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Measures whose median time is slower than the baseline by more than `tolerance`
+    (and by more than 10ms, to ignore the noise of fast functions), or running more
+    queries.
+    """
+    regressions = []
+    for scale, scale_results in results["scales"].items():
+        baseline_measures = baseline["scales"].get(scale, {}).get("measures", {})
+        for name, measures in scale_results["measures"].items():
+            baseline_measures_of_name = baseline_measures.get(name)
+            if not baseline_measures_of_name:
+                continue
+            baseline_time = baseline_measures_of_name["time"]
+            if (
+                measures["time"] > baseline_time * (1 + tolerance)
+                and measures["time"] - baseline_time > 0.01
+            ):
+                regressions.append(
+                    f"{scale} responses, {name}: {measures['time']:.3f}s "
+                    f"instead of {baseline_time:.3f}s"
+                )
+            if measures["queries"] > baseline_measures_of_name["queries"]:
+                regressions.append(
+                    f"{scale} responses, {name}: {measures['queries']} queries "
+                    f"instead of {baseline_measures_of_name['queries']}"
+                )
+    return regressions
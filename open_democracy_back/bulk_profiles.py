@@ -0,0 +1,134 @@
+"""
+Profiles of many participations at once.
+
+When the rules of a profile type change, the profiles already given to the
+participants are recomputed: participations are streamed in chunks ordered by
+id, the rules are evaluated in memory on the responses of a whole chunk, and
+only the differences are written to the profiles of the participations, with one
+insert and one delete by chunk. Chunks can be spread across a process pool, as
+the scores of the assessments are.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from django.db import connections, transaction
+from django.db.models import QuerySet
+
+from open_democracy_back.bulk_scoring import init_worker
+from open_democracy_back.data_versions import bump_assessment_data_versions
+from open_democracy_back.models import Participation
+from open_democracy_back.profile_rules import (
+    get_profile_rules,
+    get_profiling_responses_by_participation_id,
+)
+
+CHUNK_SIZE = 1000
+
+ParticipationProfile = Participation.profiles.through
+
+
+class ProfilesDiff(NamedTuple):
+    participations: int
+    added: int
+    removed: int
+
+
+def get_participations_to_recompute(
+    survey_id: Optional[int] = None, assessment_id: Optional[int] = None
+) -> QuerySet:
+    """Participations whose profiles are given, that is whose profiling is completed"""
+    participations = Participation.objects.filter(is_profiling_questions_completed=True)
+    if survey_id is not None:
+        participations = participations.filter(assessment__survey_id=survey_id)
+    if assessment_id is not None:
+        participations = participations.filter(assessment_id=assessment_id)
+    return participations
+
+
+def iter_participation_id_chunks(
+    participations: QuerySet, chunk_size: int = CHUNK_SIZE
+) -> Iterator[List[int]]:
+    """Ids of the participations by chunks, each one fetched after the last id"""
+    last_id = 0
+    while True:
+        chunk = list(
+            participations.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def recompute_profiles(participation_ids: List[int], dry_run=False) -> ProfilesDiff:
+    """Give to the participations the profiles of the current rules, and only them"""
+    profile_rules = get_profile_rules()
+    responses_by_participation_id = get_profiling_responses_by_participation_id(
+        participation_ids, profile_rules.question_ids
+    )
+    expected: Set[Tuple[int, int]] = {
+        (participation_id, profile_type_id)
+        for participation_id in participation_ids
+        for profile_type_id in profile_rules.get_profile_type_ids(
+            responses_by_participation_id.get(participation_id, {})
+        )
+    }
+    existing = ParticipationProfile.objects.filter(
+        participation_id__in=participation_ids
+    ).values_list("pk", "participation_id", "profiletype_id")
+    existing_id_by_pair = {
+        (participation_id, profile_type_id): pk
+        for pk, participation_id, profile_type_id in existing
+    }
+    to_add = expected - set(existing_id_by_pair)
+    to_remove = set(existing_id_by_pair) - expected
+
+    if not dry_run and (to_add or to_remove):
+        with transaction.atomic():
+            ParticipationProfile.objects.bulk_create(
+                [
+                    ParticipationProfile(
+                        participation_id=participation_id,
+                        profiletype_id=profile_type_id,
+                    )
+                    for participation_id, profile_type_id in sorted(to_add)
+                ],
+                ignore_conflicts=True,
+            )
+            ParticipationProfile.objects.filter(
+                pk__in=[existing_id_by_pair[pair] for pair in to_remove]
+            ).delete()
+            # bulk writes do not send the m2m_changed signal
+            changed_participation_ids = {pair[0] for pair in to_add | to_remove}
+            bump_assessment_data_versions(
+                Participation.objects.filter(pk__in=changed_participation_ids)
+                .values_list("assessment_id", flat=True)
+                .distinct()
+            )
+    return ProfilesDiff(len(participation_ids), len(to_add), len(to_remove))
+
+
+def iter_recomputed_profiles(
+    participations: QuerySet, chunk_size: int, workers: int, dry_run=False
+) -> Iterator[ProfilesDiff]:
+    """
+    Differences of the profiles of each chunk, in the order the chunks are
+    recomputed. With one worker, they are recomputed in the current process.
+    """
+    chunks = iter_participation_id_chunks(participations, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield recompute_profiles(chunk, dry_run)
+        return
+
+    chunks = list(chunks)
+    # forked workers must not reuse the connections of this process
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [
+            executor.submit(recompute_profiles, chunk, dry_run) for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            yield future.result()
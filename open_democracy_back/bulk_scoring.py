@@ -0,0 +1,132 @@
+"""
+Scores of many assessments at once.
+
+Assessments are partitioned across a process pool, each worker using its own
+database connection, and the scores are streamed as JSON Lines or CSV as soon as
+a partition is computed, with the time taken by each assessment.
+"""
+import csv
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import django
+from django.db import connections
+
+from open_democracy_back.scoring import get_scores_by_assessment_pk
+
+# assessment id, scores, duration in seconds
+AssessmentScores = Tuple[int, Dict[str, Dict[int, float]], float]
+
+# several partitions by worker so that a slow assessment does not hold the others
+PARTITIONS_BY_WORKER = 4
+
+CSV_COLUMNS = [
+    "assessment_id",
+    "question_id",
+    "criteria_id",
+    "marker_id",
+    "pillar_id",
+    "score",
+    "duration",
+]
+
+CSV_COLUMN_BY_SCORES_KEY = {
+    "by_question_id": "question_id",
+    "by_criteria_id": "criteria_id",
+    "by_marker_id": "marker_id",
+    "by_pillar_id": "pillar_id",
+}
+
+
+def init_worker():
+    django.setup()
+    # connections inherited from the parent process must not be shared
+    connections.close_all()
+
+
+def score_assessment(assessment_id: int) -> AssessmentScores:
+    start = time.perf_counter()
+    scores = get_scores_by_assessment_pk(assessment_id)
+    return assessment_id, scores, time.perf_counter() - start
+
+
+def score_assessments(assessment_ids: List[int]) -> List[AssessmentScores]:
+    return [score_assessment(assessment_id) for assessment_id in assessment_ids]
+
+
+def partition(assessment_ids: List[int], count: int) -> List[List[int]]:
+    size = math.ceil(len(assessment_ids) / count)
+    return [
+        assessment_ids[start : start + size]
+        for start in range(0, len(assessment_ids), size)
+    ]
+
+
+def iter_assessments_scores(
+    assessment_ids: Iterable[int], workers: int
+) -> Iterator[AssessmentScores]:
+    """
+    Scores of the assessments, in the order their partition is computed. With one
+    worker, they are computed in the current process.
+    """
+    assessment_ids = list(assessment_ids)
+    if workers <= 1 or len(assessment_ids) <= 1:
+        for assessment_id in assessment_ids:
+            yield score_assessment(assessment_id)
+        return
+
+    # forked workers must not reuse the connections of this process
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [
+            executor.submit(score_assessments, assessment_ids_partition)
+            for assessment_ids_partition in partition(
+                assessment_ids, workers * PARTITIONS_BY_WORKER
+            )
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def iter_jsonl_lines(results: Iterable[AssessmentScores]) -> Iterator[str]:
+    for assessment_id, scores, duration in results:
+        yield json.dumps(
+            {"assessment_id": assessment_id, "duration": duration, **scores}
+        ) + "\n"
+
+
+class Echo:
+    """File-like object returning what is written, to stream CSV lines"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv_lines(results: Iterable[AssessmentScores]) -> Iterator[str]:
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writerow(dict(zip(CSV_COLUMNS, CSV_COLUMNS)))
+    for assessment_id, scores, duration in results:
+        for scores_key, column in CSV_COLUMN_BY_SCORES_KEY.items():
+            for item_id, score in scores[scores_key].items():
+                yield writer.writerow(
+                    {
+                        "assessment_id": assessment_id,
+                        column: item_id,
+                        "score": score,
+                        "duration": duration,
+                    }
+                )
+
+
+LINES_FN_BY_FORMAT = {
+    "jsonl": iter_jsonl_lines,
+    "csv": iter_csv_lines,
+}
+
+CONTENT_TYPE_BY_FORMAT = {
+    "jsonl": "application/jsonl",
+    "csv": "text/csv",
+}
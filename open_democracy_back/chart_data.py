@@ -1,10 +1,11 @@
 from collections import defaultdict
-from typing import Dict, Callable
+from typing import Any, Callable, DefaultDict, Dict, List, Optional, Set, Tuple
 
-from django.db.models import Count, Q, F
+from django.db.models import Avg, Count, Q, F
 from django.http import Http404
 
 from open_democracy_back.models import (
+    Assessment,
     ResponseChoice,
     Category,
     ClosedWithScaleCategoryResponse,
@@ -13,7 +14,11 @@ from open_democracy_back.models import (
     Question,
 )
 from open_democracy_back.scoring import get_interval_average_values
-from open_democracy_back.utils import QuestionType
+from open_democracy_back.scoring_plan import (
+    RANGE_MODEL_BY_QUESTION_TYPE,
+    get_scoring_plan,
+)
+from open_democracy_back.utils import QuestionObjectivity, QuestionType
 
 
 def get_chart_data_objective_queryset(
@@ -118,6 +123,11 @@ def get_chart_data_of_choice_question(question, assessment_id, choice_type):
             "value": response_choice.count_by_role,
         }
         total_count += response_choice.count_by_role
+    if question.objectivity != "objective":
+        # roles without responses are shown with a zero count
+        for value in data["value"].values():
+            for role_name in question_roles:
+                value.setdefault(role_name, {"value": 0})
 
     # count is not the number of answers, because an answer can count multiple times
     # if answered for multiple profiles
@@ -250,3 +260,340 @@ CHART_DATA_FN_BY_QUESTION_TYPE: Dict[str, Callable] = {
     QuestionType.CLOSED_WITH_SCALE.value: get_chart_data_of_closed_with_scale_question,  # type: ignore
     QuestionType.NUMBER.value: get_chart_data_of_interval_question,  # type: ignore
 }
+
+
+# Chart data of many questions at once, with one grouped query by question type and
+# response table. Questions are given as (question id, objectivity), the data of
+# each question is the same as computed one question at a time above, except that
+# interval questions without responses have no data instead of raising a 404.
+
+
+def get_question_ids_by_is_objective(questions) -> Dict[bool, List[int]]:
+    question_ids_by_is_objective: Dict[bool, List[int]] = {True: [], False: []}
+    for question_id, objectivity in questions:
+        question_ids_by_is_objective[
+            objectivity == QuestionObjectivity.OBJECTIVE
+        ].append(question_id)
+    return question_ids_by_is_objective
+
+
+def get_chart_data_queryset(assessment_id, is_objective, prefix_queryset=""):
+    if is_objective:
+        return get_chart_data_objective_queryset(assessment_id, prefix_queryset)
+    return get_chart_data_subjective_queryset(assessment_id, prefix_queryset)
+
+
+def get_batch_chart_data_of_boolean_questions(questions, assessment_id):
+    counts_by_question_id = {}
+    for is_objective, question_ids in get_question_ids_by_is_objective(
+        questions
+    ).items():
+        if is_objective:
+            model = AssessmentResponse
+            base_queryset = get_chart_data_objective_queryset(
+                assessment_id,
+                exclude_empty_for_question_type=QuestionType.BOOLEAN.value,
+            )
+        else:
+            model = ParticipationResponse
+            base_queryset = get_chart_data_subjective_queryset(assessment_id)
+        for counts in (
+            model.objects.filter(**base_queryset, question_id__in=question_ids)
+            .values("question_id")
+            .annotate(
+                count=Count("id"),
+                true=Count("id", filter=Q(boolean_response=True)),
+                false=Count("id", filter=Q(boolean_response=False)),
+            )
+        ):
+            counts_by_question_id[counts["question_id"]] = counts
+
+    data_by_question_id = {}
+    for question_id, _ in questions:
+        counts = counts_by_question_id.get(question_id, {})
+        data_by_question_id[question_id] = {
+            "true": {"label": "Oui", "value": counts.get("true", 0)},
+            "false": {"label": "Non", "value": counts.get("false", 0)},
+            "count": counts.get("count", 0),
+        }
+    return data_by_question_id
+
+
+# model whose rows are the selected choices, by choice type and objectivity: the
+# prefix of the response in the model, and the field of the choice
+CHOICE_ROWS_BY_CHOICE_TYPE = {
+    ("unique_choice", True): (AssessmentResponse, "", "unique_choice_response_id"),
+    ("unique_choice", False): (ParticipationResponse, "", "unique_choice_response_id"),
+    ("multiple_choice", True): (
+        AssessmentResponse.multiple_choice_response.through,
+        "assessmentresponse",
+        "responsechoice_id",
+    ),
+    ("multiple_choice", False): (
+        ParticipationResponse.multiple_choice_response.through,
+        "participationresponse",
+        "responsechoice_id",
+    ),
+}
+
+
+def get_batch_chart_data_of_choice_questions(questions, assessment_id, choice_type):
+    count_by_response_choice_id: DefaultDict[int, int] = defaultdict(int)
+    count_by_role_by_response_choice_id: DefaultDict[int, Dict[str, int]] = defaultdict(
+        dict
+    )
+    for is_objective, question_ids in get_question_ids_by_is_objective(
+        questions
+    ).items():
+        model, prefix, choice_field = CHOICE_ROWS_BY_CHOICE_TYPE[
+            (choice_type, is_objective)
+        ]
+        response_prefix = f"{prefix}__" if prefix else ""
+        # like above, the roles of objective responses are not counted
+        role_fields = (
+            {}
+            if is_objective
+            else {"role_name": F(f"{response_prefix}participation__role__name")}
+        )
+        for counts in (
+            model.objects.filter(
+                **get_chart_data_queryset(assessment_id, is_objective, prefix),
+                **{f"{response_prefix}question_id__in": question_ids},
+            )
+            .exclude(**{choice_field: None})
+            .values(choice_id=F(choice_field), **role_fields)
+            .annotate(count=Count("pk"))
+        ):
+            count_by_response_choice_id[counts["choice_id"]] += counts["count"]
+            if counts.get("role_name") is not None:
+                count_by_role_by_response_choice_id[counts["choice_id"]][
+                    counts["role_name"]
+                ] = counts["count"]
+
+    question_ids = [question_id for question_id, _ in questions]
+    subjective_question_ids = set(get_question_ids_by_is_objective(questions)[False])
+    role_names_by_question_id: DefaultDict[int, Set[str]] = defaultdict(set)
+    for question_id, role_name in Question.roles.through.objects.filter(
+        question_id__in=subjective_question_ids
+    ).values_list("question_id", "role__name"):
+        role_names_by_question_id[question_id].add(role_name)
+
+    data_by_question_id = {
+        question_id: {"value": {}, "role": {}, "count": 0}
+        for question_id in question_ids
+    }
+    for response_choice in ResponseChoice.objects.filter(question_id__in=question_ids):
+        data = data_by_question_id[response_choice.question_id]
+        value = {
+            "label": response_choice.response_choice,
+            "value": count_by_response_choice_id[response_choice.id],
+        }
+        # roles not attached to the question are not displayed, the others are
+        # even without responses
+        count_by_role = count_by_role_by_response_choice_id[response_choice.id]
+        for role_name in role_names_by_question_id[response_choice.question_id]:
+            value[role_name] = {"value": count_by_role.get(role_name, 0)}
+            data["count"] += value[role_name]["value"]
+        data["value"][response_choice.id] = value
+    return data_by_question_id
+
+
+def get_batch_chart_data_of_unique_choice_questions(questions, assessment_id):
+    return get_batch_chart_data_of_choice_questions(
+        questions, assessment_id, "unique_choice"
+    )
+
+
+def get_batch_chart_data_of_multiple_choice_questions(questions, assessment_id):
+    return get_batch_chart_data_of_choice_questions(
+        questions, assessment_id, "multiple_choice"
+    )
+
+
+def get_batch_chart_data_of_closed_with_scale_questions(questions, assessment_id):
+    count_by_category_and_choice: DefaultDict[Tuple[int, int], int] = defaultdict(int)
+    count_by_role_by_category_and_choice: DefaultDict[
+        Tuple[int, int], Dict[Any, int]
+    ] = defaultdict(dict)
+    response_count_by_question_id: Dict[int, int] = {}
+    for is_objective, question_ids in get_question_ids_by_is_objective(
+        questions
+    ).items():
+        if is_objective:
+            model = AssessmentResponse
+            base_count = "assessment_response"
+            # like above, objective "roles" are the ids of the responses
+            role_count = base_count
+        else:
+            model = ParticipationResponse
+            base_count = "participation_response"
+            role_count = f"{base_count}__participation__role__name"
+
+        for counts in (
+            ClosedWithScaleCategoryResponse.objects.filter(
+                **get_chart_data_queryset(assessment_id, is_objective, base_count),
+                **{f"{base_count}__question_id__in": question_ids},
+            )
+            .exclude(response_choice_id=None)
+            .values("category_id", "response_choice_id", role_name=F(role_count))
+            .annotate(count=Count("id"))
+        ):
+            key = (counts["category_id"], counts["response_choice_id"])
+            count_by_category_and_choice[key] += counts["count"]
+            count_by_role_by_category_and_choice[key][counts["role_name"]] = counts[
+                "count"
+            ]
+
+        response_count_by_question_id.update(
+            model.objects.filter(
+                **get_chart_data_queryset(assessment_id, is_objective),
+                question_id__in=question_ids,
+            )
+            .values("question_id")
+            .annotate(count=Count("id"))
+            .values_list("question_id", "count")
+        )
+
+    question_ids = [question_id for question_id, _ in questions]
+    response_choices_by_question_id: DefaultDict[int, List] = defaultdict(list)
+    for response_choice in ResponseChoice.objects.filter(question_id__in=question_ids):
+        response_choices_by_question_id[response_choice.question_id].append(
+            response_choice
+        )
+    data_by_question_id = {
+        question_id: {
+            "value": {},
+            "count": response_count_by_question_id.get(question_id, 0),
+        }
+        for question_id in question_ids
+    }
+    for category in Category.objects.filter(question_id__in=question_ids):
+        values = {}
+        for response_choice in response_choices_by_question_id[category.question_id]:
+            key = (category.id, response_choice.id)
+            values[response_choice.id] = {
+                "label": response_choice.response_choice,
+                "value": count_by_category_and_choice[key],
+                **{
+                    role_name: {"value": count}
+                    for role_name, count in count_by_role_by_category_and_choice[
+                        key
+                    ].items()
+                },
+            }
+        data_by_question_id[category.question_id]["value"][category.id] = {
+            "label": category.category,
+            "value": values,
+        }
+    for question_id, data in data_by_question_id.items():
+        data["choices"] = {
+            response_choice.id: {"label": response_choice.response_choice}
+            for response_choice in response_choices_by_question_id[question_id]
+        }
+    return data_by_question_id
+
+
+def get_batch_chart_data_of_interval_questions(questions, assessment_id, question_type):
+    response_name = Question.RESPONSE_NAME_BY_QUESTION_TYPE[question_type]
+    average_by_question_id = {}
+    for is_objective, question_ids in get_question_ids_by_is_objective(
+        questions
+    ).items():
+        model = AssessmentResponse if is_objective else ParticipationResponse
+        for average in (
+            model.objects.filter(
+                **get_chart_data_queryset(assessment_id, is_objective),
+                question_id__in=question_ids,
+            )
+            .exclude(**{response_name: None})
+            .values("question_id")
+            .annotate(avg_value=Avg(response_name), count=Count("id"))
+        ):
+            average_by_question_id[average["question_id"]] = average
+
+    question_ids = [question_id for question_id, _ in questions]
+    ranges_by_question_id: DefaultDict[int, List] = defaultdict(list)
+    for response_range in RANGE_MODEL_BY_QUESTION_TYPE[question_type].objects.filter(
+        question_id__in=question_ids
+    ):
+        ranges_by_question_id[response_range.question_id].append(
+            {
+                "id": response_range.id,
+                "score": response_range.associated_score,
+                "lower_bound": response_range.lower_bound,
+                "upper_bound": response_range.upper_bound,
+            }
+        )
+
+    data_by_question_id = {}
+    for question_id in question_ids:
+        average = average_by_question_id.get(question_id)
+        data_by_question_id[question_id] = average and {
+            "value": {
+                "label": LABEL_BY_QUESTION_TYPE[question_type],
+                "value": average["avg_value"],
+            },
+            "count": average["count"],
+            "ranges": ranges_by_question_id[question_id],
+        }
+    return data_by_question_id
+
+
+def get_batch_chart_data_of_percentage_questions(questions, assessment_id):
+    return get_batch_chart_data_of_interval_questions(
+        questions, assessment_id, QuestionType.PERCENTAGE.value
+    )
+
+
+def get_batch_chart_data_of_number_questions(questions, assessment_id):
+    return get_batch_chart_data_of_interval_questions(
+        questions, assessment_id, QuestionType.NUMBER.value
+    )
+
+
+BATCH_CHART_DATA_FN_BY_QUESTION_TYPE: Dict[str, Callable] = {
+    QuestionType.BOOLEAN.value: get_batch_chart_data_of_boolean_questions,
+    QuestionType.UNIQUE_CHOICE.value: get_batch_chart_data_of_unique_choice_questions,
+    QuestionType.MULTIPLE_CHOICE.value: get_batch_chart_data_of_multiple_choice_questions,
+    QuestionType.PERCENTAGE.value: get_batch_chart_data_of_percentage_questions,
+    QuestionType.CLOSED_WITH_SCALE.value: get_batch_chart_data_of_closed_with_scale_questions,
+    QuestionType.NUMBER.value: get_batch_chart_data_of_number_questions,
+}
+
+
+def get_chart_data_of_assessment(
+    assessment_id: int, pillar_id: Optional[int] = None
+) -> Dict[int, Dict]:
+    """
+    Chart data of the questions of the survey of an assessment, or of one of its
+    pillars, by question id. The questions are read from the scoring plan.
+    """
+    try:
+        survey_id = Assessment.objects.values_list("survey_id", flat=True).get(
+            pk=assessment_id
+        )
+    except Assessment.DoesNotExist:
+        raise Http404(f"no assessment {assessment_id}")
+    questions = get_scoring_plan(survey_id, []).get_questions(pillar_id)
+
+    questions_by_type: DefaultDict[str, List[Tuple[int, str]]] = defaultdict(list)
+    for question_id, question_type, objectivity in questions:
+        questions_by_type[question_type].append((question_id, objectivity))
+    data_by_question_id = {}
+    for question_type, questions_of_type in questions_by_type.items():
+        if question_type in BATCH_CHART_DATA_FN_BY_QUESTION_TYPE:
+            data_by_question_id.update(
+                BATCH_CHART_DATA_FN_BY_QUESTION_TYPE[question_type](
+                    questions_of_type, assessment_id
+                )
+            )
+
+    return {
+        question_id: {
+            "id": question_id,
+            "assessment_id": assessment_id,
+            "type": question_type,
+            "data": data_by_question_id.get(question_id),
+        }
+        for question_id, question_type, _ in questions
+    }
@@ -1,691 +0,0 @@
-DEPARTEMENTS = [
-    {"code": "01", "region": "84", "chefLieu": "01053", "nom": "Ain", "typeLiaison": 5},
-    {
-        "code": "02",
-        "region": "32",
-        "chefLieu": "02408",
-        "nom": "Aisne",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "03",
-        "region": "84",
-        "chefLieu": "03190",
-        "nom": "Allier",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "04",
-        "region": "93",
-        "chefLieu": "04070",
-        "nom": "Alpes-de-Haute-Provence",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "05",
-        "region": "93",
-        "chefLieu": "05061",
-        "nom": "Hautes-Alpes",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "06",
-        "region": "93",
-        "chefLieu": "06088",
-        "nom": "Alpes-Maritimes",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "07",
-        "region": "84",
-        "chefLieu": "07186",
-        "nom": "Ardèche",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "08",
-        "region": "44",
-        "chefLieu": "08105",
-        "nom": "Ardennes",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "09",
-        "region": "76",
-        "chefLieu": "09122",
-        "nom": "Ariège",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "10",
-        "region": "44",
-        "chefLieu": "10387",
-        "nom": "Aube",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "11",
-        "region": "76",
-        "chefLieu": "11069",
-        "nom": "Aude",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "12",
-        "region": "76",
-        "chefLieu": "12202",
-        "nom": "Aveyron",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "13",
-        "region": "93",
-        "chefLieu": "13055",
-        "nom": "Bouches-du-Rhône",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "14",
-        "region": "28",
-        "chefLieu": "14118",
-        "nom": "Calvados",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "15",
-        "region": "84",
-        "chefLieu": "15014",
-        "nom": "Cantal",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "16",
-        "region": "75",
-        "chefLieu": "16015",
-        "nom": "Charente",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "17",
-        "region": "75",
-        "chefLieu": "17300",
-        "nom": "Charente-Maritime",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "18",
-        "region": "24",
-        "chefLieu": "18033",
-        "nom": "Cher",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "19",
-        "region": "75",
-        "chefLieu": "19272",
-        "nom": "Corrèze",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "21",
-        "region": "27",
-        "chefLieu": "21231",
-        "nom": "Côte-d'Or",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "22",
-        "region": "53",
-        "chefLieu": "22278",
-        "nom": "Côtes-d'Armor",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "23",
-        "region": "75",
-        "chefLieu": "23096",
-        "nom": "Creuse",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "24",
-        "region": "75",
-        "chefLieu": "24322",
-        "nom": "Dordogne",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "25",
-        "region": "27",
-        "chefLieu": "25056",
-        "nom": "Doubs",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "26",
-        "region": "84",
-        "chefLieu": "26362",
-        "nom": "Drôme",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "27",
-        "region": "28",
-        "chefLieu": "27229",
-        "nom": "Eure",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "28",
-        "region": "24",
-        "chefLieu": "28085",
-        "nom": "Eure-et-Loir",
-        "typeLiaison": 1,
-    },
-    {
-        "code": "29",
-        "region": "53",
-        "chefLieu": "29232",
-        "nom": "Finistère",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "2A",
-        "region": "94",
-        "chefLieu": "2A004",
-        "nom": "Corse-du-Sud",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "2B",
-        "region": "94",
-        "chefLieu": "2B033",
-        "nom": "Haute-Corse",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "30",
-        "region": "76",
-        "chefLieu": "30189",
-        "nom": "Gard",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "31",
-        "region": "76",
-        "chefLieu": "31555",
-        "nom": "Haute-Garonne",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "32",
-        "region": "76",
-        "chefLieu": "32013",
-        "nom": "Gers",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "33",
-        "region": "75",
-        "chefLieu": "33063",
-        "nom": "Gironde",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "34",
-        "region": "76",
-        "chefLieu": "34172",
-        "nom": "Hérault",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "35",
-        "region": "53",
-        "chefLieu": "35238",
-        "nom": "Ille-et-Vilaine",
-        "typeLiaison": 1,
-    },
-    {
-        "code": "36",
-        "region": "24",
-        "chefLieu": "36044",
-        "nom": "Indre",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "37",
-        "region": "24",
-        "chefLieu": "37261",
-        "nom": "Indre-et-Loire",
-        "typeLiaison": 1,
-    },
-    {
-        "code": "38",
-        "region": "84",
-        "chefLieu": "38185",
-        "nom": "Isère",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "39",
-        "region": "27",
-        "chefLieu": "39300",
-        "nom": "Jura",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "40",
-        "region": "75",
-        "chefLieu": "40192",
-        "nom": "Landes",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "41",
-        "region": "24",
-        "chefLieu": "41018",
-        "nom": "Loir-et-Cher",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "42",
-        "region": "84",
-        "chefLieu": "42218",
-        "nom": "Loire",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "43",
-        "region": "84",
-        "chefLieu": "43157",
-        "nom": "Haute-Loire",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "44",
-        "region": "52",
-        "chefLieu": "44109",
-        "nom": "Loire-Atlantique",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "45",
-        "region": "24",
-        "chefLieu": "45234",
-        "nom": "Loiret",
-        "typeLiaison": 2,
-    },
-    {"code": "46", "region": "76", "chefLieu": "46042", "nom": "Lot", "typeLiaison": 2},
-    {
-        "code": "47",
-        "region": "75",
-        "chefLieu": "47001",
-        "nom": "Lot-et-Garonne",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "48",
-        "region": "76",
-        "chefLieu": "48095",
-        "nom": "Lozère",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "49",
-        "region": "52",
-        "chefLieu": "49007",
-        "nom": "Maine-et-Loire",
-        "typeLiaison": 0,
-    },
-    {
-        "code": "50",
-        "region": "28",
-        "chefLieu": "50502",
-        "nom": "Manche",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "51",
-        "region": "44",
-        "chefLieu": "51108",
-        "nom": "Marne",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "52",
-        "region": "44",
-        "chefLieu": "52121",
-        "nom": "Haute-Marne",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "53",
-        "region": "52",
-        "chefLieu": "53130",
-        "nom": "Mayenne",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "54",
-        "region": "44",
-        "chefLieu": "54395",
-        "nom": "Meurthe-et-Moselle",
-        "typeLiaison": 0,
-    },
-    {
-        "code": "55",
-        "region": "44",
-        "chefLieu": "55029",
-        "nom": "Meuse",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "56",
-        "region": "53",
-        "chefLieu": "56260",
-        "nom": "Morbihan",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "57",
-        "region": "44",
-        "chefLieu": "57463",
-        "nom": "Moselle",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "58",
-        "region": "27",
-        "chefLieu": "58194",
-        "nom": "Nièvre",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "59",
-        "region": "32",
-        "chefLieu": "59350",
-        "nom": "Nord",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "60",
-        "region": "32",
-        "chefLieu": "60057",
-        "nom": "Oise",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "61",
-        "region": "28",
-        "chefLieu": "61001",
-        "nom": "Orne",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "62",
-        "region": "32",
-        "chefLieu": "62041",
-        "nom": "Pas-de-Calais",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "63",
-        "region": "84",
-        "chefLieu": "63113",
-        "nom": "Puy-de-Dôme",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "64",
-        "region": "75",
-        "chefLieu": "64445",
-        "nom": "Pyrénées-Atlantiques",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "65",
-        "region": "76",
-        "chefLieu": "65440",
-        "nom": "Hautes-Pyrénées",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "66",
-        "region": "76",
-        "chefLieu": "66136",
-        "nom": "Pyrénées-Orientales",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "67",
-        "region": "44",
-        "chefLieu": "67482",
-        "nom": "Bas-Rhin",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "68",
-        "region": "44",
-        "chefLieu": "68066",
-        "nom": "Haut-Rhin",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "69",
-        "region": "84",
-        "chefLieu": "69123",
-        "nom": "Rhône",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "70",
-        "region": "27",
-        "chefLieu": "70550",
-        "nom": "Haute-Saône",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "71",
-        "region": "27",
-        "chefLieu": "71270",
-        "nom": "Saône-et-Loire",
-        "typeLiaison": 0,
-    },
-    {
-        "code": "72",
-        "region": "52",
-        "chefLieu": "72181",
-        "nom": "Sarthe",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "73",
-        "region": "84",
-        "chefLieu": "73065",
-        "nom": "Savoie",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "74",
-        "region": "84",
-        "chefLieu": "74010",
-        "nom": "Haute-Savoie",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "75",
-        "region": "11",
-        "chefLieu": "75056",
-        "nom": "Paris",
-        "typeLiaison": 0,
-    },
-    {
-        "code": "76",
-        "region": "28",
-        "chefLieu": "76540",
-        "nom": "Seine-Maritime",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "77",
-        "region": "11",
-        "chefLieu": "77288",
-        "nom": "Seine-et-Marne",
-        "typeLiaison": 0,
-    },
-    {
-        "code": "78",
-        "region": "11",
-        "chefLieu": "78646",
-        "nom": "Yvelines",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "79",
-        "region": "75",
-        "chefLieu": "79191",
-        "nom": "Deux-Sèvres",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "80",
-        "region": "32",
-        "chefLieu": "80021",
-        "nom": "Somme",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "81",
-        "region": "76",
-        "chefLieu": "81004",
-        "nom": "Tarn",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "82",
-        "region": "76",
-        "chefLieu": "82121",
-        "nom": "Tarn-et-Garonne",
-        "typeLiaison": 2,
-    },
-    {"code": "83", "region": "93", "chefLieu": "83137", "nom": "Var", "typeLiaison": 2},
-    {
-        "code": "84",
-        "region": "93",
-        "chefLieu": "84007",
-        "nom": "Vaucluse",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "85",
-        "region": "52",
-        "chefLieu": "85191",
-        "nom": "Vendée",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "86",
-        "region": "75",
-        "chefLieu": "86194",
-        "nom": "Vienne",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "87",
-        "region": "75",
-        "chefLieu": "87085",
-        "nom": "Haute-Vienne",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "88",
-        "region": "44",
-        "chefLieu": "88160",
-        "nom": "Vosges",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "89",
-        "region": "27",
-        "chefLieu": "89024",
-        "nom": "Yonne",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "90",
-        "region": "27",
-        "chefLieu": "90010",
-        "nom": "Territoire de Belfort",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "91",
-        "region": "11",
-        "chefLieu": "91228",
-        "nom": "Essonne",
-        "typeLiaison": 5,
-    },
-    {
-        "code": "92",
-        "region": "11",
-        "chefLieu": "92050",
-        "nom": "Hauts-de-Seine",
-        "typeLiaison": 4,
-    },
-    {
-        "code": "93",
-        "region": "11",
-        "chefLieu": "93008",
-        "nom": "Seine-Saint-Denis",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "94",
-        "region": "11",
-        "chefLieu": "94028",
-        "nom": "Val-de-Marne",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "95",
-        "region": "11",
-        "chefLieu": "95500",
-        "nom": "Val-d'Oise",
-        "typeLiaison": 2,
-    },
-    {
-        "code": "971",
-        "region": "01",
-        "chefLieu": "97105",
-        "nom": "Guadeloupe",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "972",
-        "region": "02",
-        "chefLieu": "97209",
-        "nom": "Martinique",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "973",
-        "region": "03",
-        "chefLieu": "97302",
-        "nom": "Guyane",
-        "typeLiaison": 3,
-    },
-    {
-        "code": "974",
-        "region": "04",
-        "chefLieu": "97411",
-        "nom": "La Réunion",
-        "typeLiaison": 0,
-    },
-    {
-        "code": "976",
-        "region": "06",
-        "chefLieu": "97608",
-        "nom": "Mayotte",
-        "typeLiaison": 0,
-    },
-]
@@ -1,35 +0,0 @@
-REGIONS = [
-    {"code": "01", "chefLieu": "97105", "nom": "Guadeloupe", "typeLiaison": 3},
-    {"code": "02", "chefLieu": "97209", "nom": "Martinique", "typeLiaison": 3},
-    {"code": "03", "chefLieu": "97302", "nom": "Guyane", "typeLiaison": 3},
-    {"code": "04", "chefLieu": "97411", "nom": "La Réunion", "typeLiaison": 0},
-    {"code": "06", "chefLieu": "97608", "nom": "Mayotte", "typeLiaison": 0},
-    {"code": "11", "chefLieu": "75056", "nom": "Île-de-France", "typeLiaison": 1},
-    {"code": "24", "chefLieu": "45234", "nom": "Centre-Val de Loire", "typeLiaison": 2},
-    {
-        "code": "27",
-        "chefLieu": "21231",
-        "nom": "Bourgogne-Franche-Comté",
-        "typeLiaison": 0,
-    },
-    {"code": "28", "chefLieu": "76540", "nom": "Normandie", "typeLiaison": 0},
-    {"code": "32", "chefLieu": "59350", "nom": "Hauts-de-France", "typeLiaison": 4},
-    {"code": "44", "chefLieu": "67482", "nom": "Grand Est", "typeLiaison": 2},
-    {"code": "52", "chefLieu": "44109", "nom": "Pays de la Loire", "typeLiaison": 4},
-    {"code": "53", "chefLieu": "35238", "nom": "Bretagne", "typeLiaison": 0},
-    {"code": "75", "chefLieu": "33063", "nom": "Nouvelle-Aquitaine", "typeLiaison": 3},
-    {"code": "76", "chefLieu": "31555", "nom": "Occitanie", "typeLiaison": 1},
-    {
-        "code": "84",
-        "chefLieu": "69123",
-        "nom": "Auvergne-Rhône-Alpes",
-        "typeLiaison": 1,
-    },
-    {
-        "code": "93",
-        "chefLieu": "13055",
-        "nom": "Provence-Alpes-Côte d'Azur",
-        "typeLiaison": 0,
-    },
-    {"code": "94", "chefLieu": "2A004", "nom": "Corse", "typeLiaison": 0},
-]
@@ -0,0 +1,102 @@
+"""
+Per-assessment data versions, survey content and locality revisions.
+
+The version of an assessment changes each time one of its responses or
+participations changes, the content revision each time a question or its
+scoring changes, and the locality revision each time a locality changes, so data
+derived from them (scores, scoring plans, ...) is cached under them and becomes
+stale as soon as they change.
+Versions are random tokens rather than counters: if a version is evicted from the
+cache, the new one can not match entries cached under a former version.
+"""
+from typing import Callable, Iterable, List, TypeVar
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import get_language
+
+# data cached under a former version is never read again, let it expire
+ASSESSMENT_DATA_TIMEOUT = 60 * 60 * 24 * 30
+
+SURVEY_CONTENT_REVISION_KEY = "survey-content-revision"
+LOCALITY_REVISION_KEY = "locality-revision"
+
+T = TypeVar("T")
+
+
+def get_data_version_key(assessment_id: int) -> str:
+    return f"assessment-data-version:{assessment_id}"
+
+
+def get_tokens(keys: List[str]) -> List[str]:
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            # another worker may have set the token meanwhile
+            cache.add(key, uuid4().hex, timeout=None)
+            tokens[key] = cache.get(key)
+    return [tokens[key] for key in keys]
+
+
+def renew_tokens_on_commit(keys: List[str]):
+    """
+    Renew tokens once the current transaction is committed, so that data cached
+    under the new tokens is never computed from uncommitted rows.
+    """
+    if keys:
+        transaction.on_commit(
+            lambda: cache.set_many({key: uuid4().hex for key in keys}, timeout=None)
+        )
+
+
+def get_assessment_data_version(assessment_id: int) -> str:
+    return get_tokens([get_data_version_key(assessment_id)])[0]
+
+
+def bump_assessment_data_versions(assessment_ids: Iterable[int]):
+    renew_tokens_on_commit(
+        [
+            get_data_version_key(assessment_id)
+            for assessment_id in set(assessment_ids)
+            if assessment_id is not None
+        ]
+    )
+
+
+def bump_assessment_data_versions_of_user(user):
+    bump_assessment_data_versions(
+        set(user.participations.values_list("assessment_id", flat=True))
+        | set(user.assessment_responses.values_list("assessment_id", flat=True))
+    )
+
+
+def get_survey_content_revision() -> str:
+    return get_tokens([SURVEY_CONTENT_REVISION_KEY])[0]
+
+
+def bump_survey_content_revision():
+    renew_tokens_on_commit([SURVEY_CONTENT_REVISION_KEY])
+
+
+def get_locality_revision() -> str:
+    return get_tokens([LOCALITY_REVISION_KEY])[0]
+
+
+def bump_locality_revision():
+    renew_tokens_on_commit([LOCALITY_REVISION_KEY])
+
+
+def get_assessment_data_etag(assessment_id: int) -> str:
+    revision, version = get_tokens(
+        [SURVEY_CONTENT_REVISION_KEY, get_data_version_key(assessment_id)]
+    )
+    return f"{revision}-{version}-{get_language()}"
+
+
+def get_or_set_assessment_data(
+    assessment_id: int, name: str, compute: Callable[[], T]
+) -> T:
+    """Data named `name` of an assessment, computed only if its version changed"""
+    key = f"assessment-data:{name}:{assessment_id}:{get_assessment_data_etag(assessment_id)}"
+    return cache.get_or_set(key, compute, timeout=ASSESSMENT_DATA_TIMEOUT)
@@ -0,0 +1,98 @@
+"""
+Resumable uploads of assessment documents.
+
+The file of a document is sent in chunks of any size, each of them being read
+from the request to a part file of the uploads directory by blocks of
+`DOCUMENT_UPLOAD_BLOCK_SIZE` bytes, so that the memory used by an upload does not
+depend on the size of the file, then appended to the file of the upload. The
+chunk is read without locking the upload, which is locked again to append it
+only if no other chunk was appended meanwhile. Once all the bytes are received,
+the file is copied to the storage, also by blocks, and the document is created.
+An interrupted upload resumes from the offset of the bytes received.
+"""
+import datetime
+import glob
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from open_democracy_back.models import AssessmentDocument, AssessmentDocumentUpload
+from open_democracy_back.models.assessment_models import get_unique_file_name
+
+
+def get_upload_offset(upload: AssessmentDocumentUpload) -> int:
+    """
+    Number of bytes received, reset if the bytes already received were lost (the
+    uploads directory may be cleaned when the server restarts)
+    """
+    if upload.offset and (
+        not os.path.exists(upload.path) or os.path.getsize(upload.path) < upload.offset
+    ):
+        upload.offset = 0
+        upload.save(update_fields=["offset", "modified"])
+    return upload.offset
+
+
+def write_upload_chunk(upload: AssessmentDocumentUpload, stream, length: int) -> str:
+    """
+    Write the `length` next bytes of a stream to a new part file of the upload,
+    block by block, and return its path. The part has fewer bytes if the stream
+    was interrupted.
+    """
+    os.makedirs(settings.DOCUMENT_UPLOAD_DIR, exist_ok=True)
+    part_path = f"{upload.path}.{uuid.uuid4().hex}"
+    remaining = length
+    with open(part_path, "wb") as fh:
+        while remaining:
+            block = stream.read(min(settings.DOCUMENT_UPLOAD_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            fh.write(block)
+            remaining -= len(block)
+    return part_path
+
+
+def append_upload_chunk(upload: AssessmentDocumentUpload, part_path: str):
+    """Append a part file written by `write_upload_chunk` to the upload"""
+    with open(upload.path, "ab") as fh, open(part_path, "rb") as part:
+        # bytes written after the offset were not accounted
+        fh.truncate(upload.offset)
+        shutil.copyfileobj(part, fh, settings.DOCUMENT_UPLOAD_BLOCK_SIZE)
+    upload.offset += os.path.getsize(part_path)
+    upload.save(update_fields=["offset", "modified"])
+
+
+def complete_upload(upload: AssessmentDocumentUpload) -> AssessmentDocument:
+    """Send the uploaded file to the storage and create its document"""
+    document = AssessmentDocument(
+        assessment_id=upload.assessment_id,
+        category=upload.category,
+        name=upload.name,
+    )
+    with open(upload.path, "rb") as fh:
+        document.file.save(get_unique_file_name(upload.file_name), File(fh), save=False)
+    document.save()
+    delete_upload(upload)
+    return document
+
+
+def delete_upload(upload: AssessmentDocumentUpload):
+    # the parts of chunks being received are deleted as well
+    for path in [upload.path, *glob.glob(f"{upload.path}.*")]:
+        if os.path.exists(path):
+            os.remove(path)
+    upload.delete()
+
+
+def delete_expired_uploads(max_age: datetime.timedelta) -> int:
+    """Delete the uploads which did not receive any chunk for `max_age`"""
+    expired_uploads = AssessmentDocumentUpload.objects.filter(
+        modified__lt=timezone.now() - max_age
+    )
+    for upload in expired_uploads:
+        delete_upload(upload)
+    return len(expired_uploads)
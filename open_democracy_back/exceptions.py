@@ -60,3 +60,12 @@ class ErrorCode(Enum):
     INVALID_EMAIL_SHAPE = "invalid_email_shape"
     CGV_MUST_BE_CONSENTED = "cgv_not_consented"
     CGU_MUST_BE_CONSENTED = "cgu_not_consented"
+    INCORRECT_OUTPUT_FORMAT = "incorrect_output_format"
+    INCORRECT_IDS = "incorrect_ids"
+    INCORRECT_GROUP_BY = "incorrect_group_by"
+    INCORRECT_PILLAR = "incorrect_pillar"
+    INCORRECT_UPLOAD_SIZE = "incorrect_upload_size"
+    INCORRECT_UPLOAD_CHUNK = "incorrect_upload_chunk"
+    INCORRECT_LIMIT = "incorrect_limit"
+    INCORRECT_SINCE = "incorrect_since"
+    DUPLICATE_RESPONSE = "duplicate_response"
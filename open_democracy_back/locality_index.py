@@ -0,0 +1,331 @@
+"""
+Read-only index of the localities by zip code and by name.
+
+Looking for the localities of a zip code joins the zip codes with the
+municipalities, EPCIs, departments and regions, and looking for them by name
+with the search backend does not ignore accents. The index is built once per
+process and per locality revision, which changes with the locality tables and
+the surveys (departments and regions are only looked for if a survey exists for
+them), so that localities are found without any query, their zip codes included.
+"""
+import heapq
+import re
+import sys
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+from typing import DefaultDict, Dict, Iterable, List, Set, Tuple
+
+from open_democracy_back.data_versions import get_locality_revision
+from open_democracy_back.models import (
+    EPCI,
+    Department,
+    Municipality,
+    MunicipalityOrderByEPCI,
+    Region,
+    Survey,
+    ZipCode,
+)
+from open_democracy_back.utils import LocalityType, SurveyLocality
+
+# letters which are not decomposed into a letter and an accent
+LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+
+# locality types looked for only if a survey exists for them
+SURVEY_LOCALITY_BY_LOCALITY_TYPE = {
+    LocalityType.DEPARTMENT: SurveyLocality.DEPARTMENT,
+    LocalityType.REGION: SurveyLocality.REGION,
+}
+
+# locality type, id, population
+NamedLocality = Tuple[str, int, int]
+
+
+def fold_name(name: str) -> str:
+    """Name in lower case, without accents and with words separated by a space"""
+    name = unicodedata.normalize("NFKD", name.lower().translate(LIGATURES))
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return re.sub("[^a-z0-9]+", " ", name).strip()
+
+
+class LocalityNameIndex:
+    """
+    Sorted array of the folded names of the localities, and of every end of them
+    starting at a word, so that "etienne" finds "Saint-Étienne". The localities
+    whose name starts with a prefix are a slice of the array, found with a
+    bisection.
+    """
+
+    def __init__(self, localities: Iterable[Tuple[str, NamedLocality]]):
+        entries = []
+        for name, locality in localities:
+            words = fold_name(name).split(" ")
+            for index in range(len(words)):
+                entries.append((" ".join(words[index:]), locality))
+        entries.sort(key=itemgetter(0))
+        self.keys = [key for key, _ in entries]
+        self.localities = [locality for _, locality in entries]
+
+    def search(
+        self, query: str, limit: int, locality_types: Set[str]
+    ) -> List[NamedLocality]:
+        """Most populated localities of the given types with a name matching query"""
+        prefix = fold_name(query)
+        if not prefix:
+            return []
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\uffff", lo=start)
+        # a locality may match on several words
+        matches = dict.fromkeys(
+            locality
+            for locality in self.localities[start:end]
+            if locality[0] in locality_types
+        )
+        return heapq.nlargest(limit, matches, key=itemgetter(2))
+
+
+class LocalityIndex:
+    def __init__(self):
+        zip_codes_by_municipality_id: DefaultDict[int, List[str]] = defaultdict(list)
+        self.municipality_ids_by_zip_code: DefaultDict[str, List[int]] = defaultdict(
+            list
+        )
+        for code, municipality_id in ZipCode.objects.order_by("pk").values_list(
+            "code", "municipality_id"
+        ):
+            code = sys.intern(code)
+            zip_codes_by_municipality_id[municipality_id].append(code)
+            self.municipality_ids_by_zip_code[code].append(municipality_id)
+
+        # id, name, population, zip codes
+        self.municipality_by_id: Dict[int, Tuple[int, str, int, Tuple[str, ...]]] = {}
+        self.department_id_by_municipality_id: Dict[int, int] = {}
+        for (
+            municipality_id,
+            name,
+            population,
+            department_id,
+        ) in Municipality.objects.order_by("pk").values_list(
+            "id", "name", "population", "department_id"
+        ):
+            self.municipality_by_id[municipality_id] = (
+                municipality_id,
+                name,
+                population,
+                tuple(zip_codes_by_municipality_id[municipality_id]),
+            )
+            if department_id is not None:
+                self.department_id_by_municipality_id[municipality_id] = department_id
+
+        # id, name, population, zip codes of the municipalities in their order
+        municipality_ids_by_epci_id: DefaultDict[int, List[int]] = defaultdict(list)
+        self.epci_ids_by_municipality_id: DefaultDict[int, Set[int]] = defaultdict(set)
+        for epci_id, municipality_id in MunicipalityOrderByEPCI.objects.order_by(
+            "sort_order", "pk"
+        ).values_list("epci_id", "municipality_id"):
+            municipality_ids_by_epci_id[epci_id].append(municipality_id)
+            self.epci_ids_by_municipality_id[municipality_id].add(epci_id)
+        self.epci_by_id: Dict[int, Tuple[int, str, int, Tuple[Tuple[str, ...]]]] = {
+            epci_id: (
+                epci_id,
+                name,
+                population,
+                tuple(
+                    self.municipality_by_id[municipality_id][3]
+                    for municipality_id in municipality_ids_by_epci_id[epci_id]
+                ),
+            )
+            for epci_id, name, population in EPCI.objects.values_list(
+                "id", "name", "population"
+            )
+        }
+
+        # id, code, name
+        self.department_by_id: Dict[int, Tuple[int, str, str]] = {}
+        self.region_id_by_department_id: Dict[int, int] = {}
+        for department_id, code, name, region_id in Department.objects.values_list(
+            "id", "code", "name", "region_id"
+        ):
+            self.department_by_id[department_id] = (department_id, code, name)
+            if region_id is not None:
+                self.region_id_by_department_id[department_id] = region_id
+        self.region_by_id: Dict[int, Tuple[int, str, str]] = {
+            region_id: (region_id, code, name)
+            for region_id, code, name in Region.objects.values_list(
+                "id", "code", "name"
+            )
+        }
+
+        self.survey_localities = frozenset(
+            Survey.objects.values_list("survey_locality", flat=True).distinct()
+        )
+        self.name_index = self.build_name_index()
+
+    def build_name_index(self) -> LocalityNameIndex:
+        # departments and regions are ranked by the population of their
+        # municipalities
+        population_by_department_id: DefaultDict[int, int] = defaultdict(int)
+        for (
+            municipality_id,
+            department_id,
+        ) in self.department_id_by_municipality_id.items():
+            population_by_department_id[department_id] += self.municipality_by_id[
+                municipality_id
+            ][2]
+        population_by_region_id: DefaultDict[int, int] = defaultdict(int)
+        for department_id, region_id in self.region_id_by_department_id.items():
+            population_by_region_id[region_id] += population_by_department_id[
+                department_id
+            ]
+
+        localities = [
+            (name, (LocalityType.MUNICIPALITY, municipality_id, population))
+            for municipality_id, name, population, _ in self.municipality_by_id.values()
+        ]
+        localities += [
+            (name, (LocalityType.INTERCOMMUNALITY, epci_id, population))
+            for epci_id, name, population, _ in self.epci_by_id.values()
+        ]
+        localities += [
+            (
+                name,
+                (
+                    LocalityType.DEPARTMENT,
+                    department_id,
+                    population_by_department_id[department_id],
+                ),
+            )
+            for department_id, _, name in self.department_by_id.values()
+        ]
+        localities += [
+            (name, (LocalityType.REGION, region_id, population_by_region_id[region_id]))
+            for region_id, _, name in self.region_by_id.values()
+        ]
+        return LocalityNameIndex(localities)
+
+    def has_survey_for(self, locality_type: str) -> bool:
+        survey_locality = SURVEY_LOCALITY_BY_LOCALITY_TYPE.get(locality_type)
+        return survey_locality is None or survey_locality in self.survey_localities
+
+    def serialize_municipality(self, municipality_id: int) -> dict:
+        municipality_id, name, population, zip_codes = self.municipality_by_id[
+            municipality_id
+        ]
+        return {
+            "id": municipality_id,
+            "name": name,
+            "population": population,
+            "zip_codes": list(zip_codes),
+            "locality_type": LocalityType.MUNICIPALITY,
+        }
+
+    def serialize_epci(self, epci_id: int) -> dict:
+        epci_id, name, population, zip_codes_list = self.epci_by_id[epci_id]
+        return {
+            "id": epci_id,
+            "name": name,
+            "population": population,
+            "zip_codes": [list(zip_codes) for zip_codes in zip_codes_list],
+            "locality_type": LocalityType.INTERCOMMUNALITY,
+        }
+
+    def serialize_department(self, department_id: int) -> dict:
+        department_id, code, name = self.department_by_id[department_id]
+        return {
+            "id": department_id,
+            "code": code,
+            "name": name,
+            "locality_type": LocalityType.DEPARTMENT,
+        }
+
+    def serialize_region(self, region_id: int) -> dict:
+        region_id, code, name = self.region_by_id[region_id]
+        return {
+            "id": region_id,
+            "code": code,
+            "name": name,
+            "locality_type": LocalityType.REGION,
+        }
+
+    def serialize(self, locality_type: str, locality_id: int) -> dict:
+        """Locality serialized as the locality serializers do"""
+        return {
+            LocalityType.MUNICIPALITY: self.serialize_municipality,
+            LocalityType.INTERCOMMUNALITY: self.serialize_epci,
+            LocalityType.DEPARTMENT: self.serialize_department,
+            LocalityType.REGION: self.serialize_region,
+        }[locality_type](locality_id)
+
+    def get_localities(self, zip_code: str) -> Dict[str, List[dict]]:
+        """
+        Localities of a zip code, by locality type. Departments and regions are
+        only included if surveys exist for them.
+        """
+        municipality_ids = sorted(
+            set(self.municipality_ids_by_zip_code.get(zip_code, []))
+        )
+        epci_ids = sorted(
+            {
+                epci_id
+                for municipality_id in municipality_ids
+                for epci_id in self.epci_ids_by_municipality_id.get(municipality_id, [])
+            }
+        )
+        department_ids = sorted(
+            {
+                self.department_id_by_municipality_id[municipality_id]
+                for municipality_id in municipality_ids
+                if municipality_id in self.department_id_by_municipality_id
+            }
+        )
+        region_ids = sorted(
+            {
+                self.region_id_by_department_id[department_id]
+                for department_id in department_ids
+                if department_id in self.region_id_by_department_id
+            }
+        )
+        localities = {}
+        for locality_type, locality_ids in [
+            (LocalityType.MUNICIPALITY, municipality_ids),
+            (LocalityType.INTERCOMMUNALITY, epci_ids),
+            (LocalityType.DEPARTMENT, department_ids),
+            (LocalityType.REGION, region_ids),
+        ]:
+            if self.has_survey_for(locality_type):
+                localities[locality_type] = [
+                    self.serialize(locality_type, locality_id)
+                    for locality_id in locality_ids
+                ]
+        return localities
+
+    def autocomplete(self, query: str, limit: int) -> List[dict]:
+        """
+        Most populated localities with a name, or a word of their name, starting
+        with the query, accents ignored. Departments and regions are only included
+        if surveys exist for them.
+        """
+        return [
+            self.serialize(locality_type, locality_id)
+            for locality_type, locality_id, _ in self.name_index.search(
+                query,
+                limit,
+                {
+                    locality_type
+                    for locality_type in LocalityType
+                    if self.has_survey_for(locality_type)
+                },
+            )
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_compiled_locality_index(revision: str) -> LocalityIndex:
+    return LocalityIndex()
+
+
+def get_locality_index() -> LocalityIndex:
+    """Locality index, built once per revision of the localities"""
+    return get_compiled_locality_index(get_locality_revision())
@@ -0,0 +1,356 @@
+"""
+Loading of the geographic referential.
+
+Regions, departments, municipalities (with their zip codes) and EPCIs (with their
+members) are read from JSON or CSV files, possibly compressed, in the format of
+the geo.api.gouv.fr API: a JSON array (or JSON Lines) of objects with a `code`
+and a `nom`, or a CSV file with the same columns, lists being separated by ";".
+Files are parsed as a stream and the rows are upserted by code in batches with
+bulk queries, the ids of the localities by code being held in memory, so that a
+full load takes seconds and a yearly INSEE update only writes what changed.
+"""
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.apps import apps as django_apps
+
+OPENER_BY_EXTENSION = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+# CSV columns holding a list, and how to read each of their items
+LIST_COLUMNS = {
+    "codesPostaux": lambda code: code,
+    "membres": lambda code: {"code": code},
+}
+
+INTEGER_COLUMNS = ["population", "populationMunicipale", "populationTotale"]
+
+# code of the department of the municipalities which do not have one
+OVERSEAS_CODE = "97"
+
+JSON_BLOCK_SIZE = 64 * 1024
+
+
+def open_referential(path: str) -> io.TextIOBase:
+    opener = OPENER_BY_EXTENSION.get(os.path.splitext(path)[1], open)
+    return opener(path, "rt", encoding="utf-8")
+
+
+def iter_json_objects(file: io.TextIOBase) -> Iterator[dict]:
+    """
+    Objects of a JSON array or of JSON Lines, decoded one at a time from blocks of
+    the file instead of the whole file at once
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    end_of_file = False
+    while True:
+        # skip what separates the objects
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            position += 1
+        try:
+            if position == len(buffer):
+                raise ValueError("empty buffer")
+            obj, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # the object is not complete, read the next block
+            if end_of_file:
+                if buffer[position:].strip():
+                    raise
+                return
+            block = file.read(JSON_BLOCK_SIZE)
+            end_of_file = not block
+            buffer = buffer[position:] + block
+            position = 0
+            continue
+        yield obj
+
+
+def iter_csv_objects(file: io.TextIOBase) -> Iterator[dict]:
+    for row in csv.DictReader(file):
+        for column, read_item in LIST_COLUMNS.items():
+            if column in row:
+                row[column] = [
+                    read_item(item.strip())
+                    for item in (row[column] or "").split(";")
+                    if item.strip()
+                ]
+        for column in INTEGER_COLUMNS:
+            if column in row:
+                row[column] = int(row[column]) if row[column] else None
+        yield row
+
+
+def iter_referential(path: str) -> Iterator[dict]:
+    """Rows of a referential file, read as a stream"""
+    name = path
+    if os.path.splitext(name)[1] in OPENER_BY_EXTENSION:
+        name = os.path.splitext(name)[0]
+    iter_objects = (
+        iter_csv_objects if os.path.splitext(name)[1] == ".csv" else iter_json_objects
+    )
+    with open_referential(path) as file:
+        yield from iter_objects(file)
+
+
+def iter_batches(rows: Iterable[dict], batch_size: int) -> Iterator[List[dict]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+class LocalityLoader:
+    """
+    Upserts localities by code. The models are those of `apps`, so that migrations
+    can load localities with the historical models.
+    """
+
+    def __init__(self, apps=django_apps, batch_size: int = 1000):
+        self.Region = apps.get_model("open_democracy_back", "Region")
+        self.Department = apps.get_model("open_democracy_back", "Department")
+        self.Municipality = apps.get_model("open_democracy_back", "Municipality")
+        self.ZipCode = apps.get_model("open_democracy_back", "ZipCode")
+        self.EPCI = apps.get_model("open_democracy_back", "EPCI")
+        self.MunicipalityOrderByEPCI = apps.get_model(
+            "open_democracy_back", "MunicipalityOrderByEPCI"
+        )
+        self.batch_size = batch_size
+        # number of created, updated... rows by model name
+        self.stats: Counter = Counter()
+        self.id_by_code_by_model: Dict[str, Dict[str, int]] = {}
+
+    def get_id_by_code(self, model) -> Dict[str, int]:
+        if model.__name__ not in self.id_by_code_by_model:
+            # the first of duplicated codes is used
+            self.id_by_code_by_model[model.__name__] = dict(
+                model.objects.order_by("-pk").values_list("code", "pk")
+            )
+        return self.id_by_code_by_model[model.__name__]
+
+    def upsert(
+        self,
+        model,
+        values_by_code: Dict[str, dict],
+        id_by_code: Dict[str, int],
+    ):
+        """Create the localities of unknown codes, update the changed ones"""
+        fields = list(next(iter(values_by_code.values())))
+        current_values_by_id = {
+            values.pop("pk"): values
+            for values in model.objects.filter(
+                pk__in=[
+                    id_by_code[code] for code in values_by_code if code in id_by_code
+                ]
+            ).values("pk", "code", *fields)
+        }
+        to_create = []
+        to_update = []
+        for code, values in values_by_code.items():
+            locality_id = id_by_code.get(code)
+            if locality_id is None:
+                to_create.append(model(code=code, **values))
+            elif current_values_by_id[locality_id] != {"code": code, **values}:
+                to_update.append(model(pk=locality_id, code=code, **values))
+            else:
+                self.stats[f"{model.__name__} unchanged"] += 1
+        if to_create:
+            model.objects.bulk_create(to_create)
+            # ids are not set by bulk_create with every database
+            id_by_code.update(
+                model.objects.filter(
+                    code__in=[locality.code for locality in to_create]
+                ).values_list("code", "pk")
+            )
+            self.stats[f"{model.__name__} created"] += len(to_create)
+        if to_update:
+            model.objects.bulk_update(to_update, ["code", *fields])
+            self.stats[f"{model.__name__} updated"] += len(to_update)
+
+    def load_regions(self, rows: Iterable[dict]):
+        id_by_code = self.get_id_by_code(self.Region)
+        for batch in iter_batches(rows, self.batch_size):
+            self.upsert(
+                self.Region,
+                {row["code"]: {"name": row["nom"]} for row in batch},
+                id_by_code,
+            )
+
+    def load_departments(self, rows: Iterable[dict]):
+        region_id_by_code = self.get_id_by_code(self.Region)
+        id_by_code = self.get_id_by_code(self.Department)
+        for batch in iter_batches(rows, self.batch_size):
+            self.upsert(
+                self.Department,
+                {
+                    row["code"]: {
+                        "name": row["nom"],
+                        "region_id": region_id_by_code.get(row.get("region")),
+                    }
+                    for row in batch
+                },
+                id_by_code,
+            )
+
+    def load_municipalities(self, rows: Iterable[dict]):
+        department_id_by_code = self.get_id_by_code(self.Department)
+        id_by_code = self.get_id_by_code(self.Municipality)
+        zip_code_ids_by_municipality_id: Dict[int, Dict[str, int]] = {}
+        for zip_code_id, code, municipality_id in self.ZipCode.objects.values_list(
+            "pk", "code", "municipality_id"
+        ):
+            zip_code_ids_by_municipality_id.setdefault(municipality_id, {})[
+                code
+            ] = zip_code_id
+
+        for batch in iter_batches(rows, self.batch_size):
+            self.upsert(
+                self.Municipality,
+                {
+                    row["code"]: {
+                        "name": row["nom"],
+                        "department_id": department_id_by_code.get(
+                            row.get("departement") or OVERSEAS_CODE
+                        ),
+                        "population": row.get("population") or 0,
+                    }
+                    for row in batch
+                },
+                id_by_code,
+            )
+
+            zip_codes_to_create = []
+            zip_code_ids_to_delete = []
+            for row in batch:
+                municipality_id = id_by_code[row["code"]]
+                current_zip_code_ids = zip_code_ids_by_municipality_id.get(
+                    municipality_id, {}
+                )
+                zip_codes = set(row.get("codesPostaux") or [])
+                zip_codes_to_create += [
+                    self.ZipCode(code=code, municipality_id=municipality_id)
+                    for code in sorted(zip_codes - current_zip_code_ids.keys())
+                ]
+                zip_code_ids_to_delete += [
+                    zip_code_id
+                    for code, zip_code_id in current_zip_code_ids.items()
+                    if code not in zip_codes
+                ]
+            self.ZipCode.objects.bulk_create(zip_codes_to_create)
+            self.ZipCode.objects.filter(pk__in=zip_code_ids_to_delete).delete()
+            self.stats["ZipCode created"] += len(zip_codes_to_create)
+            self.stats["ZipCode deleted"] += len(zip_code_ids_to_delete)
+
+    def get_epci_id_by_code(self) -> Dict[str, int]:
+        id_by_code = self.get_id_by_code(self.EPCI)
+        # EPCIs were first loaded without their code, they are found by name
+        self.epci_id_without_code_by_name = dict(
+            self.EPCI.objects.filter(code="").order_by("-pk").values_list("name", "pk")
+        )
+        id_by_code.pop("", None)
+        return id_by_code
+
+    def load_epcis(self, rows: Iterable[dict]):
+        id_by_code = self.get_epci_id_by_code()
+        # (municipality id, membership id, sort order) by EPCI id
+        memberships_by_epci_id: Dict[int, List[Tuple[int, int, Optional[int]]]] = {}
+        for (
+            membership_id,
+            epci_id,
+            municipality_id,
+            sort_order,
+        ) in self.MunicipalityOrderByEPCI.objects.order_by(
+            "sort_order", "pk"
+        ).values_list(
+            "pk", "epci_id", "municipality_id", "sort_order"
+        ):
+            memberships_by_epci_id.setdefault(epci_id, []).append(
+                (municipality_id, membership_id, sort_order)
+            )
+
+        for batch in iter_batches(rows, self.batch_size):
+            for row in batch:
+                if (
+                    row["code"] not in id_by_code
+                    and row["nom"] in self.epci_id_without_code_by_name
+                ):
+                    id_by_code[row["code"]] = self.epci_id_without_code_by_name.pop(
+                        row["nom"]
+                    )
+            self.upsert(
+                self.EPCI,
+                {
+                    row["code"]: {
+                        "name": row["nom"],
+                        "population": row.get("populationTotale")
+                        or row.get("populationMunicipale")
+                        or 0,
+                    }
+                    for row in batch
+                },
+                id_by_code,
+            )
+            self.update_memberships(batch, id_by_code, memberships_by_epci_id)
+
+    def update_memberships(
+        self,
+        batch: List[dict],
+        id_by_code: Dict[str, int],
+        memberships_by_epci_id: Dict[int, List[Tuple[int, int, Optional[int]]]],
+    ):
+        municipality_id_by_code = self.get_id_by_code(self.Municipality)
+        to_create = []
+        to_update = []
+        ids_to_delete: List[int] = []
+        for row in batch:
+            epci_id = id_by_code[row["code"]]
+            municipality_ids: List[int] = []
+            seen: Set[int] = set()
+            for member in row.get("membres") or []:
+                municipality_id = municipality_id_by_code.get(member["code"])
+                if municipality_id is None:
+                    self.stats["EPCI member not found"] += 1
+                elif municipality_id not in seen:
+                    seen.add(municipality_id)
+                    municipality_ids.append(municipality_id)
+
+            current_memberships = {
+                municipality_id: (membership_id, sort_order)
+                for municipality_id, membership_id, sort_order in (
+                    memberships_by_epci_id.get(epci_id, [])
+                )
+            }
+            for sort_order, municipality_id in enumerate(municipality_ids):
+                if municipality_id not in current_memberships:
+                    to_create.append(
+                        self.MunicipalityOrderByEPCI(
+                            epci_id=epci_id,
+                            municipality_id=municipality_id,
+                            sort_order=sort_order,
+                        )
+                    )
+                elif current_memberships[municipality_id][1] != sort_order:
+                    to_update.append(
+                        self.MunicipalityOrderByEPCI(
+                            pk=current_memberships[municipality_id][0],
+                            sort_order=sort_order,
+                        )
+                    )
+            ids_to_delete += [
+                membership_id
+                for municipality_id, (membership_id, _) in current_memberships.items()
+                if municipality_id not in seen
+            ]
+        self.MunicipalityOrderByEPCI.objects.bulk_create(to_create)
+        self.MunicipalityOrderByEPCI.objects.bulk_update(to_update, ["sort_order"])
+        self.MunicipalityOrderByEPCI.objects.filter(pk__in=ids_to_delete).delete()
+        self.stats["EPCI member added"] += len(to_create)
+        self.stats["EPCI member moved"] += len(to_update)
+        self.stats["EPCI member removed"] += len(ids_to_delete)
@@ -0,0 +1,52 @@
+from django.core.management import BaseCommand
+
+from open_democracy_back.models import AssessmentDocument
+
+BATCH_SIZE = 500
+
+METADATA_FIELDS = ["file_size", "mime_type", "display_name"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the size, MIME type and display name of the assessment documents "
+        "uploaded before they were stored at upload"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Read the metadata of all the documents, not only those without",
+        )
+
+    def handle(self, *args, **options):
+        documents = AssessmentDocument.objects.exclude(file="")
+        if not options["all"]:
+            documents = documents.filter(file_size=None)
+
+        updated_documents = []
+        missing_count = 0
+        for document in documents.iterator(chunk_size=BATCH_SIZE):
+            try:
+                document.update_file_metadata()
+            except OSError:
+                missing_count += 1
+                self.stderr.write(
+                    f"Document {document.pk}: file {document.file.name} not found"
+                )
+                continue
+            updated_documents.append(document)
+            if len(updated_documents) == BATCH_SIZE:
+                AssessmentDocument.objects.bulk_update(
+                    updated_documents, METADATA_FIELDS
+                )
+                self.stdout.write(f"{BATCH_SIZE} documents updated")
+                updated_documents = []
+        AssessmentDocument.objects.bulk_update(updated_documents, METADATA_FIELDS)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Metadata of the documents stored, {missing_count} files not found"
+            )
+        )
@@ -0,0 +1,74 @@
+import json
+import random
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from open_democracy_back.benchmark import REPETITIONS, get_regressions, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic assessments and measure the time, queries and memory "
+        "of the scoring, the chart data and the representativity. The generated "
+        "data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--responses",
+            type=int,
+            nargs="+",
+            default=[10000],
+            help="Number of responses of each generated assessment",
+        )
+        parser.add_argument("--output", help="File to write the results to as JSON")
+        parser.add_argument(
+            "--baseline", help="JSON results of a previous run to compare against"
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Slowdown compared to the baseline reported as a regression",
+        )
+        parser.add_argument(
+            "--repetitions",
+            type=int,
+            default=REPETITIONS,
+            help="Number of timed runs of each function, whose median is kept",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        results = {"database": connection.vendor, "scales": {}}
+        with transaction.atomic():
+            for response_count in options["responses"]:
+                scale_results = run_benchmark(response_count, options["repetitions"])
+                results["scales"][str(response_count)] = scale_results
+                self.stdout.write(
+                    f"{scale_results['responses']} responses generated in "
+                    f"{scale_results['generation_time']:.1f}s"
+                )
+                for name, measures in scale_results["measures"].items():
+                    self.stdout.write(
+                        f"  {name}: {measures['time']:.3f}s, "
+                        f"{measures['queries']} queries, "
+                        f"{measures['peak_memory_kb']:.0f} kB"
+                    )
+            transaction.set_rollback(True)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = get_regressions(results, baseline, options["tolerance"])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions")
+            self.stdout.write(self.style.SUCCESS("No regression"))
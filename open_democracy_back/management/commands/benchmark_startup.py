@@ -0,0 +1,71 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+# What a web worker does before serving its first request: load the application
+# and the url configuration, which imports every view
+WORKER_STARTUP_CODE = """
+import json
+import resource
+import sys
+import time
+
+start = time.perf_counter()
+from open_democracy_back.wsgi import application
+from django.urls import get_resolver
+
+get_resolver().url_patterns
+duration = time.perf_counter() - start
+print(json.dumps({
+    "import_time": duration,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    # lazily imported modules are in sys.modules before being loaded, their
+    # submodules are not
+    "heavy_modules": [
+        name for name in %r if any(module.startswith(name + ".") for module in sys.modules)
+    ],
+}))
+"""
+
+HEAVY_MODULES = ["numpy", "pandas"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the import time and memory of a web worker starting up, each run "
+        "in a new interpreter"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--output", help="File to write the results to as JSON")
+
+    def handle(self, *args, **options):
+        runs = []
+        for _ in range(options["runs"]):
+            process = subprocess.run(
+                [sys.executable, "-c", WORKER_STARTUP_CODE % HEAVY_MODULES],
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode:
+                raise CommandError(process.stderr)
+            runs.append(json.loads(process.stdout.splitlines()[-1]))
+
+        results = {
+            "runs": len(runs),
+            "median_import_time": statistics.median(run["import_time"] for run in runs),
+            "median_max_rss_kb": statistics.median(run["max_rss_kb"] for run in runs),
+            "heavy_modules": runs[-1]["heavy_modules"],
+        }
+        self.stdout.write(
+            f"Worker startup: {results['median_import_time']:.3f}s, "
+            f"{results['median_max_rss_kb'] / 1024:.1f} MB, heavy modules loaded: "
+            f"{', '.join(results['heavy_modules']) or 'none'}"
+        )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,23 @@
+import datetime
+
+from django.core.management import BaseCommand
+
+from open_democracy_back.document_uploads import delete_expired_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete the document uploads which did not receive any chunk for a while"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=24,
+            help="Hours without any chunk after which an upload is deleted",
+        )
+
+    def handle(self, *args, **options):
+        deleted_count = delete_expired_uploads(
+            datetime.timedelta(hours=options["hours"])
+        )
+        self.stdout.write(f"{deleted_count} expired document uploads deleted")
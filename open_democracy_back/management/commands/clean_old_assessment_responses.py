@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from open_democracy_back.models import ParticipationResponse, AssessmentResponse
+from open_democracy_back.score_aggregates import rebuild_score_aggregates
 
 
 class Command(BaseCommand):
@@ -13,6 +14,9 @@ class Command(BaseCommand):
         self.stdout.write(
             f"There is {assessment_responses_to_change.count()} assessment responses linked to subjective question"
         )
+        assessment_ids = set(
+            assessment_responses_to_change.values_list("assessment_id", flat=True)
+        )
         for assessment_response in assessment_responses_to_change:
             self.stdout.write(
                 f"Assessment response {assessment_response.id} in treatement"
@@ -49,3 +53,4 @@ class Command(BaseCommand):
                 else:
                     closed_with_scale_response_categorie.delete()
             assessment_response.delete()
+        rebuild_score_aggregates(assessment_ids=assessment_ids)
@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from open_democracy_back.bulk_scoring import (
+    LINES_FN_BY_FORMAT,
+    iter_assessments_scores,
+)
+from open_democracy_back.models import Assessment
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the scores of all the assessments with a pool of processes and "
+        "write them as JSON Lines or CSV, with the time taken by each assessment"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ids",
+            type=int,
+            nargs="*",
+            help="Ids of the assessments to score, all of them by default",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.SCORING_WORKERS,
+            help="Number of processes, 1 to compute in the current process",
+        )
+        parser.add_argument(
+            "--format", choices=list(LINES_FN_BY_FORMAT), default="jsonl"
+        )
+        parser.add_argument(
+            "--output", help="File to write the scores to, standard output by default"
+        )
+        parser.add_argument(
+            "--slowest",
+            type=int,
+            default=10,
+            help="Number of slowest assessments to report",
+        )
+
+    def handle(self, *args, **options):
+        assessment_ids = Assessment.objects.order_by("id").values_list("id", flat=True)
+        if options["ids"]:
+            assessment_ids = assessment_ids.filter(id__in=options["ids"])
+        assessment_ids = list(assessment_ids)
+
+        durations = []
+
+        def results_with_durations():
+            for assessment_id, scores, duration in iter_assessments_scores(
+                assessment_ids, options["workers"]
+            ):
+                durations.append((duration, assessment_id))
+                yield assessment_id, scores, duration
+
+        start = time.perf_counter()
+        output = open(options["output"], "w") if options["output"] else self.stdout
+        try:
+            for line in LINES_FN_BY_FORMAT[options["format"]](results_with_durations()):
+                # lines end with a new line, the output wrapper does not add one
+                output.write(line)
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        self.stderr.write(
+            f"{len(assessment_ids)} assessments scored in "
+            f"{time.perf_counter() - start:.2f}s with {options['workers']} workers"
+        )
+        for duration, assessment_id in sorted(durations, reverse=True)[
+            : options["slowest"]
+        ]:
+            self.stderr.write(f"Assessment {assessment_id}: {duration:.3f}s")
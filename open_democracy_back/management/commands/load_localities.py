@@ -0,0 +1,57 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from open_democracy_back.data_versions import bump_locality_revision
+from open_democracy_back.locality_referential import LocalityLoader, iter_referential
+from open_democracy_back.models import Assessment
+
+# loaded in this order, as each kind refers to the previous ones by code
+LOAD_METHOD_BY_OPTION = {
+    "regions": "load_regions",
+    "departments": "load_departments",
+    "municipalities": "load_municipalities",
+    "epcis": "load_epcis",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update by code the regions, departments, municipalities and "
+        "EPCIs of JSON or CSV referential files, possibly compressed (.gz, .bz2, .xz)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--regions", help="File of the regions")
+        parser.add_argument("--departments", help="File of the departments")
+        parser.add_argument(
+            "--municipalities", help="File of the municipalities with their zip codes"
+        )
+        parser.add_argument("--epcis", help="File of the EPCIs with their members")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would change, nothing is saved",
+        )
+
+    def handle(self, *args, **options):
+        loader = LocalityLoader(batch_size=options["batch_size"])
+        with transaction.atomic():
+            for option, load_method in LOAD_METHOD_BY_OPTION.items():
+                if options[option]:
+                    self.stdout.write(f"Loading {option} from {options[option]}")
+                    getattr(loader, load_method)(iter_referential(options[option]))
+            # the localities are bulk created and updated, without signals
+            bump_locality_revision()
+            Assessment.objects.update_localities()
+            for name, count in sorted(loader.stats.items()):
+                self.stdout.write(f"{name}: {count}")
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+                self.stdout.write("Dry run, nothing saved")
+                return
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Localities loaded, run update_index to update the search index"
+            )
+        )
@@ -0,0 +1,79 @@
+from django.core.management import BaseCommand, CommandError
+
+from open_democracy_back.models import Assessment, RepresentativityCount
+from open_democracy_back.representativity_counts import (
+    COUNT_FIELDS,
+    compute_published_results,
+    compute_representativity_counts,
+    rebuild_representativity_counts,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the representativity counts and the published results of the "
+        "assessments from the responses, and check them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--assessment",
+            type=int,
+            nargs="*",
+            help="Ids of the assessments to rebuild, all of them by default",
+        )
+        parser.add_argument(
+            "--check-only",
+            action="store_true",
+            help="Only check the current counts, do not rebuild them",
+        )
+
+    def handle(self, *args, **options):
+        assessment_ids = options["assessment"]
+        if not options["check_only"]:
+            rebuild_representativity_counts(assessment_ids=assessment_ids)
+            self.stdout.write("Representativity counts rebuilt")
+
+        counts = RepresentativityCount.objects.filter(count__gt=0)
+        assessments = Assessment.objects.all()
+        if assessment_ids:
+            counts = counts.filter(assessment_id__in=assessment_ids)
+            assessments = assessments.filter(id__in=assessment_ids)
+
+        expected_counts = compute_representativity_counts(assessment_ids)
+        stored_counts = {
+            row[:3]: row[3] for row in counts.values_list(*COUNT_FIELDS, "count")
+        }
+        errors = 0
+        for key in stored_counts.keys() | expected_counts.keys():
+            if stored_counts.get(key, 0) != expected_counts.get(key, 0):
+                errors += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Assessment {key[0]} criteria {key[1]} choice {key[2]}: "
+                        f"count {stored_counts.get(key, 0)} != responses "
+                        f"{expected_counts.get(key, 0)}"
+                    )
+                )
+
+        expected_published_results = compute_published_results(assessment_ids)
+        for assessment_id, published_results in assessments.values_list(
+            "id", "published_results"
+        ):
+            if published_results != expected_published_results[assessment_id]:
+                errors += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Assessment {assessment_id}: published results "
+                        f"{published_results} != {not published_results}"
+                    )
+                )
+
+        if errors:
+            raise CommandError(f"{errors} differences with the responses")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Representativity counts of {assessments.count()} assessments "
+                f"match the responses"
+            )
+        )
@@ -0,0 +1,51 @@
+from django.core.management import BaseCommand
+from django.db.models import Q
+
+from open_democracy_back.data_versions import bump_assessment_data_versions
+from open_democracy_back.models import Assessment
+from open_democracy_back.representativity_counts import (
+    rebuild_representativity_counts,
+)
+from open_democracy_back.score_aggregates import rebuild_score_aggregates
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild from the responses the question score aggregates, the "
+        "representativity counts and the published results of the assessments, "
+        "for instance after users became known or unknown outside of the app"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--assessment",
+            type=int,
+            nargs="*",
+            help="Ids of the assessments to rebuild, all of them by default",
+        )
+        parser.add_argument(
+            "--user",
+            type=int,
+            nargs="*",
+            help="Ids of users whose assessments are rebuilt",
+        )
+
+    def handle(self, *args, **options):
+        assessment_ids = None
+        if options["assessment"] or options["user"]:
+            user_ids = options["user"] or []
+            assessment_ids = set(options["assessment"] or []) | set(
+                Assessment.objects.filter(
+                    Q(participations__user_id__in=user_ids)
+                    | Q(responses__answered_by_id__in=user_ids)
+                ).values_list("id", flat=True)
+            )
+
+        rebuild_score_aggregates(assessment_ids=assessment_ids)
+        rebuild_representativity_counts(assessment_ids=assessment_ids)
+        if assessment_ids is None:
+            assessment_ids = Assessment.objects.values_list("id", flat=True)
+        bump_assessment_data_versions(assessment_ids)
+        self.stdout.write(
+            "Question score aggregates and representativity counts rebuilt"
+        )
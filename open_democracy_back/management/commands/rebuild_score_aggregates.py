@@ -0,0 +1,106 @@
+import math
+
+from django.core.management import BaseCommand, CommandError
+
+from open_democracy_back.models import Assessment, QuestionScoreAggregate
+from open_democracy_back.score_aggregates import (
+    compute_score_aggregates,
+    get_scores_by_assessment_pk_from_aggregates,
+    rebuild_score_aggregates,
+)
+from open_democracy_back.scoring import get_scores_by_assessment_pk_with_queries
+
+
+def are_close(value, other_value):
+    if value is None or other_value is None:
+        return value is other_value
+    return math.isclose(value, other_value, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def get_score_differences(scores, expected_scores):
+    differences = []
+    for key, expected_score_by_id in expected_scores.items():
+        score_by_id = scores[key]
+        for item_id in score_by_id.keys() | expected_score_by_id.keys():
+            score = score_by_id.get(item_id)
+            expected_score = expected_score_by_id.get(item_id)
+            if not are_close(score, expected_score):
+                differences.append(f"{key} {item_id}: {score} != {expected_score}")
+    return differences
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the question score aggregates from the responses and check them "
+        "against a full recompute of the scores"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--assessment",
+            type=int,
+            nargs="*",
+            help="Ids of the assessments to rebuild, all of them by default",
+        )
+        parser.add_argument(
+            "--check-only",
+            action="store_true",
+            help="Only check the current aggregates, do not rebuild them",
+        )
+
+    def handle(self, *args, **options):
+        assessment_ids = options["assessment"]
+        if not options["check_only"]:
+            rebuild_score_aggregates(assessment_ids=assessment_ids)
+            self.stdout.write("Question score aggregates rebuilt")
+
+        aggregates = QuestionScoreAggregate.objects.filter(response_count__gt=0)
+        assessments = Assessment.objects.all()
+        if assessment_ids:
+            aggregates = aggregates.filter(assessment_id__in=assessment_ids)
+            assessments = assessments.filter(id__in=assessment_ids)
+
+        expected_aggregates = compute_score_aggregates(assessment_ids=assessment_ids)
+        stored_aggregates = {
+            (assessment_id, question_id): (value_sum, response_count)
+            for assessment_id, question_id, value_sum, response_count in aggregates.values_list(
+                "assessment_id", "question_id", "value_sum", "response_count"
+            )
+        }
+        errors = 0
+        for key in stored_aggregates.keys() | expected_aggregates.keys():
+            value_sum, response_count = stored_aggregates.get(key, (0, 0))
+            expected_value_sum, expected_response_count = expected_aggregates.get(
+                key, (0, 0)
+            )
+            if response_count != expected_response_count or not are_close(
+                value_sum, expected_value_sum
+            ):
+                errors += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Assessment {key[0]} question {key[1]}: aggregate "
+                        f"({value_sum}, {response_count}) != responses "
+                        f"({expected_value_sum}, {expected_response_count})"
+                    )
+                )
+
+        for assessment_id in assessments.values_list("id", flat=True):
+            differences = get_score_differences(
+                get_scores_by_assessment_pk_from_aggregates(assessment_id),
+                get_scores_by_assessment_pk_with_queries(assessment_id),
+            )
+            for difference in differences:
+                self.stdout.write(
+                    self.style.ERROR(f"Assessment {assessment_id}: {difference}")
+                )
+            errors += len(differences)
+
+        if errors:
+            raise CommandError(f"{errors} differences with the full recompute")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Question score aggregates of {assessments.count()} assessments "
+                f"match the full recompute"
+            )
+        )
@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from open_democracy_back.bulk_profiles import (
+    CHUNK_SIZE,
+    get_participations_to_recompute,
+    iter_recomputed_profiles,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the profiles of the participations from the current rules of the "
+        "profile types, by chunks of participations and with a pool of processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--survey", type=int, help="Id of the survey of the participations"
+        )
+        parser.add_argument(
+            "--assessment", type=int, help="Id of the assessment of the participations"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Number of participations recomputed at once",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.SCORING_WORKERS,
+            help="Number of processes, 1 to recompute in the current process",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the profiles which would be added or removed",
+        )
+
+    def handle(self, *args, **options):
+        participations = get_participations_to_recompute(
+            survey_id=options["survey"], assessment_id=options["assessment"]
+        )
+        total = participations.count()
+
+        start = time.perf_counter()
+        done = added = removed = 0
+        for diff in iter_recomputed_profiles(
+            participations,
+            options["chunk_size"],
+            options["workers"],
+            dry_run=options["dry_run"],
+        ):
+            done += diff.participations
+            added += diff.added
+            removed += diff.removed
+            self.stderr.write(
+                f"{done}/{total} participations, "
+                f"{added} profiles added, {removed} removed"
+            )
+
+        self.stdout.write(
+            f"{'Would recompute' if options['dry_run'] else 'Recomputed'} the "
+            f"profiles of {done} participations in "
+            f"{time.perf_counter() - start:.2f}s: {added} added, {removed} removed"
+        )
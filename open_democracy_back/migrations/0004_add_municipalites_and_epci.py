@@ -1,55 +1,47 @@
 # Generated by Django 3.2.12 on 2022-06-30 15:09
 
+import logging
+import os
+
 from django.db import migrations
 from django.conf import settings
-from open_democracy_back.data.regions import REGIONS
-from open_democracy_back.data.departements import DEPARTEMENTS
-from open_democracy_back.data.epci import EPCI as EPCIS
-from open_democracy_back.data.communes import COMMUNES
-
-
-def addMunicipalitiesAndEPCI(apps, _):
-    if settings.IS_TEST:
-        return
-    Municipality = apps.get_model("open_democracy_back", "Municipality")
-    Region = apps.get_model("open_democracy_back", "Region")
-    Department = apps.get_model("open_democracy_back", "Department")
-    EPCI = apps.get_model("open_democracy_back", "EPCI")
-    ZipCode = apps.get_model("open_democracy_back", "ZipCode")
-    MunicipalityOrderByEPCI = apps.get_model("open_democracy_back", "MunicipalityOrderByEPCI")
-
-    bulk_region = []
-    for region in REGIONS:
-        bulk_region.append(Region(name=region["nom"], code=region["code"]))
-    bulk_region.append(Region(name="Région d'outre-mer", code="97"))
-    Region.objects.bulk_create(bulk_region)
-    regions = { region.code: region for region in Region.objects.all() }
 
-    bulk_department = []
-    for department in DEPARTEMENTS:
-        bulk_department.append(Department(name=department["nom"], code=department["code"], region=regions[department["region"]]))
-    bulk_department.append(Department(name="Département d'outre-mer", code="97", region=regions["97"]))
+from open_democracy_back.locality_referential import LocalityLoader, iter_referential
 
-    Department.objects.bulk_create(bulk_department)
-    departments = { department.code: department for department in Department.objects.all() }
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
-    for commune_dict in COMMUNES:
-        department_code = commune_dict.get("departement", "97")
-        commune = Municipality(code=commune_dict["code"], name=commune_dict["nom"], department=departments[department_code], population=commune_dict.get("population", 0))
-        commune.save()
-        for zip_code_value in commune_dict.get("codesPostaux", []):
-            ZipCode(code=zip_code_value, municipality=commune).save()
+logger = logging.getLogger(__name__)
 
 
-    for epci_dict in EPCIS:
-        member_codes = [member["code"] for member in epci_dict["membres"]]
-        municipalities = Municipality.objects.filter(code__in=member_codes)
-        epci = EPCI(name=epci_dict["nom"], population=epci_dict.get("populationTotale") or epci_dict.get("populationMunicipale", 0))
-        epci.save()
-        bulk_municipality_order_by_EPCI = []
-        for municipality in municipalities:
-            bulk_municipality_order_by_EPCI.append(MunicipalityOrderByEPCI(epci=epci, municipality=municipality))
-        MunicipalityOrderByEPCI.objects.bulk_create(bulk_municipality_order_by_EPCI)
+def addMunicipalitiesAndEPCI(apps, _):
+    if settings.IS_TEST:
+        return
+    loader = LocalityLoader(apps)
+    loader.load_regions(
+        [
+            *iter_referential(os.path.join(DATA_DIR, "regions.json.gz")),
+            {"nom": "Région d'outre-mer", "code": "97"},
+        ]
+    )
+    loader.load_departments(
+        [
+            *iter_referential(os.path.join(DATA_DIR, "departements.json.gz")),
+            {"nom": "Département d'outre-mer", "code": "97", "region": "97"},
+        ]
+    )
+
+    # the municipalities are not versioned, they are loaded afterwards with the
+    # load_localities command if missing
+    communes_path = os.path.join(DATA_DIR, "communes.json.gz")
+    if not os.path.exists(communes_path):
+        logger.warning(
+            "Municipalities and EPCIs not loaded, load them with: python "
+            "manage.py load_localities --municipalities <communes> --epcis %s",
+            os.path.join(DATA_DIR, "epci.json.gz"),
+        )
+        return
+    loader.load_municipalities(iter_referential(communes_path))
+    loader.load_epcis(iter_referential(os.path.join(DATA_DIR, "epci.json.gz")))
 
 
 def removeMunicipalitiesAndEPCI(apps, _):
@@ -60,14 +52,14 @@ def removeMunicipalitiesAndEPCI(apps, _):
     apps.get_model("open_democracy_back", "Department").objects.all().delete()
     apps.get_model("open_democracy_back", "EPCI").objects.all().delete()
     apps.get_model("open_democracy_back", "ZipCode").objects.all().delete()
-    apps.get_model("open_democracy_back", "MunicipalityOrderByEPCI").objects.all().delete()
-
+    apps.get_model(
+        "open_democracy_back", "MunicipalityOrderByEPCI"
+    ).objects.all().delete()
 
 
 class Migration(migrations.Migration):
-
     dependencies = [
-        ('open_democracy_back', '0003_add_assessment_types'),
+        ("open_democracy_back", "0003_add_assessment_types"),
     ]
 
     operations = [
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("open_democracy_back", "0065_alter_blogpost_title_alter_resource_title"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionScoreAggregate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "value_sum",
+                    models.FloatField(default=0, verbose_name="Somme des valeurs"),
+                ),
+                (
+                    "response_count",
+                    models.IntegerField(default=0, verbose_name="Nombre de réponses"),
+                ),
+                (
+                    "assessment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_score_aggregates",
+                        to="open_democracy_back.assessment",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="score_aggregates",
+                        to="open_democracy_back.question",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("assessment", "question")},
+            },
+        ),
+    ]
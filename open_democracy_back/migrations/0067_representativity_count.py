@@ -0,0 +1,172 @@
+# Generated by Django 5.0.14 on 2026-10-18 00:20
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+from open_democracy_back.models.representativity_models import (
+    get_acceptability_threshold_considered,
+    is_representativity_respected,
+)
+
+
+def build_representativity_counts(apps, schema_editor):
+    Assessment = apps.get_model("open_democracy_back", "Assessment")
+    AssessmentRepresentativity = apps.get_model(
+        "open_democracy_back", "AssessmentRepresentativity"
+    )
+    ParticipationResponse = apps.get_model(
+        "open_democracy_back", "ParticipationResponse"
+    )
+    RepresentativityCount = apps.get_model(
+        "open_democracy_back", "RepresentativityCount"
+    )
+    RepresentativityCriteria = apps.get_model(
+        "open_democracy_back", "RepresentativityCriteria"
+    )
+    ResponseChoice = apps.get_model("open_democracy_back", "ResponseChoice")
+
+    criteria_id_by_question_id = {
+        question_id: criteria_id
+        for criteria_id, question_id in RepresentativityCriteria.objects.values_list(
+            "id", "profiling_question_id"
+        )
+    }
+    counts = []
+    for row in (
+        ParticipationResponse.objects.filter(
+            question_id__in=criteria_id_by_question_id,
+            participation__user__is_unknown_user=False,
+            unique_choice_response__isnull=False,
+        )
+        .values(
+            "participation__assessment_id", "question_id", "unique_choice_response_id"
+        )
+        .annotate(count=Count("id"))
+    ):
+        counts.append(
+            RepresentativityCount(
+                assessment_id=row["participation__assessment_id"],
+                representativity_criteria_id=criteria_id_by_question_id[
+                    row["question_id"]
+                ],
+                response_choice_id=row["unique_choice_response_id"],
+                count=row["count"],
+            )
+        )
+    RepresentativityCount.objects.bulk_create(counts, batch_size=1000)
+
+    count_by_key = {}
+    total_by_representativity = defaultdict(int)
+    for count in counts:
+        representativity_key = (count.assessment_id, count.representativity_criteria_id)
+        count_by_key[(*representativity_key, count.response_choice_id)] = count.count
+        total_by_representativity[representativity_key] += count.count
+    choices_by_question_id = defaultdict(list)
+    for question_id, response_choice_id, ignore_for_acceptability_threshold in (
+        ResponseChoice.objects.filter(question_id__in=criteria_id_by_question_id)
+        .exclude(representativity_criteria_rule__totally_ignore=True)
+        .values_list(
+            "question_id",
+            "id",
+            "representativity_criteria_rule__ignore_for_acceptability_threshold",
+        )
+    ):
+        choices_by_question_id[question_id].append(
+            (response_choice_id, ignore_for_acceptability_threshold)
+        )
+
+    unpublished_assessment_ids = set()
+    for representativity in AssessmentRepresentativity.objects.select_related(
+        "representativity_criteria"
+    ):
+        criteria = representativity.representativity_criteria
+        representativity_key = (representativity.assessment_id, criteria.id)
+        if not is_representativity_respected(
+            total_by_representativity[representativity_key],
+            [
+                (
+                    count_by_key.get((*representativity_key, response_choice_id), 0),
+                    ignore,
+                )
+                for response_choice_id, ignore in choices_by_question_id[
+                    criteria.profiling_question_id
+                ]
+            ],
+            get_acceptability_threshold_considered(
+                representativity.acceptability_threshold, criteria.min_rate
+            ),
+        ):
+            unpublished_assessment_ids.add(representativity.assessment_id)
+    Assessment.objects.filter(pk__in=unpublished_assessment_ids).update(
+        published_results=False
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("open_democracy_back", "0066_question_score_aggregate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assessment",
+            name="published_results",
+            field=models.BooleanField(
+                db_index=True,
+                default=True,
+                editable=False,
+                verbose_name="résultats publiés",
+            ),
+        ),
+        migrations.CreateModel(
+            name="RepresentativityCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "count",
+                    models.IntegerField(default=0, verbose_name="Nombre de réponses"),
+                ),
+                (
+                    "assessment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="representativity_counts",
+                        to="open_democracy_back.assessment",
+                    ),
+                ),
+                (
+                    "representativity_criteria",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="counts",
+                        to="open_democracy_back.representativitycriteria",
+                    ),
+                ),
+                (
+                    "response_choice",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="representativity_counts",
+                        to="open_democracy_back.responsechoice",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {
+                    ("assessment", "representativity_criteria", "response_choice")
+                },
+            },
+        ),
+        migrations.RunPython(build_representativity_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("open_democracy_back", "0067_representativity_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assessmentdocument",
+            name="display_name",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=255,
+                verbose_name="nom du fichier",
+            ),
+        ),
+        migrations.AddField(
+            model_name="assessmentdocument",
+            name="file_size",
+            field=models.BigIntegerField(
+                blank=True, editable=False, null=True, verbose_name="taille du fichier"
+            ),
+        ),
+        migrations.AddField(
+            model_name="assessmentdocument",
+            name="mime_type",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=255,
+                null=True,
+                verbose_name="type MIME",
+            ),
+        ),
+    ]
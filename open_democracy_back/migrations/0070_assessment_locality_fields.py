@@ -0,0 +1,90 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:07
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+LOCALITY_FIELD_BY_LOCALITY_TYPE = {
+    "municipality": "municipality",
+    "intercommunality": "epci",
+    "department": "department",
+    "region": "region",
+}
+
+
+def fill_locality_fields(apps, schema_editor):
+    Assessment = apps.get_model("open_democracy_back", "Assessment")
+    Municipality = apps.get_model("open_democracy_back", "Municipality")
+
+    population_by_department_id = defaultdict(int)
+    population_by_region_id = defaultdict(int)
+    for department_id, region_id, population in Municipality.objects.filter(
+        department__isnull=False
+    ).values_list("department_id", "department__region_id", "population"):
+        population_by_department_id[department_id] += population
+        if region_id is not None:
+            population_by_region_id[region_id] += population
+
+    assessments = []
+    for assessment in Assessment.objects.select_related(
+        "municipality", "epci", "department", "region"
+    ):
+        field = LOCALITY_FIELD_BY_LOCALITY_TYPE.get(assessment.locality_type)
+        locality = getattr(assessment, field) if field else None
+        if locality is None:
+            continue
+        assessment.locality_code = locality.code
+        assessment.locality_name = locality.name
+        if field == "department":
+            assessment.locality_population = population_by_department_id.get(
+                locality.pk
+            )
+        elif field == "region":
+            assessment.locality_population = population_by_region_id.get(locality.pk)
+        else:
+            assessment.locality_population = locality.population
+        assessments.append(assessment)
+    Assessment.objects.bulk_update(
+        assessments,
+        ["locality_code", "locality_name", "locality_population"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("open_democracy_back", "0069_assessment_document_upload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assessment",
+            name="locality_code",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=100,
+                verbose_name="code de la localité",
+            ),
+        ),
+        migrations.AddField(
+            model_name="assessment",
+            name="locality_name",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=255,
+                verbose_name="nom de la localité",
+            ),
+        ),
+        migrations.AddField(
+            model_name="assessment",
+            name="locality_population",
+            field=models.IntegerField(
+                editable=False, null=True, verbose_name="population de la localité"
+            ),
+        ),
+        migrations.RunPython(fill_locality_fields, migrations.RunPython.noop),
+    ]
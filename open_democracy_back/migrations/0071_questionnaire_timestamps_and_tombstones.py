@@ -0,0 +1,93 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:18
+
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("open_democracy_back", "0070_assessment_locality_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="criteria",
+            name="created",
+            field=model_utils.fields.AutoCreatedField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="created",
+            ),
+        ),
+        migrations.AddField(
+            model_name="criteria",
+            name="modified",
+            field=model_utils.fields.AutoLastModifiedField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="modified",
+            ),
+        ),
+        migrations.AddField(
+            model_name="marker",
+            name="created",
+            field=model_utils.fields.AutoCreatedField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="created",
+            ),
+        ),
+        migrations.AddField(
+            model_name="marker",
+            name="modified",
+            field=model_utils.fields.AutoLastModifiedField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="modified",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pillar",
+            name="created",
+            field=model_utils.fields.AutoCreatedField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="created",
+            ),
+        ),
+        migrations.AddField(
+            model_name="pillar",
+            name="modified",
+            field=model_utils.fields.AutoLastModifiedField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="modified",
+            ),
+        ),
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model_name", models.CharField(max_length=64)),
+                ("object_id", models.IntegerField()),
+                ("deleted", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["model_name", "deleted"],
+                        name="open_democr_model_n_79bb37_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+from open_democracy_back.score_aggregates import VALUE_BY_QUESTION_TYPE
+
+
+def build_question_score_aggregates(apps, schema_editor):
+    AssessmentResponse = apps.get_model("open_democracy_back", "AssessmentResponse")
+    ParticipationResponse = apps.get_model(
+        "open_democracy_back", "ParticipationResponse"
+    )
+    QuestionScoreAggregate = apps.get_model(
+        "open_democracy_back", "QuestionScoreAggregate"
+    )
+
+    # the accounted responses, as filtered by the querysets of the models
+    accounted_responses = [
+        (
+            ParticipationResponse.objects.filter(
+                participation__user__is_unknown_user=False,
+                question__profiling_question=False,
+            )
+            .exclude(has_passed=True)
+            .exclude(question__criteria=None),
+            "participation__assessment_id",
+        ),
+        (
+            AssessmentResponse.objects.filter(
+                answered_by__is_unknown_user=False
+            ).exclude(has_passed=True),
+            "assessment_id",
+        ),
+    ]
+    aggregates = defaultdict(lambda: [0.0, 0])
+    for responses, assessment_field in accounted_responses:
+        for question_type, value in VALUE_BY_QUESTION_TYPE.items():
+            for assessment_id, question_id, response_value in (
+                responses.filter(question__type=question_type)
+                .annotate(value=value)
+                .values_list(assessment_field, "question_id", "value")
+            ):
+                if response_value is not None:
+                    aggregates[(assessment_id, question_id)][0] += response_value
+                    aggregates[(assessment_id, question_id)][1] += 1
+
+    QuestionScoreAggregate.objects.all().delete()
+    QuestionScoreAggregate.objects.bulk_create(
+        [
+            QuestionScoreAggregate(
+                assessment_id=assessment_id,
+                question_id=question_id,
+                value_sum=value_sum,
+                response_count=response_count,
+            )
+            for (assessment_id, question_id), (
+                value_sum,
+                response_count,
+            ) in aggregates.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("open_democracy_back", "0071_questionnaire_timestamps_and_tombstones"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            build_question_score_aggregates, migrations.RunPython.noop
+        ),
+    ]
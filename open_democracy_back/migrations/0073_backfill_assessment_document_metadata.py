@@ -0,0 +1,46 @@
+import logging
+
+from django.db import migrations
+
+from open_democracy_back.models.assessment_models import get_file_metadata
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def backfill_assessment_document_metadata(apps, schema_editor):
+    AssessmentDocument = apps.get_model("open_democracy_back", "AssessmentDocument")
+
+    documents = []
+    for document in (
+        AssessmentDocument.objects.exclude(file="")
+        .filter(file_size=None)
+        .iterator(chunk_size=BATCH_SIZE)
+    ):
+        try:
+            metadata = get_file_metadata(document.file)
+        except OSError:
+            # read from the file when serialized, see Base64FileField
+            logger.warning(
+                "Document %s: file %s not found", document.pk, document.file.name
+            )
+            continue
+        for field, value in metadata.items():
+            setattr(document, field, value)
+        documents.append(document)
+    AssessmentDocument.objects.bulk_update(
+        documents, ["file_size", "mime_type", "display_name"], batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("open_democracy_back", "0072_build_question_score_aggregates"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_assessment_document_metadata, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,41 @@
+from rest_framework.mixins import ListModelMixin
+from rest_framework.response import Response
+
+from open_democracy_back.exceptions import ErrorCode, ValidationFieldError
+from open_democracy_back.questionnaire_sync import (
+    get_deleted_ids,
+    get_sync_timestamp,
+    parse_since,
+)
+
+
+class DeltaSyncListModelMixin(ListModelMixin):
+    """
+    List the objects, or with `?since=<ISO 8601 date>` only the objects created or
+    modified since then and the ids of the objects deleted since then. The returned
+    timestamp is the `since` of the next synchronization.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if "since" not in request.GET:
+            return super().list(request, *args, **kwargs)
+
+        since = parse_since(request.GET["since"])
+        if since is None:
+            raise ValidationFieldError(
+                "since",
+                detail="Since must be an ISO 8601 date",
+                code=ErrorCode.INCORRECT_SINCE.value,
+            )
+        timestamp = get_sync_timestamp()
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(
+            queryset.filter(modified__gte=since), many=True
+        )
+        return Response(
+            {
+                "timestamp": timestamp,
+                "results": serializer.data,
+                "deleted_ids": get_deleted_ids(queryset, since),
+            }
+        )
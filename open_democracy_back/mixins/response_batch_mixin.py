@@ -0,0 +1,24 @@
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class ResponseBatchModelMixin:
+    """
+    Create or update responses with one upsert.
+    Use `save_batch` to save a batch of responses and return the result of each one,
+    a single response being saved as a batch of one response.
+    """
+
+    def create(self, request, *args, **kwargs):
+        # the owner of the response is given with the response
+        result = self.save_batch({**request.data, "responses": [request.data]})[0]
+        if result["status"] == status.HTTP_400_BAD_REQUEST:
+            raise ValidationError(result["errors"])
+        return Response(result["response"], status=result["status"])
+
+    @action(detail=False, methods=["POST"])
+    def batch(self, request):
+        """Save several responses at once"""
+        return Response({"results": self.save_batch(request.data)})
@@ -6,4 +6,5 @@ from .representativity_models import *  # noqa: F403, F401
 from .contents_models import *  # noqa: F403, F401
 from .settings_models import *  # noqa: F403, F401
 from .animator_models import *  # noqa: F403, F401
+from .scoring_models import *  # noqa: F403, F401
 from .training_models import Training  # noqa: F403, F401
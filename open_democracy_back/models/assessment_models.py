@@ -1,6 +1,13 @@
+import mimetypes
+import os
+import re
+import uuid
+
 from django import forms
+from django.conf import settings
 from django.db import models
-from django.db.models import Q
+from django.db.models import OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from model_utils.models import TimeStampedModel
 from modelcluster.fields import ParentalKey
@@ -232,12 +239,61 @@ class AssessmentType(models.Model):
         verbose_name_plural = _("Types d'évaluation")
 
 
+LOCALITY_FIELD_BY_LOCALITY_TYPE = {
+    LocalityType.MUNICIPALITY: "municipality",
+    LocalityType.INTERCOMMUNALITY: "epci",
+    LocalityType.DEPARTMENT: "department",
+    LocalityType.REGION: "region",
+}
+
+
+def get_locality_population_subquery(municipality_filter: str):
+    """Sum of the population of the municipalities of a department or region"""
+    return Subquery(
+        Municipality.objects.filter(**{municipality_filter: OuterRef("pk")})
+        .order_by()
+        .values(municipality_filter)
+        .annotate(population=Sum("population"))
+        .values("population")
+    )
+
+
 class AssessmentQueryset(models.QuerySet):
     def filter_has_details(self, user_id):
         return self.filter(
             Q(initiated_by_user_id=user_id) | Q(experts__id=user_id)
         ).distinct()
 
+    def update_localities(self):
+        """Copy on the assessments the population, code and name of their locality"""
+        for locality_type, locality_queryset in [
+            (LocalityType.MUNICIPALITY, Municipality.objects.all()),
+            (LocalityType.INTERCOMMUNALITY, EPCI.objects.all()),
+            (
+                LocalityType.DEPARTMENT,
+                Department.objects.annotate(
+                    population=get_locality_population_subquery("department")
+                ),
+            ),
+            (
+                LocalityType.REGION,
+                Region.objects.annotate(
+                    population=get_locality_population_subquery("department__region")
+                ),
+            ),
+        ]:
+            locality_field = LOCALITY_FIELD_BY_LOCALITY_TYPE[locality_type]
+            locality = locality_queryset.filter(pk=OuterRef(f"{locality_field}_id"))
+            self.filter(locality_type=locality_type).update(
+                locality_population=Subquery(locality.values("population")[:1]),
+                locality_code=Coalesce(
+                    Subquery(locality.values("code")[:1]), Value("")
+                ),
+                locality_name=Coalesce(
+                    Subquery(locality.values("name")[:1]), Value("")
+                ),
+            )
+
 
 @register_snippet
 class Assessment(TimeStampedModel, ClusterableModel):
@@ -349,37 +405,87 @@ class Assessment(TimeStampedModel, ClusterableModel):
     )
     calendar = FrontendRichText(verbose_name=_("calendrier"), blank=True, default="")
 
+    # whether all the representativity criteria are respected, updated with the
+    # representativity counts and thresholds
+    published_results = models.BooleanField(
+        default=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_("résultats publiés"),
+    )
+
+    # copied from the locality when it changes, so that they are read without
+    # fetching the locality, and from the localities when they are loaded
+    locality_population = models.IntegerField(
+        verbose_name=_("population de la localité"), null=True, editable=False
+    )
+    locality_code = models.CharField(
+        verbose_name=_("code de la localité"),
+        max_length=100,
+        blank=True,
+        default="",
+        editable=False,
+    )
+    locality_name = models.CharField(
+        verbose_name=_("nom de la localité"),
+        max_length=255,
+        blank=True,
+        default="",
+        editable=False,
+    )
+
     objects = AssessmentQueryset.as_manager()
 
-    @property
-    def published_results(self):
-        return all(
-            [
-                representativity.respected
-                for representativity in self.representativities.all()
-            ]
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_locality_key = instance.get_locality_key()
+        return instance
+
+    def get_locality_key(self):
+        return (
+            self.locality_type,
+            self.__dict__.get("municipality_id"),
+            self.__dict__.get("epci_id"),
+            self.__dict__.get("department_id"),
+            self.__dict__.get("region_id"),
         )
 
+    def get_locality(self):
+        field = LOCALITY_FIELD_BY_LOCALITY_TYPE.get(self.locality_type)
+        return getattr(self, field) if field else None
+
+    def update_locality_fields(self):
+        locality = self.get_locality()
+        if locality is None:
+            self.locality_population = None
+            self.locality_code = ""
+            self.locality_name = ""
+            return
+        self.locality_code = locality.code
+        self.locality_name = locality.name
+        if self.locality_type == LocalityType.DEPARTMENT:
+            municipalities = Municipality.objects.filter(department=locality)
+        elif self.locality_type == LocalityType.REGION:
+            municipalities = Municipality.objects.filter(department__region=locality)
+        else:
+            self.locality_population = locality.population
+            return
+        self.locality_population = municipalities.aggregate(
+            population=Sum("population")
+        )["population"]
+
     @property
     def population(self):
-        if self.locality_type == LocalityType.MUNICIPALITY:
-            return self.municipality.population
-        if self.locality_type == LocalityType.INTERCOMMUNALITY:
-            return self.epci.population
+        return self.locality_population
 
     @property
     def collectivity_name(self):
-        if self.locality_type == LocalityType.MUNICIPALITY:
-            return self.municipality.name
-        if self.locality_type == LocalityType.INTERCOMMUNALITY:
-            return self.epci.name
+        return self.locality_name or None
 
     @property
     def code(self):
-        if self.locality_type == LocalityType.MUNICIPALITY:
-            return self.municipality.code
-        if self.locality_type == LocalityType.INTERCOMMUNALITY:
-            return self.epci.code
+        return self.locality_code or None
 
     panels = [
         FieldPanel("name"),
@@ -402,21 +508,30 @@ class Assessment(TimeStampedModel, ClusterableModel):
     ]
 
     def __str__(self):
-        locality = None
-        if self.locality_type == LocalityType.MUNICIPALITY:
-            locality = self.municipality
-        elif self.locality_type == LocalityType.INTERCOMMUNALITY:
-            locality = self.epci
-        elif self.locality_type == LocalityType.DEPARTMENT:
-            locality = self.department
-        elif self.locality_type == LocalityType.REGION:
-            locality = self.region
+        locality = self.locality_name or None
+        if locality and self.locality_type == LocalityType.DEPARTMENT:
+            locality = f"{locality} ({self.locality_code})"
         return f"{self.get_locality_type_display()} {locality}"
 
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if getattr(self, "_loaded_locality_key", None) != self.get_locality_key() and (
+            update_fields is None
+            or {"locality_type", *LOCALITY_FIELD_BY_LOCALITY_TYPE.values()}
+            & {field.removesuffix("_id") for field in update_fields}
+        ):
+            self.update_locality_fields()
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "locality_population",
+                    "locality_code",
+                    "locality_name",
+                }
         if not self.name:
             self.name = self.collectivity_name
         super().save(*args, **kwargs)
+        self._loaded_locality_key = self.get_locality_key()
 
     class Meta:
         verbose_name = _("Évaluation")
@@ -424,12 +539,13 @@ class Assessment(TimeStampedModel, ClusterableModel):
 
 
 class AssessmentResponseQuerySet(models.QuerySet):
+    def accounted(self):
+        # ignore responses from anonymous users and passed responses
+        return self.filter(answered_by__is_unknown_user=False).exclude(has_passed=True)
+
     def accounted_in_assessment(self, assessment_pk):
         # filter responses to include only those from target assessment and ignore those from anonymous users and passed responses
-        return self.filter(
-            answered_by__is_unknown_user=False,
-            assessment_id=assessment_pk,
-        ).exclude(has_passed=True)
+        return self.accounted().filter(assessment_id=assessment_pk)
 
 
 # All questionnaire objective responses are assessment responses
@@ -447,6 +563,25 @@ class AssessmentResponse(Response):
         unique_together = ["assessment", "question"]
 
 
+def get_unique_file_name(file_name: str) -> str:
+    """Name under which an uploaded file is stored, prefixed with a uuid"""
+    return f"{str(uuid.uuid4())[:12]}_{file_name}"
+
+
+def get_file_display_name(file_name: str) -> str:
+    """Name of an uploaded file, without the uuid it is prefixed with"""
+    return re.match("^[^_]*_?(.*)$", file_name).group(1)
+
+
+def get_file_metadata(file) -> dict:
+    """Size, MIME type and display name of a file, the size is read from the storage"""
+    return {
+        "file_size": file.size,
+        "mime_type": mimetypes.guess_type(file.name)[0],
+        "display_name": get_file_display_name(file.name),
+    }
+
+
 class AssessmentDocument(TimeStampedModel):
     assessment = ParentalKey(
         Assessment, on_delete=models.CASCADE, related_name=_("documents")
@@ -458,6 +593,21 @@ class AssessmentDocument(TimeStampedModel):
     )
     file = models.FileField(verbose_name=_("fichier"))
     name = models.CharField(verbose_name=_("nom"), max_length=80)
+    # metadata of the file, set when it is uploaded so that serializing documents
+    # does not access the storage
+    file_size = models.BigIntegerField(
+        verbose_name=_("taille du fichier"), blank=True, null=True, editable=False
+    )
+    mime_type = models.CharField(
+        verbose_name=_("type MIME"),
+        max_length=255,
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    display_name = models.CharField(
+        verbose_name=_("nom du fichier"), max_length=255, blank=True, editable=False
+    )
 
     panels = [
         FieldPanel("category"),
@@ -465,6 +615,44 @@ class AssessmentDocument(TimeStampedModel):
         FieldPanel("name"),
     ]
 
+    def update_file_metadata(self):
+        """Read the metadata of the file, from the storage if already uploaded"""
+        for field, value in get_file_metadata(self.file).items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        # a new file is not committed to the storage yet
+        if self.file and (not self.file._committed or self.file_size is None):
+            self.update_file_metadata()
+        super().save(*args, **kwargs)
+
+
+class AssessmentDocumentUpload(TimeStampedModel):
+    """
+    Document being uploaded in chunks, which are appended to a file of the uploads
+    directory until its size is reached and the document is created.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assessment = models.ForeignKey(
+        Assessment, on_delete=models.CASCADE, related_name="document_uploads"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.CharField(
+        verbose_name=_("catégorie"),
+        max_length=20,
+        choices=ASSESSMENT_DOCUMENT_CATEGORIES_CHOICES,
+    )
+    name = models.CharField(verbose_name=_("nom"), max_length=80)
+    file_name = models.CharField(verbose_name=_("nom du fichier"), max_length=200)
+    size = models.BigIntegerField(verbose_name=_("taille du fichier"))
+    # number of bytes received
+    offset = models.BigIntegerField(default=0)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(settings.DOCUMENT_UPLOAD_DIR, str(self.id))
+
 
 class AssessmentPayment(TimeStampedModel):
     assessment = ParentalKey(
@@ -123,18 +123,21 @@ class Response(models.Model):
 
 
 class ParticipationResponseQuerySet(models.QuerySet):
-    def accounted_in_assessment(self, assessment_pk):
-        # filter responses to include only those from target assessment and ignore those from anonymous users and passed responses.
+    def accounted(self):
+        # ignore responses from anonymous users, passed responses and responses to questions without criteria.
         return (
             self.filter(
                 participation__user__is_unknown_user=False,
-                participation__assessment_id=assessment_pk,
                 question__profiling_question=False,
             )
             .exclude(has_passed=True)
             .exclude(question__criteria=None)
         )
 
+    def accounted_in_assessment(self, assessment_pk):
+        # filter responses to include only those from target assessment and ignore those from anonymous users and passed responses.
+        return self.accounted().filter(participation__assessment_id=assessment_pk)
+
 
 # All subjective and profiling responses are participation responses
 class ParticipationResponse(Response):
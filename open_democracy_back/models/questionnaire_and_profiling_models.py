@@ -167,7 +167,7 @@ class Survey(TimeStampedModel):
 
 
 @register_snippet
-class Pillar(models.Model):
+class Pillar(TimeStampedModel):
     name = models.CharField(
         verbose_name=_("Nom"), max_length=125, choices=PillarName.choices
     )
@@ -220,7 +220,7 @@ class Pillar(models.Model):
 
 
 @register_snippet
-class Marker(index.Indexed, ScoreFields):
+class Marker(index.Indexed, TimeStampedModel, ScoreFields):
     pillar = models.ForeignKey(
         Pillar, null=True, blank=True, on_delete=models.CASCADE, related_name="markers"
     )
@@ -320,7 +320,7 @@ explanatory_kwargs = {
 
 
 @register_snippet
-class Criteria(index.Indexed, ClusterableModel):
+class Criteria(index.Indexed, TimeStampedModel, ClusterableModel):
     marker = models.ForeignKey(
         Marker,
         null=True,
@@ -1185,3 +1185,17 @@ class ProfileDefinition(GenericRule):
         null=True,
         blank=True,
     )
+
+
+class Tombstone(models.Model):
+    """
+    Deleted survey, pillar, marker, criteria or question, so that clients
+    synchronizing the questionnaire since a date can remove it
+    """
+
+    model_name = models.CharField(max_length=64)
+    object_id = models.IntegerField()
+    deleted = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["model_name", "deleted"])]
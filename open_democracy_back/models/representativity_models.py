@@ -1,5 +1,6 @@
 from django.db import models
-from django.db.models import Count, F, Q
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils.translation import gettext_lazy as _
 from wagtail.search import index
@@ -17,6 +18,28 @@ from open_democracy_back.models.questionnaire_and_profiling_models import (
 from open_democracy_back.utils import SIMPLE_RICH_TEXT_FIELD_FEATURE, SurveyLocality
 
 
+def get_acceptability_threshold_considered(acceptability_threshold, min_rate):
+    if acceptability_threshold and acceptability_threshold > min_rate:
+        return acceptability_threshold
+    return min_rate
+
+
+def is_representativity_respected(
+    total_responses, counts_with_ignore, acceptability_threshold
+):
+    """
+    Counts are given as (count, ignore for acceptability threshold) for each
+    response choice of the profiling question which is not totally ignored
+    """
+    if total_responses == 0:
+        return False
+    return all(
+        ignore_for_acceptability_threshold
+        or (count / total_responses) * 100 >= acceptability_threshold
+        for count, ignore_for_acceptability_threshold in counts_with_ignore
+    )
+
+
 @register_snippet
 class RepresentativityCriteria(index.Indexed, models.Model):
     survey_locality = models.CharField(
@@ -62,19 +85,6 @@ class RepresentativityCriteria(index.Indexed, models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        must_create_assessment_representativity = False
-        if not self.id:
-            must_create_assessment_representativity = True
-        super().save(*args, **kwargs)
-        if must_create_assessment_representativity:
-            for assessment in Assessment.objects.filter(
-                survey__survey_locality=self.survey_locality
-            ):
-                AssessmentRepresentativity.objects.create(
-                    assessment=assessment, representativity_criteria_id=self.id
-                )
-
     class Meta:
         verbose_name = _("Critère de représentativité")
         verbose_name_plural = _("Critères de représentativité")
@@ -149,12 +159,14 @@ class AssessmentRepresentativity(models.Model):
                 "sort_order",
             )
             .annotate(
-                total=Count(
-                    "unique_choice_participationresponses",
-                    filter=Q(
-                        unique_choice_participationresponses__participation__assessment_id=self.assessment_id,
-                        unique_choice_participationresponses__participation__user__is_unknown_user=False,
+                total=Coalesce(
+                    Sum(
+                        "representativity_counts__count",
+                        filter=Q(
+                            representativity_counts__assessment_id=self.assessment_id
+                        ),
                     ),
+                    0,
                 )
             )
             .order_by("sort_order")
@@ -163,36 +175,57 @@ class AssessmentRepresentativity(models.Model):
     @property
     def total_responses(self):
         return (
-            self.representativity_criteria.profiling_question.participationresponses.filter(
-                participation__assessment_id=self.assessment_id,
-                participation__user__is_unknown_user=False,
-            )
-            .exclude(unique_choice_response=None)
-            .count()
+            RepresentativityCount.objects.filter(
+                assessment_id=self.assessment_id,
+                representativity_criteria_id=self.representativity_criteria_id,
+            ).aggregate(total=Sum("count"))["total"]
+            or 0
         )
 
     @property
     def acceptability_threshold_considered(self):
-        if self.acceptability_threshold and (
-            self.acceptability_threshold > self.representativity_criteria.min_rate
-        ):
-            return self.acceptability_threshold
-        else:
-            return self.representativity_criteria.min_rate
+        return get_acceptability_threshold_considered(
+            self.acceptability_threshold, self.representativity_criteria.min_rate
+        )
 
     @property
     def respected(self):
-        total_response = self.total_responses
-        if total_response == 0:
-            return False
-        return all(
+        return is_representativity_respected(
+            self.total_responses,
             [
                 (
-                    (response_choice_count["total"] / total_response) * 100
-                    >= self.acceptability_threshold_considered
+                    response_choice_count["total"],
+                    response_choice_count["ignore_for_acceptability_threshold"],
                 )
-                if not response_choice_count["ignore_for_acceptability_threshold"]
-                else True
                 for response_choice_count in self.count_by_response_choice
-            ]
+            ],
+            self.acceptability_threshold_considered,
         )
+
+
+class RepresentativityCount(models.Model):
+    """
+    Number of the responses of the participations of an assessment (not from
+    unknown users) with a choice to the profiling question of a representativity
+    criteria.
+    Maintained on every profiling response write, so that representativities and
+    published results are computed without reading the responses.
+    """
+
+    assessment = models.ForeignKey(
+        Assessment, on_delete=models.CASCADE, related_name="representativity_counts"
+    )
+    representativity_criteria = models.ForeignKey(
+        RepresentativityCriteria,
+        on_delete=models.CASCADE,
+        related_name="counts",
+    )
+    response_choice = models.ForeignKey(
+        ResponseChoice,
+        on_delete=models.CASCADE,
+        related_name="representativity_counts",
+    )
+    count = models.IntegerField(default=0, verbose_name=_("Nombre de réponses"))
+
+    class Meta:
+        unique_together = ["assessment", "representativity_criteria", "response_choice"]
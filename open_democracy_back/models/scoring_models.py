@@ -0,0 +1,31 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from open_democracy_back.models.assessment_models import Assessment
+from open_democracy_back.models.questionnaire_and_profiling_models import Question
+
+
+class QuestionScoreAggregate(models.Model):
+    """
+    Running sum and count of the values of the responses accounted in the score of a
+    question of an assessment. The value of a response depends on the question type:
+    1 or 0 for a boolean (the sum is the number of "yes"), the linearized score of
+    the choice for a unique choice, the best linearized score of the choices for a
+    multiple choice, the mean linearized score of the categories for a closed with
+    scale question, and the response itself for a percentage or a number.
+    Responses without value are not counted.
+    """
+
+    assessment = models.ForeignKey(
+        Assessment, on_delete=models.CASCADE, related_name="question_score_aggregates"
+    )
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name="score_aggregates"
+    )
+    value_sum = models.FloatField(default=0, verbose_name=_("Somme des valeurs"))
+    response_count = models.IntegerField(
+        default=0, verbose_name=_("Nombre de réponses")
+    )
+
+    class Meta:
+        unique_together = ["assessment", "question"]
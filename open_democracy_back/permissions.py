@@ -1,5 +1,6 @@
 from rest_framework.permissions import BasePermission
 
+from open_democracy_back.assessment_roles import get_assessment_role, has_details_access
 from open_democracy_back.models import AssessmentDocument, Assessment
 from open_democracy_back.models.animator_models import Workshop
 
@@ -30,14 +31,7 @@ class HasWriteAccessOnAssessment(BasePermission):
     """
 
     def has_object_permission(self, request, view, obj: AssessmentDocument):
-        from open_democracy_back.serializers.assessment_serializers import (
-            get_assessment_role,
-            has_details_access,
-        )
-
-        user = request.user
-        role = get_assessment_role(obj.assessment, user)
-        return has_details_access(role)
+        return has_details_access(get_assessment_role(request, obj.assessment))
 
 
 class HasAssessmentWriteAccessForUpdate(BasePermission):
@@ -49,11 +43,4 @@ class HasAssessmentWriteAccessForUpdate(BasePermission):
     def has_object_permission(self, request, view, obj: Assessment):
         if request.method != "PATCH":
             return True
-        from open_democracy_back.serializers.assessment_serializers import (
-            get_assessment_role,
-            has_details_access,
-        )
-
-        user = request.user
-        role = get_assessment_role(obj, user)
-        return has_details_access(role)
+        return has_details_access(get_assessment_role(request, obj))
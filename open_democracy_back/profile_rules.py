@@ -0,0 +1,260 @@
+"""
+Rules defining the profiles of the participants, compiled in memory.
+
+A profile type is given to a participant when all (or any, depending on its
+intersection operator) of its rules are respected by the participant's responses
+to the profiling questions. The rules of all the profile types are compiled once
+per revision of the survey content into predicates on the responses, so that the
+profiles of a participant are found with one fetch of their responses.
+"""
+import operator
+from functools import lru_cache
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from open_democracy_back.data_versions import get_survey_content_revision
+from open_democracy_back.models import (
+    Participation,
+    ParticipationResponse,
+    ProfileDefinition,
+    ProfileType,
+)
+from open_democracy_back.utils import BooleanOperator, QuestionType
+
+NUMERICAL_OPERATOR_CONVERSION = {
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "!=": operator.ne,
+    "=": operator.eq,
+}
+
+
+class ResponseValue(NamedTuple):
+    unique_choice_response_id: Optional[int]
+    multiple_choice_response_ids: FrozenSet[int]
+    boolean_response: Optional[bool]
+    percentage_response: Optional[int]
+    number_response: Optional[float]
+
+
+Predicate = Callable[[ResponseValue], bool]
+
+
+def compile_choice_rule(rule: ProfileDefinition, response_choice_ids) -> Predicate:
+    response_choice_ids = frozenset(response_choice_ids)
+    return lambda response: response.unique_choice_response_id in response_choice_ids
+
+
+def compile_multiple_choice_rule(
+    rule: ProfileDefinition, response_choice_ids
+) -> Predicate:
+    response_choice_ids = frozenset(response_choice_ids)
+    return lambda response: not response.multiple_choice_response_ids.isdisjoint(
+        response_choice_ids
+    )
+
+
+def compile_boolean_rule(rule: ProfileDefinition, response_choice_ids) -> Predicate:
+    boolean_response = rule.boolean_response
+    return lambda response: response.boolean_response == boolean_response
+
+
+def compile_numerical_rule(field: str, value_field: str):
+    def compile_rule(rule: ProfileDefinition, response_choice_ids) -> Predicate:
+        compare = NUMERICAL_OPERATOR_CONVERSION.get(rule.numerical_operator)
+        value = getattr(rule, value_field)
+        if compare is None:
+            return never_respected
+        return lambda response: getattr(response, field) is not None and compare(
+            getattr(response, field), value
+        )
+
+    return compile_rule
+
+
+def never_respected(response: ResponseValue) -> bool:
+    return False
+
+
+COMPILE_RULE_BY_QUESTION_TYPE = {
+    QuestionType.UNIQUE_CHOICE.value: compile_choice_rule,
+    QuestionType.MULTIPLE_CHOICE.value: compile_multiple_choice_rule,
+    QuestionType.BOOLEAN.value: compile_boolean_rule,
+    QuestionType.PERCENTAGE.value: compile_numerical_rule(
+        "percentage_response", "numerical_value"
+    ),
+    QuestionType.NUMBER.value: compile_numerical_rule("number_response", "float_value"),
+}
+
+
+def compile_rule(rule: ProfileDefinition, response_choice_ids) -> Predicate:
+    question = rule.conditional_question
+    # only the responses to profiling questions are accounted
+    if question is None or not question.profiling_question:
+        return never_respected
+    compile_rule_of_type = COMPILE_RULE_BY_QUESTION_TYPE.get(question.type)
+    if compile_rule_of_type is None:
+        return never_respected
+    return compile_rule_of_type(rule, response_choice_ids)
+
+
+class ProfileRules:
+    def __init__(self):
+        response_choice_ids_by_rule_id: Dict[int, List[int]] = {}
+        for (
+            rule_id,
+            response_choice_id,
+        ) in ProfileDefinition.response_choices.through.objects.values_list(
+            "profiledefinition_id", "responsechoice_id"
+        ):
+            response_choice_ids_by_rule_id.setdefault(rule_id, []).append(
+                response_choice_id
+            )
+
+        # (question id, predicate) of the rules by profile type id
+        rules_by_profile_type_id: Dict[int, List[Tuple[Optional[int], Predicate]]] = {}
+        for rule in ProfileDefinition.objects.select_related(
+            "conditional_question"
+        ).filter(profile_type__isnull=False):
+            rules_by_profile_type_id.setdefault(rule.profile_type_id, []).append(
+                (
+                    rule.conditional_question_id,
+                    compile_rule(rule, response_choice_ids_by_rule_id.get(rule.pk, [])),
+                )
+            )
+
+        # profile type id, all or any, rules
+        self.profile_types: List[
+            Tuple[int, Callable, List[Tuple[Optional[int], Predicate]]]
+        ] = []
+        for profile_type_id, intersection_operator in ProfileType.objects.order_by(
+            "pk"
+        ).values_list("pk", "rules_intersection_operator"):
+            combine = {
+                BooleanOperator.AND.value: all,
+                BooleanOperator.OR.value: any,
+            }.get(intersection_operator)
+            if combine:
+                self.profile_types.append(
+                    (
+                        profile_type_id,
+                        combine,
+                        rules_by_profile_type_id.get(profile_type_id, []),
+                    )
+                )
+        self.question_ids = frozenset(
+            question_id
+            for _, _, rules in self.profile_types
+            for question_id, _ in rules
+            if question_id is not None
+        )
+
+    def get_profile_type_ids(
+        self, response_by_question_id: Dict[int, ResponseValue]
+    ) -> List[int]:
+        """Profile types whose rules are respected by the responses"""
+        return [
+            profile_type_id
+            for profile_type_id, combine, rules in self.profile_types
+            if combine(
+                question_id in response_by_question_id
+                and predicate(response_by_question_id[question_id])
+                for question_id, predicate in rules
+            )
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_compiled_profile_rules(revision: str) -> ProfileRules:
+    return ProfileRules()
+
+
+def get_profile_rules() -> ProfileRules:
+    """Profile rules, compiled once per revision of the survey content"""
+    return get_compiled_profile_rules(get_survey_content_revision())
+
+
+def get_profiling_responses_by_participation_id(
+    participation_ids: Iterable[int], question_ids
+) -> Dict[int, Dict[int, ResponseValue]]:
+    """
+    Responses of participants to the given questions, by participation id then
+    question id, fetched with one query for the responses and one for their choices
+    """
+    responses = list(
+        ParticipationResponse.objects.filter(
+            participation_id__in=participation_ids, question_id__in=question_ids
+        )
+        .order_by("pk")
+        .values_list(
+            "pk",
+            "participation_id",
+            "question_id",
+            "unique_choice_response_id",
+            "boolean_response",
+            "percentage_response",
+            "number_response",
+        )
+    )
+    response_choices = ParticipationResponse.multiple_choice_response.through.objects
+    choice_ids_by_response_id: Dict[int, Set[int]] = {}
+    for response_id, response_choice_id in response_choices.filter(
+        participationresponse_id__in=[response[0] for response in responses]
+    ).values_list("participationresponse_id", "responsechoice_id"):
+        choice_ids_by_response_id.setdefault(response_id, set()).add(response_choice_id)
+
+    responses_by_participation_id: Dict[int, Dict[int, ResponseValue]] = {}
+    for (
+        response_id,
+        participation_id,
+        question_id,
+        unique_choice_response_id,
+        boolean_response,
+        percentage_response,
+        number_response,
+    ) in responses:
+        # the first response of a question is the one accounted
+        responses_by_participation_id.setdefault(participation_id, {}).setdefault(
+            question_id,
+            ResponseValue(
+                unique_choice_response_id=unique_choice_response_id,
+                multiple_choice_response_ids=frozenset(
+                    choice_ids_by_response_id.get(response_id, ())
+                ),
+                boolean_response=boolean_response,
+                percentage_response=percentage_response,
+                number_response=number_response,
+            ),
+        )
+    return responses_by_participation_id
+
+
+def get_profiling_responses(
+    participation: Participation, question_ids
+) -> Dict[int, ResponseValue]:
+    """Responses of a participant to the given questions, by question id"""
+    return get_profiling_responses_by_participation_id(
+        [participation.pk], question_ids
+    ).get(participation.pk, {})
+
+
+def assign_profiles(participation: Participation):
+    """Add to a participation the profiles whose rules its responses respect"""
+    profile_rules = get_profile_rules()
+    profile_type_ids = profile_rules.get_profile_type_ids(
+        get_profiling_responses(participation, profile_rules.question_ids)
+    )
+    if profile_type_ids:
+        # one insert of the profiles not yet added
+        participation.profiles.add(*profile_type_ids)
@@ -0,0 +1,161 @@
+"""
+Synchronization of the questionnaire since a date.
+
+Surveys, pillars, markers, criterias and questions are listed with `?since=` to
+get only the objects created or modified since then. An object is serialized
+with other ones (a question with its response choices, a criteria with the ids
+of its questions, a survey with all its pillars, markers and criterias), so each
+change of an object also marks as modified the objects containing it, and each
+deletion leaves a tombstone.
+"""
+import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.db.models import Model, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from open_democracy_back.models import (
+    Category,
+    Criteria,
+    CriteriaDefinition,
+    Marker,
+    NumberRange,
+    PercentageRange,
+    Pillar,
+    ProfilingQuestion,
+    Question,
+    QuestionnaireQuestion,
+    QuestionRule,
+    ResponseChoice,
+    Survey,
+    Tombstone,
+)
+
+# objects serialized within other ones, by model: the field of the object giving
+# the id of its container, the model of the container and the lookup to this id
+CONTAINERS_BY_MODEL = {
+    ResponseChoice: [("question_id", Question, "pk")],
+    Category: [("question_id", Question, "pk")],
+    PercentageRange: [("question_id", Question, "pk")],
+    NumberRange: [("question_id", Question, "pk")],
+    QuestionRule: [("question_id", Question, "pk")],
+    CriteriaDefinition: [
+        ("criteria_id", Criteria, "pk"),
+        ("criteria_id", Survey, "pillars__markers__criterias"),
+    ],
+    Question: [
+        ("id", Question, "pk"),
+        ("criteria_id", Criteria, "pk"),
+        ("criteria_id", Survey, "pillars__markers__criterias"),
+        # in the explaining question ids
+        ("allows_to_explain_id", Question, "pk"),
+    ],
+    Criteria: [
+        ("id", Criteria, "pk"),
+        ("marker_id", Marker, "pk"),
+        ("marker_id", Survey, "pillars__markers"),
+    ],
+    Marker: [("pillar_id", Pillar, "pk"), ("pillar_id", Survey, "pillars")],
+    Pillar: [("survey_id", Survey, "pk")],
+    # in the survey locality of the questions
+    Survey: [("id", Question, "criteria__marker__pillar__survey")],
+}
+CONTAINERS_BY_MODEL[QuestionnaireQuestion] = CONTAINERS_BY_MODEL[Question]
+CONTAINERS_BY_MODEL[ProfilingQuestion] = CONTAINERS_BY_MODEL[Question]
+
+TOMBSTONE_MODELS = [
+    Survey,
+    Pillar,
+    Marker,
+    Criteria,
+    Question,
+    QuestionnaireQuestion,
+    ProfilingQuestion,
+]
+
+# returned as the date of the synchronization, so that objects saved by
+# transactions not yet committed are sent by the next synchronization
+SYNC_OVERLAP = datetime.timedelta(minutes=1)
+
+
+def get_container_fields(model) -> List[str]:
+    return sorted({field for field, _, _ in CONTAINERS_BY_MODEL[model]})
+
+
+def get_former_containers(instance: Model) -> Optional[dict]:
+    """Containers of an object before it is saved, which it may leave"""
+    if instance.pk is None:
+        return None
+    return (
+        type(instance)
+        ._base_manager.filter(pk=instance.pk)
+        .values(*get_container_fields(type(instance)))
+        .first()
+    )
+
+
+def touch_containers(instances: Iterable[Model], former_values: Iterable[dict] = ()):
+    """Mark as modified the objects containing the given ones"""
+    ids_by_field: Dict[str, Set[int]] = {}
+    model = None
+    for instance in instances:
+        model = type(instance)
+        for field in get_container_fields(model):
+            ids_by_field.setdefault(field, set()).add(getattr(instance, field))
+    for values in former_values:
+        for field, value in values.items():
+            ids_by_field.setdefault(field, set()).add(value)
+    if model is None:
+        return
+
+    now = timezone.now()
+    for field, container_model, lookup in CONTAINERS_BY_MODEL[model]:
+        ids = ids_by_field.get(field, set()) - {None}
+        if ids:
+            container_model._base_manager.filter(**{f"{lookup}__in": ids}).update(
+                modified=now
+            )
+
+
+def add_tombstone(instance: Model):
+    Tombstone.objects.create(
+        model_name=instance._meta.concrete_model._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+def parse_since(value: str) -> Optional[datetime.datetime]:
+    """Date of an ISO 8601 string, in UTC if its time zone is not given"""
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        return None
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since, datetime.timezone.utc)
+    return since
+
+
+def get_sync_timestamp() -> datetime.datetime:
+    return timezone.now() - SYNC_OVERLAP
+
+
+def get_deleted_ids(queryset: QuerySet, since: datetime.datetime) -> List[int]:
+    """
+    Ids of the objects deleted since a date, and of the objects modified since then
+    which are not listed anymore (questions becoming profiling questions...)
+    """
+    concrete_model = queryset.model._meta.concrete_model
+    deleted_ids = set(
+        Tombstone.objects.filter(
+            model_name=concrete_model._meta.model_name, deleted__gte=since
+        ).values_list("object_id", flat=True)
+    )
+    deleted_ids |= set(
+        concrete_model._base_manager.filter(modified__gte=since)
+        .exclude(pk__in=queryset.values("pk"))
+        .values_list("pk", flat=True)
+    )
+    # an id deleted then reused by a listed object is not deleted
+    deleted_ids -= set(queryset.filter(pk__in=deleted_ids).values_list("pk", flat=True))
+    return sorted(deleted_ids)
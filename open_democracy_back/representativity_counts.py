@@ -0,0 +1,354 @@
+"""
+Representativity counts maintained on every profiling response write.
+
+Each accounted response to the profiling question of a representativity criteria
+adds one to the `RepresentativityCount` of its assessment and choice, and the
+`published_results` flag of the assessment is computed again from the counts and
+the thresholds, so that published assessments are found with an indexed filter.
+"""
+from collections import Counter, defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+
+from open_democracy_back.models import (
+    Assessment,
+    AssessmentRepresentativity,
+    ParticipationResponse,
+    RepresentativityCount,
+    ResponseChoice,
+)
+from open_democracy_back.models.representativity_models import (
+    get_acceptability_threshold_considered,
+    is_representativity_respected,
+)
+
+# assessment id, representativity criteria id, response choice id
+CountKey = Tuple[int, int, int]
+
+COUNT_KEY_FIELDS = (
+    "participation__assessment_id",
+    "question__representativity_criteria__id",
+    "unique_choice_response_id",
+)
+
+COUNT_FIELDS = ("assessment_id", "representativity_criteria_id", "response_choice_id")
+
+
+def get_counted_responses():
+    return ParticipationResponse.objects.filter(
+        question__representativity_criteria__isnull=False,
+        participation__user__is_unknown_user=False,
+        unique_choice_response__isnull=False,
+    )
+
+
+def get_count_key(response) -> Optional[CountKey]:
+    """Count a response adds one to, None if not counted"""
+    if (
+        not isinstance(response, ParticipationResponse)
+        or not response.question.profiling_question
+    ):
+        return None
+    return (
+        get_counted_responses()
+        .filter(pk=response.pk)
+        .values_list(*COUNT_KEY_FIELDS)
+        .first()
+    )
+
+
+def update_representativity_counts(
+    previous_key: Optional[CountKey], key: Optional[CountKey]
+):
+    """Move a response from its previous count to its new count"""
+    update_representativity_counts_in_bulk(
+        [previous_key] if previous_key else [], [key] if key else []
+    )
+
+
+def get_count_keys(response_ids: Iterable[int]) -> List[CountKey]:
+    """Counts the given responses add one to, for the counted ones"""
+    return list(
+        get_counted_responses()
+        .filter(pk__in=response_ids, question__profiling_question=True)
+        .values_list(*COUNT_KEY_FIELDS)
+    )
+
+
+def update_representativity_counts_in_bulk(
+    previous_keys: Iterable[CountKey], keys: Iterable[CountKey]
+):
+    """
+    Move many responses from their previous counts to their new counts, with one
+    insert of the missing counts and one update
+    """
+    deltas = Counter(keys)
+    deltas.subtract(previous_keys)
+    deltas = Counter({key: delta for key, delta in deltas.items() if delta})
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        RepresentativityCount.objects.bulk_create(
+            [
+                RepresentativityCount(**dict(zip(COUNT_FIELDS, key)))
+                for key, delta in deltas.items()
+                if delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+        # a count may be missing if the counts were not built yet
+        counts = RepresentativityCount.objects.filter(
+            assessment_id__in={key[0] for key in deltas},
+            representativity_criteria_id__in={key[1] for key in deltas},
+            response_choice_id__in={key[2] for key in deltas},
+        ).values_list("pk", *COUNT_FIELDS)
+        delta_by_pk = {}
+        for pk, assessment_id, criteria_id, response_choice_id in counts:
+            key = (assessment_id, criteria_id, response_choice_id)
+            if key in deltas:
+                delta_by_pk[pk] = deltas[key]
+        RepresentativityCount.objects.filter(pk__in=delta_by_pk).update(
+            count=F("count")
+            + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in delta_by_pk.items()],
+                default=Value(0),
+            )
+        )
+        update_published_results({key[0] for key in deltas})
+
+
+def compute_representativity_counts(
+    assessment_ids: Optional[Iterable[int]] = None,
+) -> Dict[CountKey, int]:
+    """Counts of the given assessments (all if None), computed from the responses"""
+    responses = get_counted_responses()
+    if assessment_ids is not None:
+        responses = responses.filter(participation__assessment_id__in=assessment_ids)
+    return {
+        tuple(row[field] for field in COUNT_KEY_FIELDS): row["count"]
+        for row in responses.values(*COUNT_KEY_FIELDS).annotate(count=Count("id"))
+    }
+
+
+def rebuild_representativity_counts(assessment_ids: Optional[Iterable[int]] = None):
+    """
+    Recompute from the responses the counts and the published results of the given
+    assessments, all of them if None.
+    """
+    assessment_ids = None if assessment_ids is None else list(assessment_ids)
+    counts = compute_representativity_counts(assessment_ids)
+
+    stale_counts = RepresentativityCount.objects.all()
+    if assessment_ids is not None:
+        stale_counts = stale_counts.filter(assessment_id__in=assessment_ids)
+    with transaction.atomic():
+        stale_counts.delete()
+        RepresentativityCount.objects.bulk_create(
+            [
+                RepresentativityCount(**dict(zip(COUNT_FIELDS, key)), count=count)
+                for key, count in counts.items()
+            ],
+            batch_size=1000,
+        )
+        update_published_results(assessment_ids)
+
+
+def rebuild_representativity_counts_of_user(user):
+    """Rebuild the counts of the assessments a user participated in"""
+    assessment_ids = set(user.participations.values_list("assessment_id", flat=True))
+    if assessment_ids:
+        rebuild_representativity_counts(assessment_ids=assessment_ids)
+
+
+def compute_published_results(
+    assessment_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, bool]:
+    """
+    Whether all the representativities of the given assessments (all if None) are
+    respected, computed from the counts with a query by table.
+    """
+    assessments = Assessment.objects.all()
+    representativities = AssessmentRepresentativity.objects.all()
+    counts = RepresentativityCount.objects.all()
+    if assessment_ids is not None:
+        assessment_ids = list(assessment_ids)
+        assessments = assessments.filter(pk__in=assessment_ids)
+        representativities = representativities.filter(assessment_id__in=assessment_ids)
+        counts = counts.filter(assessment_id__in=assessment_ids)
+    representativities = list(
+        representativities.values_list(
+            "assessment_id",
+            "representativity_criteria_id",
+            "acceptability_threshold",
+            "representativity_criteria__min_rate",
+        )
+    )
+
+    # choices which are not totally ignored, with their ignore for acceptability
+    # threshold flag
+    choices_by_criteria_id: DefaultDict[int, List[Tuple[int, bool]]] = defaultdict(list)
+    for criteria_id, response_choice_id, ignore_for_acceptability_threshold in (
+        ResponseChoice.objects.filter(
+            question__representativity_criteria__in={
+                representativity[1] for representativity in representativities
+            }
+        )
+        .exclude(representativity_criteria_rule__totally_ignore=True)
+        .values_list(
+            "question__representativity_criteria__id",
+            "id",
+            "representativity_criteria_rule__ignore_for_acceptability_threshold",
+        )
+    ):
+        choices_by_criteria_id[criteria_id].append(
+            (response_choice_id, ignore_for_acceptability_threshold)
+        )
+
+    count_by_key: Dict[CountKey, int] = {}
+    total_by_representativity: DefaultDict[Tuple[int, int], int] = defaultdict(int)
+    for assessment_id, criteria_id, response_choice_id, count in counts.values_list(
+        *COUNT_FIELDS, "count"
+    ):
+        count_by_key[(assessment_id, criteria_id, response_choice_id)] = count
+        total_by_representativity[(assessment_id, criteria_id)] += count
+
+    published_results = {
+        assessment_id: True
+        for assessment_id in assessments.values_list("pk", flat=True)
+    }
+    for (
+        assessment_id,
+        criteria_id,
+        acceptability_threshold,
+        min_rate,
+    ) in representativities:
+        if not published_results.get(assessment_id):
+            continue
+        published_results[assessment_id] = is_representativity_respected(
+            total_by_representativity[(assessment_id, criteria_id)],
+            [
+                (
+                    count_by_key.get(
+                        (assessment_id, criteria_id, response_choice_id), 0
+                    ),
+                    ignore_for_acceptability_threshold,
+                )
+                for response_choice_id, ignore_for_acceptability_threshold in choices_by_criteria_id[
+                    criteria_id
+                ]
+            ],
+            get_acceptability_threshold_considered(acceptability_threshold, min_rate),
+        )
+    return published_results
+
+
+def update_published_results(assessment_ids: Optional[Iterable[int]] = None):
+    """Store the published results of the given assessments, all of them if None"""
+    published_results = compute_published_results(assessment_ids)
+    for value in [True, False]:
+        Assessment.objects.filter(
+            pk__in=[
+                assessment_id
+                for assessment_id, published in published_results.items()
+                if published is value
+            ]
+        ).exclude(published_results=value).update(published_results=value)
+
+
+def get_representativity_data(
+    representativities: List[AssessmentRepresentativity],
+) -> Dict[int, Dict]:
+    """
+    Count by response choice and respect of representativities, by
+    representativity id, computed together with a query by table. The
+    representativity criteria of the representativities must be loaded.
+    """
+    if not representativities:
+        return {}
+    question_ids = {
+        representativity.representativity_criteria.profiling_question_id
+        for representativity in representativities
+    }
+    response_choices_by_question_id: DefaultDict[int, List[Dict]] = defaultdict(list)
+    for response_choice in (
+        ResponseChoice.objects.filter(question_id__in=question_ids)
+        .exclude(representativity_criteria_rule__totally_ignore=True)
+        .annotate(
+            response_choice_name=F("response_choice"),
+            response_choice_id=F("id"),
+            ignore_for_acceptability_threshold=F(
+                "representativity_criteria_rule__ignore_for_acceptability_threshold"
+            ),
+        )
+        .values(
+            "question_id",
+            "response_choice_id",
+            "response_choice_name",
+            "ignore_for_acceptability_threshold",
+            "sort_order",
+        )
+        .order_by("sort_order")
+    ):
+        response_choices_by_question_id[response_choice.pop("question_id")].append(
+            response_choice
+        )
+
+    count_by_key: Dict[CountKey, int] = {}
+    total_by_representativity: DefaultDict[Tuple[int, int], int] = defaultdict(int)
+    for (
+        assessment_id,
+        criteria_id,
+        response_choice_id,
+        count,
+    ) in RepresentativityCount.objects.filter(
+        assessment_id__in={
+            representativity.assessment_id for representativity in representativities
+        },
+        representativity_criteria_id__in={
+            representativity.representativity_criteria_id
+            for representativity in representativities
+        },
+    ).values_list(
+        *COUNT_FIELDS, "count"
+    ):
+        count_by_key[(assessment_id, criteria_id, response_choice_id)] = count
+        total_by_representativity[(assessment_id, criteria_id)] += count
+
+    data_by_representativity_id = {}
+    for representativity in representativities:
+        criteria = representativity.representativity_criteria
+        key = (representativity.assessment_id, criteria.id)
+        count_by_response_choice = [
+            {
+                "sort_order": response_choice["sort_order"],
+                "response_choice_id": response_choice["response_choice_id"],
+                "response_choice_name": response_choice["response_choice_name"],
+                "ignore_for_acceptability_threshold": response_choice[
+                    "ignore_for_acceptability_threshold"
+                ],
+                "total": count_by_key.get(
+                    (*key, response_choice["response_choice_id"]), 0
+                ),
+            }
+            for response_choice in response_choices_by_question_id[
+                criteria.profiling_question_id
+            ]
+        ]
+        data_by_representativity_id[representativity.pk] = {
+            "count_by_response_choice": count_by_response_choice,
+            "respected": is_representativity_respected(
+                total_by_representativity[key],
+                [
+                    (
+                        response_choice_count["total"],
+                        response_choice_count["ignore_for_acceptability_threshold"],
+                    )
+                    for response_choice_count in count_by_response_choice
+                ],
+                representativity.acceptability_threshold_considered,
+            ),
+        }
+    return data_by_representativity_id
@@ -0,0 +1,427 @@
+"""
+Responses of a participation or an assessment saved by batches.
+
+The questionnaire can send all the responses to the questions of a pillar at once.
+They are checked against the questions to respond to, fetched once for the whole
+batch, then written with bulk inserts and updates in one transaction, the score
+aggregates and representativity counts being updated once for the batch. The
+result of each response is returned: the saved response, or its errors.
+
+A response sent alone is saved as a batch of one response. Responses are created
+or updated with one upsert, so that a response sent twice at once is not an
+integrity error, and the batches of a participation or an assessment are saved one
+after the other, so that such a response is accounted once.
+"""
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import QuerySet
+from rest_framework import serializers, status
+
+from open_democracy_back.data_versions import bump_assessment_data_versions
+from open_democracy_back.exceptions import ErrorCode
+from open_democracy_back.models import (
+    AssessmentResponse,
+    Category,
+    ClosedWithScaleCategoryResponse,
+    ParticipationResponse,
+    Question,
+    ResponseChoice,
+)
+from open_democracy_back.representativity_counts import (
+    get_count_keys,
+    update_representativity_counts_in_bulk,
+)
+from open_democracy_back.score_aggregates import (
+    get_responses_values,
+    update_score_aggregates_in_bulk,
+)
+
+BATCH_MAX_SIZE = 200
+
+# fields of the responses set from the items, with the same name
+RESPONSE_FIELDS = [
+    "has_passed",
+    "unique_choice_response_id",
+    "boolean_response",
+    "percentage_response",
+    "number_response",
+]
+
+CATEGORY_RESPONSE_FIELD_BY_MODEL = {
+    ParticipationResponse: "participation_response",
+    AssessmentResponse: "assessment_response",
+}
+
+# questions whose responses must be linked to the other model, with the error
+WRONG_MODEL_ERROR_BY_MODEL = {
+    ParticipationResponse: (
+        lambda objectivity, survey_type: objectivity == "objective"
+        and survey_type == "questionnaire",
+        "An objective response must be link to the assessment, not the participation",
+        ErrorCode.NEED_PARTICIPATION_RESPONSE,
+    ),
+    AssessmentResponse: (
+        lambda objectivity, survey_type: objectivity == "subjective"
+        or survey_type == "profiling",
+        "A subjective response or profiling response must be link to the "
+        "participation, not the assessment",
+        ErrorCode.NEED_ASSESSMENT_RESPONSE,
+    ),
+}
+
+
+class CategoryResponseItemSerializer(serializers.Serializer):
+    category_id = serializers.IntegerField()
+    response_choice_id = serializers.IntegerField(allow_null=True)
+
+
+class ResponseItemSerializer(serializers.Serializer):
+    """A response of a batch, whose ids are checked with the other responses"""
+
+    question_id = serializers.IntegerField()
+    has_passed = serializers.BooleanField(required=False)
+    unique_choice_response_id = serializers.IntegerField(
+        required=False, allow_null=True
+    )
+    multiple_choice_response_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+    boolean_response = serializers.BooleanField(required=False, allow_null=True)
+    percentage_response = serializers.IntegerField(
+        required=False, allow_null=True, min_value=0, max_value=100
+    )
+    number_response = serializers.FloatField(required=False, allow_null=True)
+    closed_with_scale_response_categories = CategoryResponseItemSerializer(
+        many=True, required=False
+    )
+
+
+def get_response_choice_ids(data: dict) -> Set[int]:
+    response_choice_ids = set(data.get("multiple_choice_response_ids", []))
+    if data.get("unique_choice_response_id") is not None:
+        response_choice_ids.add(data["unique_choice_response_id"])
+    for item in data.get("closed_with_scale_response_categories", []):
+        if item["response_choice_id"] is not None:
+            response_choice_ids.add(item["response_choice_id"])
+    return response_choice_ids
+
+
+def get_category_ids(data: dict) -> Set[int]:
+    return {
+        item["category_id"]
+        for item in data.get("closed_with_scale_response_categories", [])
+    }
+
+
+def get_error_result(errors: dict, code: str) -> dict:
+    return {
+        "status": status.HTTP_400_BAD_REQUEST,
+        "errors": errors,
+        "message_code": code,
+    }
+
+
+class BatchReferences:
+    """
+    Questions, choices and categories the responses of a batch refer to, with which
+    the responses are checked, whether they are sent alone or by batches
+    """
+
+    def __init__(self, data_list: Iterable[dict], eligible_questions: QuerySet):
+        data_list = list(data_list)
+        question_ids = {data["question_id"] for data in data_list}
+        self.question_by_id = {
+            question_id: (
+                objectivity,
+                "profiling" if profiling_question else "questionnaire",
+                question_type,
+            )
+            for question_id, objectivity, profiling_question, question_type in (
+                Question.objects.filter(pk__in=question_ids).values_list(
+                    "pk", "objectivity", "profiling_question", "type"
+                )
+            )
+        }
+        # the questions the participant has to respond to, fetched once
+        self.eligible_question_ids = set(
+            eligible_questions.filter(pk__in=question_ids).values_list("pk", flat=True)
+        )
+        self.response_choice_ids = set(
+            ResponseChoice.objects.filter(
+                pk__in=set().union(*map(get_response_choice_ids, data_list))
+            ).values_list("pk", flat=True)
+        )
+        self.category_ids = set(
+            Category.objects.filter(
+                pk__in=set().union(*map(get_category_ids, data_list))
+            ).values_list("pk", flat=True)
+        )
+
+    def get_error(self, model, data: dict) -> Optional[dict]:
+        question = self.question_by_id.get(data["question_id"])
+        if question is None:
+            return get_error_result(
+                {"question_id": ["Invalid pk - object does not exist."]},
+                "does_not_exist",
+            )
+        if not get_response_choice_ids(data) <= self.response_choice_ids:
+            return get_error_result(
+                {"response_choice_ids": ["Invalid pk - object does not exist."]},
+                "does_not_exist",
+            )
+        if not get_category_ids(data) <= self.category_ids:
+            return get_error_result(
+                {"category_ids": ["Invalid pk - object does not exist."]},
+                "does_not_exist",
+            )
+        if data["question_id"] not in self.eligible_question_ids:
+            return get_error_result(
+                {"non_field_errors": ["You don't need to respond to this question."]},
+                ErrorCode.QUESTION_NOT_NEEDED.value,
+            )
+        is_wrong_model, detail, code = WRONG_MODEL_ERROR_BY_MODEL[model]
+        if is_wrong_model(question[0], question[1]):
+            return get_error_result({"non_field_errors": [detail]}, code.value)
+        return None
+
+
+def save_category_responses(
+    model, response_choice_id_by_category_id_by_response_id: Dict[int, Dict]
+):
+    """
+    Set the choices of the categories of closed with scale responses, with one
+    fetch of their category responses, one insert and one update
+    """
+    response_field = CATEGORY_RESPONSE_FIELD_BY_MODEL[model]
+    to_update = []
+    saved: Set[Tuple[int, int]] = set()
+    for category_response in ClosedWithScaleCategoryResponse.objects.filter(
+        **{f"{response_field}_id__in": response_choice_id_by_category_id_by_response_id}
+    ):
+        response_id = getattr(category_response, f"{response_field}_id")
+        choice_id_by_category_id = response_choice_id_by_category_id_by_response_id[
+            response_id
+        ]
+        if category_response.category_id not in choice_id_by_category_id:
+            continue
+        saved.add((response_id, category_response.category_id))
+        response_choice_id = choice_id_by_category_id[category_response.category_id]
+        if category_response.response_choice_id != response_choice_id:
+            category_response.response_choice_id = response_choice_id
+            to_update.append(category_response)
+    ClosedWithScaleCategoryResponse.objects.bulk_update(to_update, ["response_choice"])
+    ClosedWithScaleCategoryResponse.objects.bulk_create(
+        [
+            ClosedWithScaleCategoryResponse(
+                **{f"{response_field}_id": response_id},
+                category_id=category_id,
+                response_choice_id=response_choice_id,
+            )
+            for response_id, choice_id_by_category_id in (
+                response_choice_id_by_category_id_by_response_id.items()
+            )
+            for category_id, response_choice_id in choice_id_by_category_id.items()
+            if (response_id, category_id) not in saved
+        ]
+    )
+
+
+def save_multiple_choice_responses(model, choice_ids_by_response_id: Dict[int, List]):
+    """Replace the choices of multiple choice responses"""
+    through = model.multiple_choice_response.through
+    response_field = f"{model._meta.model_name}_id"
+    through.objects.filter(
+        **{f"{response_field}__in": choice_ids_by_response_id}
+    ).delete()
+    through.objects.bulk_create(
+        [
+            through(**{response_field: response_id}, responsechoice_id=choice_id)
+            for response_id, choice_ids in choice_ids_by_response_id.items()
+            for choice_id in set(choice_ids)
+        ]
+    )
+
+
+def get_batch_count_keys(model, response_ids: Iterable[int]):
+    # only the responses of participations are counted
+    if model is not ParticipationResponse:
+        return []
+    return get_count_keys(response_ids)
+
+
+def lock_owner(model, owner_values: dict):
+    """
+    Lock the participation or the assessment of the responses until the end of the
+    transaction, so that the batches of an owner are saved one after the other: the
+    previous values of the responses read by a batch are then the ones its upsert
+    replaces, and the aggregates and counts are updated only once for a response
+    sent twice at once.
+    """
+    ((owner_field, owner_id),) = owner_values.items()
+    owner_model = model._meta.get_field(owner_field).related_model
+    list(
+        owner_model.objects.select_for_update()
+        .filter(pk=owner_id)
+        .values_list("pk", flat=True)
+    )
+
+
+def save_responses(
+    model,
+    owner_values: dict,
+    data_by_index: Dict[int, dict],
+    question_type_by_id: Dict[int, str],
+    extra_values: dict,
+) -> Dict[int, Tuple[object, bool]]:
+    """Upsert the responses of one owner, returning them and if they were created"""
+    lock_owner(model, owner_values)
+    existing_by_question_id = {
+        response.question_id: response
+        for response in model.objects.filter(
+            **owner_values,
+            question_id__in=[data["question_id"] for data in data_by_index.values()],
+        )
+    }
+    previous_ids_by_question_type: DefaultDict[str, List[int]] = defaultdict(list)
+    for question_id, response in existing_by_question_id.items():
+        previous_ids_by_question_type[question_type_by_id[question_id]].append(
+            response.pk
+        )
+    previous_values = get_responses_values(model, previous_ids_by_question_type)
+    previous_count_keys = get_batch_count_keys(
+        model, [response.pk for response in existing_by_question_id.values()]
+    )
+
+    response_by_index = {}
+    for index, data in data_by_index.items():
+        response = model(**owner_values, question_id=data["question_id"])
+        existing = existing_by_question_id.get(data["question_id"])
+        for field in RESPONSE_FIELDS:
+            if field in data:
+                setattr(response, field, data[field])
+            elif existing is not None:
+                setattr(response, field, getattr(existing, field))
+        for field, value in extra_values.items():
+            setattr(response, field, value)
+        response_by_index[index] = response
+
+    # one INSERT ... ON CONFLICT, safe when the same responses are sent twice at
+    # once, which sets the ids of the created and updated responses
+    model.objects.bulk_create(
+        list(response_by_index.values()),
+        update_conflicts=True,
+        unique_fields=model._meta.unique_together[0],
+        update_fields=RESPONSE_FIELDS + list(extra_values),
+    )
+
+    save_multiple_choice_responses(
+        model,
+        {
+            response_by_index[index].pk: data["multiple_choice_response_ids"]
+            for index, data in data_by_index.items()
+            if "multiple_choice_response_ids" in data
+        },
+    )
+    save_category_responses(
+        model,
+        {
+            response_by_index[index].pk: {
+                item["category_id"]: item["response_choice_id"]
+                for item in data["closed_with_scale_response_categories"]
+            }
+            for index, data in data_by_index.items()
+            if data.get("closed_with_scale_response_categories")
+        },
+    )
+
+    ids_by_question_type: DefaultDict[str, List[int]] = defaultdict(list)
+    for response in response_by_index.values():
+        ids_by_question_type[question_type_by_id[response.question_id]].append(
+            response.pk
+        )
+    update_score_aggregates_in_bulk(
+        previous_values, get_responses_values(model, ids_by_question_type)
+    )
+    update_representativity_counts_in_bulk(
+        previous_count_keys,
+        get_batch_count_keys(
+            model, [response.pk for response in response_by_index.values()]
+        ),
+    )
+    existing_ids = {response.pk for response in existing_by_question_id.values()}
+    return {
+        index: (response, response.pk not in existing_ids)
+        for index, response in response_by_index.items()
+    }
+
+
+def save_response_batch(
+    model,
+    owner_values: dict,
+    assessment_id: int,
+    items: List[dict],
+    eligible_questions: QuerySet,
+    serializer_class,
+    extra_values: Optional[dict] = None,
+) -> List[dict]:
+    """
+    Check and upsert the responses of a participation or an assessment, returning
+    for each item its status and its saved response, or its errors. Valid responses
+    are saved even if others are not.
+    """
+    results: List[dict] = [{} for _ in items]
+    data_by_index: Dict[int, dict] = {}
+    for index, item in enumerate(items):
+        item_serializer = ResponseItemSerializer(data=item)
+        if item_serializer.is_valid():
+            data_by_index[index] = item_serializer.validated_data
+        else:
+            results[index] = get_error_result(item_serializer.errors, "invalid")
+
+    references = BatchReferences(data_by_index.values(), eligible_questions)
+    question_ids: Set[int] = set()
+    for index, data in list(data_by_index.items()):
+        error = references.get_error(model, data)
+        if error is None and data["question_id"] in question_ids:
+            error = get_error_result(
+                {"question_id": ["Several responses to this question."]},
+                ErrorCode.DUPLICATE_RESPONSE.value,
+            )
+        if error is not None:
+            results[index] = error
+            del data_by_index[index]
+        else:
+            question_ids.add(data["question_id"])
+    if not data_by_index:
+        return results
+
+    with transaction.atomic():
+        saved = save_responses(
+            model,
+            owner_values,
+            data_by_index,
+            {
+                question_id: question[2]
+                for question_id, question in references.question_by_id.items()
+            },
+            extra_values or {},
+        )
+        # bulk writes do not send the signals
+        bump_assessment_data_versions([assessment_id])
+
+    responses = model.objects.filter(
+        pk__in=[response.pk for response, _ in saved.values()]
+    ).prefetch_related(
+        "multiple_choice_response", "closed_with_scale_response_categories"
+    )
+    data_by_pk = {
+        data["id"]: data for data in serializer_class(responses, many=True).data
+    }
+    for index, (response, created) in saved.items():
+        results[index] = {
+            "status": status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+            "response": data_by_pk[response.pk],
+        }
+    return results
@@ -0,0 +1,287 @@
+"""
+Score aggregates maintained on every response write.
+
+Each accounted response adds its value to the `QuestionScoreAggregate` of its
+assessment and question, so that the scores of an assessment are computed from one
+row per answered question instead of from all its responses.
+"""
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import (
+    Avg,
+    Case,
+    F,
+    FloatField,
+    IntegerField,
+    Max,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+
+from open_democracy_back.models import (
+    SCORE_MAP,
+    Assessment,
+    AssessmentResponse,
+    ParticipationResponse,
+    QuestionScoreAggregate,
+)
+from open_democracy_back.score_rollup import get_scores_by_question_scores
+from open_democracy_back.scoring_plan import (
+    RANGE_MODEL_BY_QUESTION_TYPE,
+    ScoringPlan,
+    get_scoring_plan,
+)
+from open_democracy_back.utils import QuestionType
+
+# assessment id, question id, value
+ResponseValue = Tuple[int, int, float]
+
+VALUE_BY_QUESTION_TYPE = {
+    QuestionType.BOOLEAN.value: Case(
+        When(boolean_response=True, then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    ),
+    QuestionType.UNIQUE_CHOICE.value: F("unique_choice_response__linearized_score"),
+    QuestionType.MULTIPLE_CHOICE.value: Max(
+        "multiple_choice_response__linearized_score"
+    ),
+    QuestionType.PERCENTAGE.value: Cast("percentage_response", FloatField()),
+    QuestionType.NUMBER.value: F("number_response"),
+    QuestionType.CLOSED_WITH_SCALE.value: Avg(
+        "closed_with_scale_response_categories__response_choice__linearized_score"
+    ),
+}
+
+ASSESSMENT_FIELD_BY_RESPONSE_MODEL = {
+    ParticipationResponse: "participation__assessment_id",
+    AssessmentResponse: "assessment_id",
+}
+
+
+def get_response_values(queryset, question_type: str) -> List[ResponseValue]:
+    rows = (
+        queryset.filter(question__type=question_type)
+        .annotate(value=VALUE_BY_QUESTION_TYPE[question_type])
+        .values_list(
+            ASSESSMENT_FIELD_BY_RESPONSE_MODEL[queryset.model], "question_id", "value"
+        )
+    )
+    return [row for row in rows if row[2] is not None]
+
+
+def get_response_value(response) -> Optional[ResponseValue]:
+    """Value of a response in the aggregate of its question, None if not accounted"""
+    values = get_response_values(
+        response.__class__.objects.accounted().filter(pk=response.pk),
+        response.question.type,
+    )
+    return values[0] if values else None
+
+
+def update_score_aggregates(
+    previous_value: Optional[ResponseValue], value: Optional[ResponseValue]
+):
+    """Replace the previous value of a response by its new value in the aggregates"""
+    update_score_aggregates_in_bulk(
+        [previous_value] if previous_value else [], [value] if value else []
+    )
+
+
+def get_responses_values(
+    model, response_ids_by_question_type: Dict[str, Iterable[int]]
+) -> List[ResponseValue]:
+    """Values of responses in the aggregates of their questions, a query by type"""
+    values: List[ResponseValue] = []
+    for question_type, response_ids in response_ids_by_question_type.items():
+        if response_ids and question_type in VALUE_BY_QUESTION_TYPE:
+            values += get_response_values(
+                model.objects.accounted().filter(pk__in=response_ids), question_type
+            )
+    return values
+
+
+def update_score_aggregates_in_bulk(
+    previous_values: Iterable[ResponseValue], values: Iterable[ResponseValue]
+):
+    """
+    Replace the previous values of many responses by their new values in the
+    aggregates, with one insert of the missing aggregates and one update
+    """
+    deltas: DefaultDict[Tuple[int, int], List[float]] = defaultdict(lambda: [0.0, 0])
+    for sign, response_values in ((-1, previous_values), (1, values)):
+        for assessment_id, question_id, response_value in response_values:
+            deltas[(assessment_id, question_id)][0] += sign * response_value
+            deltas[(assessment_id, question_id)][1] += sign
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        QuestionScoreAggregate.objects.bulk_create(
+            [
+                QuestionScoreAggregate(
+                    assessment_id=assessment_id, question_id=question_id
+                )
+                for assessment_id, question_id in deltas
+            ],
+            ignore_conflicts=True,
+        )
+        delta_by_pk = {
+            pk: deltas[(assessment_id, question_id)]
+            for pk, assessment_id, question_id in QuestionScoreAggregate.objects.filter(
+                assessment_id__in={key[0] for key in deltas},
+                question_id__in={key[1] for key in deltas},
+            ).values_list("pk", "assessment_id", "question_id")
+            if (assessment_id, question_id) in deltas
+        }
+        QuestionScoreAggregate.objects.filter(pk__in=delta_by_pk).update(
+            value_sum=F("value_sum")
+            + Case(
+                *[
+                    When(pk=pk, then=Value(value_delta))
+                    for pk, (value_delta, _) in delta_by_pk.items()
+                ],
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+            response_count=F("response_count")
+            + Case(
+                *[
+                    When(pk=pk, then=Value(count_delta))
+                    for pk, (_, count_delta) in delta_by_pk.items()
+                ],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+
+
+def compute_score_aggregates(
+    assessment_ids: Optional[Iterable[int]] = None,
+    question_ids: Optional[Iterable[int]] = None,
+) -> Dict[Tuple[int, int], Tuple[float, int]]:
+    """
+    Sum and count of the response values by (assessment id, question id), computed
+    from the responses of the given assessments and questions (all if None).
+    """
+    aggregates: DefaultDict[Tuple[int, int], List[float]] = defaultdict(
+        lambda: [0.0, 0]
+    )
+    for model, assessment_field in ASSESSMENT_FIELD_BY_RESPONSE_MODEL.items():
+        queryset = model.objects.accounted()
+        if assessment_ids is not None:
+            queryset = queryset.filter(**{f"{assessment_field}__in": assessment_ids})
+        if question_ids is not None:
+            queryset = queryset.filter(question_id__in=question_ids)
+        for question_type in VALUE_BY_QUESTION_TYPE:
+            for assessment_id, question_id, value in get_response_values(
+                queryset, question_type
+            ):
+                aggregates[(assessment_id, question_id)][0] += value
+                aggregates[(assessment_id, question_id)][1] += 1
+    return {key: (value_sum, count) for key, (value_sum, count) in aggregates.items()}
+
+
+def rebuild_score_aggregates(
+    assessment_ids: Optional[Iterable[int]] = None,
+    question_ids: Optional[Iterable[int]] = None,
+):
+    """
+    Recompute from the responses the aggregates of the given assessments and
+    questions, all of them if None.
+    """
+    assessment_ids = None if assessment_ids is None else list(assessment_ids)
+    question_ids = None if question_ids is None else list(question_ids)
+    stale_aggregates = QuestionScoreAggregate.objects.all()
+    if assessment_ids is not None:
+        stale_aggregates = stale_aggregates.filter(assessment_id__in=assessment_ids)
+    if question_ids is not None:
+        stale_aggregates = stale_aggregates.filter(question_id__in=question_ids)
+    with transaction.atomic():
+        # the responses written meanwhile update the aggregates once they are replaced
+        stale_aggregate_ids = list(
+            stale_aggregates.select_for_update().values_list("pk", flat=True)
+        )
+        aggregates = compute_score_aggregates(assessment_ids, question_ids)
+        for start in range(0, len(stale_aggregate_ids), 1000):
+            QuestionScoreAggregate.objects.filter(
+                pk__in=stale_aggregate_ids[start : start + 1000]
+            ).delete()
+        # an aggregate created meanwhile already has the responses written meanwhile
+        QuestionScoreAggregate.objects.bulk_create(
+            [
+                QuestionScoreAggregate(
+                    assessment_id=assessment_id,
+                    question_id=question_id,
+                    value_sum=value_sum,
+                    response_count=response_count,
+                )
+                for (assessment_id, question_id), (
+                    value_sum,
+                    response_count,
+                ) in aggregates.items()
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+def rebuild_score_aggregates_of_user(user):
+    """Rebuild the aggregates of the assessments a user responded to"""
+    assessment_ids = set(
+        user.participations.values_list("assessment_id", flat=True)
+    ) | set(user.assessment_responses.values_list("assessment_id", flat=True))
+    if assessment_ids:
+        rebuild_score_aggregates(assessment_ids=assessment_ids)
+
+
+def get_question_score(
+    question_type: str,
+    question_id: int,
+    value_sum: float,
+    response_count: int,
+    plan: ScoringPlan,
+) -> Optional[float]:
+    average = value_sum / response_count
+    if question_type == QuestionType.BOOLEAN:
+        return SCORE_MAP[2] if average >= 0.5 else SCORE_MAP[1]
+    if question_type in RANGE_MODEL_BY_QUESTION_TYPE:
+        return plan.interval_score(question_id, average)
+    return average
+
+
+def get_scores_by_assessment_pk_from_aggregates(
+    assessment_pk: int,
+) -> Dict[str, Dict[str, float]]:
+    survey_id = (
+        Assessment.objects.filter(pk=assessment_pk)
+        .values_list("survey_id", flat=True)
+        .first()
+    )
+    aggregates = list(
+        QuestionScoreAggregate.objects.filter(
+            assessment_id=assessment_pk, response_count__gt=0
+        ).values_list("question_id", "value_sum", "response_count")
+    )
+    plan = get_scoring_plan(survey_id, [row[0] for row in aggregates])
+
+    question_scores = []
+    for question_id, value_sum, response_count in aggregates:
+        question_type = plan.type_by_question_id[question_id]
+        score = get_question_score(
+            question_type, question_id, value_sum, response_count, plan
+        )
+        if score is not None:
+            question_scores.append(
+                (
+                    question_type,
+                    question_id,
+                    plan.hierarchy_by_question_id[question_id],
+                    score,
+                )
+            )
+    return get_scores_by_question_scores(question_scores)
@@ -0,0 +1,87 @@
+"""
+Roll-up of question scores into criteria, marker and pillar scores, shared by all
+the scoring engines. There are at most a few hundred questions by assessment, so
+plain dicts are used.
+"""
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Tuple
+
+from open_democracy_back.utils import QuestionType
+
+
+def get_criterias_score(
+    question_scores: Iterable[Tuple[int, float, bool]]
+) -> Dict[int, Optional[float]]:
+    """
+    Question scores are given as (criteria id, score, is boolean). Boolean
+    questions count in the sum but not in the number of questions of the
+    criteria, a criteria with only boolean questions has no score.
+    """
+    sum_by_criteria_id: DefaultDict[int, float] = defaultdict(float)
+    count_by_criteria_id: DefaultDict[int, int] = defaultdict(int)
+    for criteria_id, score, is_boolean in question_scores:
+        sum_by_criteria_id[criteria_id] += score
+        count_by_criteria_id[criteria_id] += 0 if is_boolean else 1
+    return {
+        criteria_id: (
+            total / count_by_criteria_id[criteria_id]
+            if count_by_criteria_id[criteria_id]
+            else None
+        )
+        for criteria_id, total in sum_by_criteria_id.items()
+    }
+
+
+def get_score_by_previous_score(
+    current_id_by_previous_id: Dict[int, int],
+    previous_score: Dict[int, Optional[float]],
+) -> Dict[int, Optional[float]]:
+    """Mean of the scores of the previous level, ignoring those without score"""
+    scores_by_current_id: Dict[int, List[float]] = {}
+    for previous_id, current_id in current_id_by_previous_id.items():
+        scores = scores_by_current_id.setdefault(current_id, [])
+        score = previous_score.get(previous_id)
+        if score is not None:
+            scores.append(score)
+    return {
+        current_id: (sum(scores) / len(scores) if scores else None)
+        for current_id, scores in scores_by_current_id.items()
+    }
+
+
+def get_scores_by_question_scores(
+    question_scores: Iterable[Tuple[str, int, Tuple[int, int, int], float]]
+) -> Dict[str, Dict[str, float]]:
+    """
+    Roll up question scores, given as (question type, question id, (criteria id,
+    marker id, pillar id), score), into criteria, marker and pillar scores.
+    """
+    score_by_question_id: Dict[int, float] = {}
+    criteria_question_scores: List[Tuple[int, float, bool]] = []
+    marker_id_by_criteria_id: Dict[int, int] = {}
+    pillar_id_by_marker_id: Dict[int, int] = {}
+    for question_type, question_id, hierarchy, score in question_scores:
+        criteria_id, marker_id, pillar_id = hierarchy
+        score_by_question_id[question_id] = score
+        if criteria_id is None:
+            continue
+        criteria_question_scores.append(
+            (criteria_id, score, question_type == QuestionType.BOOLEAN)
+        )
+        if marker_id is not None:
+            marker_id_by_criteria_id.setdefault(criteria_id, marker_id)
+            if pillar_id is not None:
+                pillar_id_by_marker_id.setdefault(marker_id, pillar_id)
+
+    criterias_score = get_criterias_score(criteria_question_scores)
+    markers_score = get_score_by_previous_score(
+        marker_id_by_criteria_id, criterias_score
+    )
+    pillars_score = get_score_by_previous_score(pillar_id_by_marker_id, markers_score)
+
+    return {
+        "by_question_id": score_by_question_id,
+        "by_criteria_id": criterias_score,
+        "by_marker_id": markers_score,
+        "by_pillar_id": pillars_score,
+    }
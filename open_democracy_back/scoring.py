@@ -1,8 +1,17 @@
 from collections import defaultdict
-from typing import TypedDict, List, DefaultDict, Dict, Callable, Any, Tuple, Union
+from typing import (
+    TypedDict,
+    List,
+    DefaultDict,
+    Dict,
+    Callable,
+    Any,
+    Optional,
+    Tuple,
+    Union,
+)
 
-import numpy as np
-import pandas as pd
+from django.conf import settings
 from django.db.models import (
     Case,
     When,
@@ -19,7 +28,15 @@ from open_democracy_back.models import (
     AssessmentResponse,
     Question,
 )
+from open_democracy_back.score_aggregates import (
+    get_scores_by_assessment_pk_from_aggregates,
+)
+from open_democracy_back.score_rollup import get_scores_by_question_scores
 from open_democracy_back.utils import QuestionType, QUESTION_TYPE_WITH_SCORE
+from open_democracy_back.vectorized_scoring import (
+    get_scores_by_assessment_pk_vectorized,
+    get_scores_by_group_of_assessment_pk,
+)
 
 
 class QuestionScore(TypedDict):
@@ -293,39 +310,9 @@ SCORES_FN_BY_QUESTION_TYPE: Dict[str, Callable] = {
 }
 
 
-def get_criterias_score(df: pd.DataFrame) -> pd.Series:
-    df_non_boolean = df[df.type != "boolean"]
-    criteria_sum = df.groupby("criteria_id")["score"].sum()
-    # replace 0 by 1 to avoid divide by 0
-    criteria_count = (
-        df_non_boolean.groupby("criteria_id")["score"].count().replace(0, 1)
-    )
-    return criteria_sum / criteria_count
-
-
-def get_score_by_previous_score(
-    df: pd.DataFrame, previous_score: pd.Series, previous: str, current: str
-) -> pd.Series:
-    current_id_by_previous_ids = (
-        df[[previous, current]].drop_duplicates().set_index(previous)
-    )
-    current_id_by_previous_ids["score"] = previous_score
-    return current_id_by_previous_ids.groupby(current)["score"].mean()
-
-
-def get_markers_score_by_criterias_score(
-    df: pd.DataFrame, criterias_score: pd.Series
-) -> pd.Series:
-    return get_score_by_previous_score(df, criterias_score, "criteria_id", "marker_id")
-
-
-def get_pillars_score_by_markers_score(
-    df: pd.DataFrame, markers_score: pd.Series
-) -> pd.Series:
-    return get_score_by_previous_score(df, markers_score, "marker_id", "pillar_id")
-
-
-def get_scores_by_assessment_pk(assessment_pk: int) -> Dict[str, Dict[str, float]]:
+def get_scores_by_assessment_pk_with_queries(
+    assessment_pk: int,
+) -> Dict[str, Dict[str, float]]:
     # We ignore responses of question that have not criterias
     participation_responses = ParticipationResponse.objects.accounted_in_assessment(
         assessment_pk
@@ -335,15 +322,7 @@ def get_scores_by_assessment_pk(assessment_pk: int) -> Dict[str, Dict[str, float
         assessment_pk
     )
 
-    score_by_question_id: Dict[str, float] = {}
-    df_dict: Dict[str, List[Any]] = {
-        "question_id": [],
-        "criteria_id": [],
-        "marker_id": [],
-        "pillar_id": [],
-        "score": [],
-        "type": [],
-    }
+    question_scores = []
     for question_type in QUESTION_TYPE_WITH_SCORE:
         question_type_scores = SCORES_FN_BY_QUESTION_TYPE[question_type.value](  # type: ignore
             participation_responses
@@ -355,22 +334,36 @@ def get_scores_by_assessment_pk(assessment_pk: int) -> Dict[str, Dict[str, float
             )
         )
         for score in question_type_scores:
-            score_by_question_id[score["question_id"]] = score["score"]
-            df_dict["question_id"].append(score["question_id"])
-            df_dict["criteria_id"].append(score["question__criteria_id"])
-            df_dict["marker_id"].append(score["question__criteria__marker_id"])
-            df_dict["pillar_id"].append(score["question__criteria__marker__pillar_id"])
-            df_dict["score"].append(score["score"])
-            df_dict["type"].append(question_type.value)  # type: ignore
-
-    df = pd.DataFrame.from_dict(df_dict)
-    criterias_score = get_criterias_score(df)
-    markers_score = get_markers_score_by_criterias_score(df, criterias_score)
-    pillars_score = get_pillars_score_by_markers_score(df, markers_score)
-
-    return {
-        "by_question_id": score_by_question_id,
-        "by_criteria_id": dict(criterias_score.replace({np.nan: None})),
-        "by_marker_id": dict(markers_score.replace({np.nan: None})),
-        "by_pillar_id": dict(pillars_score.replace({np.nan: None})),
-    }
+            question_scores.append(
+                (
+                    question_type.value,
+                    score["question_id"],
+                    (
+                        score["question__criteria_id"],
+                        score["question__criteria__marker_id"],
+                        score["question__criteria__marker__pillar_id"],
+                    ),
+                    score["score"],
+                )
+            )
+
+    return get_scores_by_question_scores(question_scores)
+
+
+SCORES_FN_BY_ENGINE: Dict[str, Callable] = {
+    "queries": get_scores_by_assessment_pk_with_queries,
+    "vectorized": get_scores_by_assessment_pk_vectorized,
+    "aggregates": get_scores_by_assessment_pk_from_aggregates,
+}
+
+
+def get_scores_by_assessment_pk(
+    assessment_pk: int, group_by: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Scores of an assessment or, with `group_by` (role, profile, workshop or
+    medium), scores by group of participations, always computed in a single scan.
+    """
+    if group_by:
+        return get_scores_by_group_of_assessment_pk(assessment_pk, group_by)
+    return SCORES_FN_BY_ENGINE[settings.SCORING_ENGINE](assessment_pk)
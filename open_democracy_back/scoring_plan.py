@@ -0,0 +1,229 @@
+"""
+Scoring plan of a survey.
+
+Everything the scoring needs to know about the questions of a survey (their
+criteria, marker and pillar, their type, the scores of their response choices and
+of their ranges) is compiled once per revision of the survey content, so that
+scores are computed from the response rows only.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Q
+
+from open_democracy_back.data_versions import get_survey_content_revision
+from open_democracy_back.models import (
+    NumberRange,
+    PercentageRange,
+    Question,
+    ResponseChoice,
+)
+from open_democracy_back.utils import QuestionType, lazy_import
+
+# only imported when a scoring plan is compiled
+np = lazy_import("numpy")
+
+RANGE_MODEL_BY_QUESTION_TYPE = {
+    QuestionType.PERCENTAGE.value: PercentageRange,
+    QuestionType.NUMBER.value: NumberRange,
+}
+
+QUESTION_FIELDS = (
+    "id",
+    "type",
+    "objectivity",
+    "criteria_id",
+    "criteria__marker_id",
+    "criteria__marker__pillar_id",
+)
+
+
+class IntervalScores:
+    """
+    Scores of the ranges of a percentage or number question. A value gets the score
+    of the first range (in sort order) containing it. As ranges may overlap, the
+    line is split at every bound into the bounds themselves and the open gaps
+    between them, each of them being in the same ranges, so that the score of a
+    value is found with a bisection.
+    """
+
+    def __init__(self, ranges: List[Tuple[Optional[float], Optional[float], float]]):
+        self.ranges = [
+            (
+                float("-inf") if lower_bound is None else lower_bound,
+                float("inf") if upper_bound is None else upper_bound,
+                linearized_score,
+            )
+            for lower_bound, upper_bound, linearized_score in ranges
+        ]
+        self.bounds = sorted(
+            {
+                bound
+                for lower_bound, upper_bound, _ in ranges
+                for bound in (lower_bound, upper_bound)
+                if bound is not None
+            }
+        )
+        self.bound_scores = [self.get_first_range_score(bound) for bound in self.bounds]
+        if self.bounds:
+            gap_values = (
+                [self.bounds[0] - 1]
+                + [
+                    (lower_bound + upper_bound) / 2
+                    for lower_bound, upper_bound in zip(self.bounds, self.bounds[1:])
+                ]
+                + [self.bounds[-1] + 1]
+            )
+        else:
+            gap_values = [0]
+        self.gap_scores = [self.get_first_range_score(value) for value in gap_values]
+
+    def get_first_range_score(self, value: float) -> Optional[float]:
+        for lower_bound, upper_bound, linearized_score in self.ranges:
+            if lower_bound <= value <= upper_bound:
+                return linearized_score
+        return None
+
+    def score(self, value: float) -> Optional[float]:
+        index = bisect_left(self.bounds, value)
+        if index < len(self.bounds) and self.bounds[index] == value:
+            return self.bound_scores[index]
+        return self.gap_scores[index]
+
+
+class ScoringPlan:
+    """Immutable description of a set of questions, used to score their responses"""
+
+    def __init__(
+        self,
+        questions: List[tuple],
+        response_choices: List[Tuple[int, Optional[float]]],
+        ranges_by_question_id: Dict[int, List[tuple]],
+    ):
+        questions = sorted(questions)
+        columns = list(zip(*questions)) if questions else [()] * len(QUESTION_FIELDS)
+        self.question_id = np.array(columns[0], dtype=np.int64)
+        self.type = np.array(columns[1], dtype=object)
+        self.objectivity = np.array(columns[2], dtype=object)
+        self.criteria_id = np.array(columns[3], dtype=object)
+        self.marker_id = np.array(columns[4], dtype=object)
+        self.pillar_id = np.array(columns[5], dtype=object)
+        self.question_ids = frozenset(columns[0])
+        self.type_by_question_id: Dict[int, str] = {
+            question[0]: question[1] for question in questions
+        }
+        self.hierarchy_by_question_id: Dict[int, Tuple[int, int, int]] = {
+            question[0]: tuple(question[3:]) for question in questions
+        }
+
+        response_choices = sorted(response_choices)
+        self.response_choice_id = np.array(
+            [response_choice_id for response_choice_id, _ in response_choices],
+            dtype=np.int64,
+        )
+        self.response_choice_score = np.array(
+            [score for _, score in response_choices], dtype=float
+        )
+        self.linearized_score_by_response_choice_id: Dict[int, Optional[float]] = dict(
+            response_choices
+        )
+
+        self.interval_scores_by_question_id = {
+            question_id: IntervalScores(ranges)
+            for question_id, ranges in ranges_by_question_id.items()
+        }
+
+    def index_of(self, question_ids: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.question_id, question_ids)
+
+    def linearized_scores_of(self, response_choice_ids: np.ndarray) -> np.ndarray:
+        """Linearized scores of response choices, NaN for unknown choices"""
+        scores = np.full(len(response_choice_ids), np.nan)
+        if not len(self.response_choice_id):
+            return scores
+        indexes = np.minimum(
+            np.searchsorted(self.response_choice_id, response_choice_ids),
+            len(self.response_choice_id) - 1,
+        )
+        found = self.response_choice_id[indexes] == response_choice_ids
+        scores[found] = self.response_choice_score[indexes[found]]
+        return scores
+
+    def get_questions(
+        self, pillar_id: Optional[int] = None
+    ) -> List[Tuple[int, str, str]]:
+        """(id, type, objectivity) of the questions, or of the questions of a pillar"""
+        return [
+            (question_id, question_type, objectivity)
+            for question_id, question_type, objectivity, question_pillar_id in zip(
+                self.question_id.tolist(),
+                self.type.tolist(),
+                self.objectivity.tolist(),
+                self.pillar_id.tolist(),
+            )
+            if pillar_id is None or question_pillar_id == pillar_id
+        ]
+
+    def interval_score(self, question_id: int, value: float) -> Optional[float]:
+        interval_scores = self.interval_scores_by_question_id.get(question_id)
+        return interval_scores.score(value) if interval_scores else None
+
+
+def compile_scoring_plan(questions) -> ScoringPlan:
+    ranges_by_question_id: Dict[int, List[tuple]] = {}
+    for range_model in RANGE_MODEL_BY_QUESTION_TYPE.values():
+        for question_id, lower_bound, upper_bound, linearized_score in (
+            range_model.objects.filter(question__in=questions)
+            .order_by("sort_order")
+            .values_list(
+                "question_id", "lower_bound", "upper_bound", "linearized_score"
+            )
+        ):
+            ranges_by_question_id.setdefault(question_id, []).append(
+                (lower_bound, upper_bound, linearized_score)
+            )
+    return ScoringPlan(
+        list(questions.values_list(*QUESTION_FIELDS)),
+        list(
+            ResponseChoice.objects.filter(question__in=questions).values_list(
+                "id", "linearized_score"
+            )
+        ),
+        ranges_by_question_id,
+    )
+
+
+def get_survey_questions_filter(survey_id: int) -> Q:
+    return Q(criteria__marker__pillar__survey_id=survey_id)
+
+
+@lru_cache(maxsize=32)
+def get_compiled_scoring_plan(survey_id: int, revision: str) -> ScoringPlan:
+    return compile_scoring_plan(
+        Question.objects.filter(get_survey_questions_filter(survey_id))
+    )
+
+
+def get_scoring_plan(
+    survey_id: Optional[int], question_ids: Iterable[int]
+) -> ScoringPlan:
+    """
+    Scoring plan of a survey, compiled once per revision of the survey content.
+    If some of the given questions are not in the survey, a plan including them is
+    compiled for this call only.
+    """
+    question_ids = set(question_ids)
+    if survey_id is None:
+        return compile_scoring_plan(Question.objects.filter(id__in=question_ids))
+
+    plan = get_compiled_scoring_plan(survey_id, get_survey_content_revision())
+    if question_ids <= plan.question_ids:
+        return plan
+    return compile_scoring_plan(
+        Question.objects.filter(
+            get_survey_questions_filter(survey_id) | Q(id__in=question_ids)
+        )
+    )
@@ -1,19 +1,47 @@
 import datetime
 
+from django.conf import settings
+from django.db.models import (
+    Count,
+    OuterRef,
+    Prefetch,
+    QuerySet,
+    Subquery,
+    prefetch_related_objects,
+)
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 
 from my_auth.models import User
+from open_democracy_back.assessment_roles import (
+    forget_assessment_role,
+    get_assessment_role,
+    has_details_access,
+    preload_assessment_roles,
+)
 from open_democracy_back.exceptions import ErrorCode
-from open_democracy_back.models import Participation, AssessmentDocument, Region
+from open_democracy_back.models import (
+    AssessmentDocument,
+    AssessmentDocumentUpload,
+    AssessmentRepresentativity,
+    Participation,
+    Region,
+    Workshop,
+)
 from open_democracy_back.models.assessment_models import (
     EPCI,
     Assessment,
+    AssessmentPayment,
     AssessmentResponse,
     AssessmentType,
     Municipality,
     Department,
 )
 from open_democracy_back.models.questionnaire_and_profiling_models import Question
+from open_democracy_back.representativity_counts import (
+    get_representativity_data,
+)
+from open_democracy_back.response_batches import BATCH_MAX_SIZE
 from open_democracy_back.serializers.participation_serializers import (
     OPTIONAL_RESPONSE_FIELDS,
     RESPONSE_FIELDS,
@@ -36,7 +64,8 @@ class MunicipalitySerializer(serializers.ModelSerializer):
 
     @staticmethod
     def get_zip_codes(obj: Municipality):
-        return obj.zip_codes.values_list("code", flat=True)
+        # read from the prefetched zip codes when serializing a list
+        return [zip_code.code for zip_code in obj.zip_codes.all()]
 
     class Meta:
         model = Municipality
@@ -80,7 +109,10 @@ class EpciSerializer(serializers.ModelSerializer):
         zip_codes = []
         for municipality_order in obj.related_municipalities_ordered.all():
             zip_codes += [
-                municipality_order.municipality.zip_codes.values_list("code", flat=True)
+                [
+                    zip_code.code
+                    for zip_code in municipality_order.municipality.zip_codes.all()
+                ]
             ]
         return zip_codes
 
@@ -122,22 +154,6 @@ class AssessmentTypeSerializer(SerializerWithTranslatedFields):
         read_only_fields = fields
 
 
-def get_assessment_role(assessment: Assessment, user: User):
-    if user.is_anonymous:
-        return {"role": None}
-    if assessment.initiated_by_user == user:
-        return "initiator"
-    if assessment.experts.filter(pk=user.pk).exists():
-        return "expert"
-    if Participation.objects.filter(assessment=assessment, user=user).exists():
-        return "participant"
-    return ""
-
-
-def has_details_access(assessment_role):
-    return assessment_role in ["expert", "initiator"]
-
-
 class AssessmentDocumentSerializer(serializers.ModelSerializer):
     file = Base64FileField()
 
@@ -156,6 +172,104 @@ class AssessmentDocumentSerializer(serializers.ModelSerializer):
         ]
 
 
+class AssessmentDocumentUploadSerializer(serializers.ModelSerializer):
+    def validate_size(self, value):
+        if not 0 < value <= settings.DOCUMENT_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                detail=f"The size must be between 1 and "
+                f"{settings.DOCUMENT_UPLOAD_MAX_SIZE} bytes",
+                code=ErrorCode.INCORRECT_UPLOAD_SIZE.value,
+            )
+        return value
+
+    class Meta:
+        model = AssessmentDocumentUpload
+        fields = [
+            "assessment",
+            "category",
+            "file_name",
+            "id",
+            "name",
+            "offset",
+            "size",
+        ]
+        read_only_fields = [
+            "id",
+            "offset",
+        ]
+
+
+def get_count_subquery(queryset):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values("assessment_id")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+ASSESSMENT_LIST_PREFETCHES = [
+    "assessment_type",
+    "survey",
+    "initiated_by_user",
+    "experts",
+    "documents",
+    Prefetch("payment", queryset=AssessmentPayment.objects.select_related("author")),
+    "municipality__zip_codes",
+    "epci__related_municipalities_ordered__municipality__zip_codes",
+    Prefetch(
+        "representativities",
+        queryset=AssessmentRepresentativity.objects.select_related(
+            "representativity_criteria"
+        ),
+    ),
+]
+
+
+def annotate_assessments_for_list(queryset: QuerySet) -> QuerySet:
+    """
+    Annotate the counts serialized by AssessmentSerializer, so that a list is
+    serialized with a constant number of queries
+    """
+    return queryset.annotate(
+        annotated_participation_count=get_count_subquery(
+            Participation.objects.filter(
+                assessment_id=OuterRef("pk"), user__is_unknown_user=False
+            )
+        ),
+        annotated_workshop_count=get_count_subquery(
+            Workshop.objects.filter(assessment_id=OuterRef("pk"))
+        ),
+    )
+
+
+class AssessmentListSerializer(serializers.ListSerializer):
+    """
+    Serialize assessments with a constant number of queries: querysets are
+    annotated, the relations of all the assessments prefetched at once, and their
+    representativities and the roles of the user computed together
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, QuerySet):
+            data = annotate_assessments_for_list(data)
+        assessments = list(data)
+        prefetch_related_objects(assessments, *ASSESSMENT_LIST_PREFETCHES)
+        if request := self.context.get("request"):
+            preload_assessment_roles(request, assessments)
+        self.context["representativity_data"] = get_representativity_data(
+            [
+                representativity
+                for assessment in assessments
+                for representativity in assessment.representativities.all()
+            ]
+        )
+        return super().to_representation(assessments)
+
+
 class AssessmentSerializer(serializers.ModelSerializer):
     assessment_type = serializers.CharField(
         read_only=True, source="assessment_type.assessment_type"
@@ -187,13 +301,12 @@ class AssessmentSerializer(serializers.ModelSerializer):
         """
         if not (request := self.context.get("request", {})):
             return {"role": None}
-        user = request.user
-        role = get_assessment_role(obj, user)
+        role = get_assessment_role(request, obj)
         detail_access = has_details_access(role)
         to_return = {"role": role, "has_detail_access": detail_access}
         if not detail_access:
             return to_return
-        if payment := obj.payment.first():
+        if payment := next(iter(obj.payment.all()), None):
             to_return["payment_date"] = payment.created
             to_return["payment_amount"] = payment.amount
             to_return["payment_author"] = payment.author.email
@@ -205,10 +318,14 @@ class AssessmentSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def get_participation_count(obj: Assessment):
+        if hasattr(obj, "annotated_participation_count"):
+            return obj.annotated_participation_count
         return obj.participations.filter(user__is_unknown_user=False).count()
 
     @staticmethod
     def get_workshop_count(obj: Assessment):
+        if hasattr(obj, "annotated_workshop_count"):
+            return obj.annotated_workshop_count
         return obj.workshops.count()
 
     @staticmethod
@@ -225,10 +342,13 @@ class AssessmentSerializer(serializers.ModelSerializer):
         if "experts" in validated_data.keys():
             experts = validated_data.pop("experts")
             instance.experts.set(experts)
+            if request := self.context.get("request"):
+                forget_assessment_role(request, instance)
         return super().update(instance, validated_data)
 
     class Meta:
         model = Assessment
+        list_serializer_class = AssessmentListSerializer
         fields = [
             "assessment_type",
             "conditions_of_sale_consent",
@@ -296,51 +416,47 @@ class AssessmentNoDetailSerializer(AssessmentSerializer):
 
 
 class AssessmentResponseSerializer(ResponseSerializer):
+    # responses are checked and saved by batches, see response_batches.BatchReferences
     assessment_id = serializers.PrimaryKeyRelatedField(
         source="assessment", queryset=Assessment.objects.all()
     )
     answered_by = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
-    def validate(self, data):
-        assessment = data["assessment"]
-        population = assessment.population or 0
-        user = self.context["request"].user
+    class Meta:
+        model = AssessmentResponse
+        fields = RESPONSE_FIELDS + ["assessment_id", "answered_by"]
+        optional_fields = OPTIONAL_RESPONSE_FIELDS
 
-        question = data["question"]
 
-        is_initiator = assessment.initiated_by_user.id == user.id
-        is_expert = assessment.experts.filter(id=user.id).exists()
+class AssessmentResponseBatchSerializer(serializers.Serializer):
+    assessment_id = serializers.PrimaryKeyRelatedField(
+        source="assessment", queryset=Assessment.objects.all()
+    )
+    # the participation of the user, if they are not an initiator or expert
+    participation_id = serializers.IntegerField(required=False, allow_null=True)
+    responses = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=BATCH_MAX_SIZE
+    )
 
+    def get_eligible_questions(self):
+        """Questions the user has to respond to"""
+        assessment = self.validated_data["assessment"]
+        questions = Question.objects.all()
         # Filter role and profile if the user is not an initiator or expert
-        if not (is_initiator or is_expert):
-            participation = Participation.objects.get(
+        if not has_details_access(
+            get_assessment_role(self.context["request"], assessment)
+        ):
+            participation = Participation.objects.filter(
                 assessment_id=assessment.pk,
-                id=self.context["request"].data["participation_id"],
-                user=user,
-            )
-            questions = Question.objects.filter_by_role(
-                participation.role
+                id=self.validated_data.get("participation_id"),
+                user=self.context["request"].user,
+            ).first()
+            if participation is None:
+                raise serializers.ValidationError(
+                    {"participation_id": "Invalid participation"},
+                    code="does_not_exist",
+                )
+            questions = questions.filter_by_role(
+                participation.role_id
             ).filter_by_profiles(participation.profiles.all())
-        else:
-            questions = Question.objects
-
-        if (
-            not questions.filter_by_population(population)
-            .filter(id=data["question"].id)
-            .exists()
-        ):
-            raise serializers.ValidationError(
-                detail="You don't need to respond to this question.",
-                code=ErrorCode.QUESTION_NOT_NEEDED.value,
-            )
-        if question.objectivity == "subjective" or question.survey_type == "profiling":
-            raise serializers.ValidationError(
-                detail="A subjective response or profiling response must be link to the participation, not the assessment",
-                code=ErrorCode.NEED_ASSESSMENT_RESPONSE.value,
-            )
-        return data
-
-    class Meta:
-        model = AssessmentResponse
-        fields = RESPONSE_FIELDS + ["assessment_id", "answered_by"]
-        optional_fields = OPTIONAL_RESPONSE_FIELDS
+        return questions.filter_by_population(assessment.population or 0)
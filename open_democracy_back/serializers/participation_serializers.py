@@ -1,6 +1,6 @@
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
-from open_democracy_back.exceptions import ErrorCode
 
 from open_democracy_back.models import Assessment
 from open_democracy_back.models.assessment_models import AssessmentResponse
@@ -17,6 +17,18 @@ from open_democracy_back.models.questionnaire_and_profiling_models import (
     Question,
     ResponseChoice,
 )
+from open_democracy_back.representativity_counts import (
+    get_count_key,
+    update_representativity_counts,
+)
+from open_democracy_back.response_batches import (
+    BATCH_MAX_SIZE,
+    save_category_responses,
+)
+from open_democracy_back.score_aggregates import (
+    get_response_value,
+    update_score_aggregates,
+)
 
 RESPONSE_FIELDS = [
     "id",
@@ -131,6 +143,23 @@ class ClosedWithScaleCategoryResponseSerializer(serializers.ModelSerializer):
         ]
 
 
+def save_closed_with_scale_categories(response, categories_data):
+    """Create or update the category responses, in one fetch and two writes"""
+    if not categories_data:
+        return
+    save_category_responses(
+        response.__class__,
+        {
+            response.pk: {
+                item["category"].pk: (
+                    item["response_choice"].pk if item["response_choice"] else None
+                )
+                for item in categories_data
+            }
+        },
+    )
+
+
 class ResponseSerializer(serializers.ModelSerializer):
     question_id = serializers.PrimaryKeyRelatedField(
         source="question", queryset=Question.objects.all()
@@ -151,6 +180,7 @@ class ResponseSerializer(serializers.ModelSerializer):
         many=True, required=False
     )
 
+    @transaction.atomic
     def create(self, validated_data):
         closed_with_scale_response_categories_data = []
         if "closed_with_scale_response_categories" in validated_data.keys():
@@ -158,37 +188,28 @@ class ResponseSerializer(serializers.ModelSerializer):
                 "closed_with_scale_response_categories"
             )
         response = super().create(validated_data)
-        for item in closed_with_scale_response_categories_data:
-            participation_response = (
-                response if response.__class__ == ParticipationResponse else None
-            )
-            assessment_response = (
-                response if response.__class__ == AssessmentResponse else None
-            )
-            ClosedWithScaleCategoryResponse.objects.create(
-                category=item["category"],
-                response_choice=item["response_choice"],
-                participation_response=participation_response,
-                assessment_response=assessment_response,
-            )
+        save_closed_with_scale_categories(
+            response, closed_with_scale_response_categories_data
+        )
+        update_score_aggregates(None, get_response_value(response))
+        update_representativity_counts(None, get_count_key(response))
         return response
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        previous_value = get_response_value(instance)
+        previous_count_key = get_count_key(instance)
         closed_with_scale_response_categories_data = []
         if "closed_with_scale_response_categories" in validated_data.keys():
             closed_with_scale_response_categories_data = validated_data.pop(
                 "closed_with_scale_response_categories"
             )
         response = super().update(instance, validated_data)
-        for item in closed_with_scale_response_categories_data:
-            (
-                closedWithScaleCategoryResponse,
-                _,
-            ) = response.closed_with_scale_response_categories.get_or_create(
-                category=item["category"]
-            )
-            closedWithScaleCategoryResponse.response_choice = item["response_choice"]
-            closedWithScaleCategoryResponse.save()
+        save_closed_with_scale_categories(
+            response, closed_with_scale_response_categories_data
+        )
+        update_score_aggregates(previous_value, get_response_value(response))
+        update_representativity_counts(previous_count_key, get_count_key(response))
         return response
 
     class Meta:
@@ -196,33 +217,17 @@ class ResponseSerializer(serializers.ModelSerializer):
 
 
 class ParticipationResponseSerializer(ResponseSerializer):
+    # responses are checked and saved by batches, see response_batches.BatchReferences
     participation_id = ParticipationField(source="participation")
 
-    def validate(self, data):
-        participation = data["participation"]
-        population = participation.assessment.population or 0
-        if (
-            not Question.objects.filter_by_role(participation.role)
-            .filter_by_population(population)
-            .filter(id=data["question"].id)
-            .exists()
-        ):
-            raise serializers.ValidationError(
-                detail="You don't need to respond to this question.",
-                code=ErrorCode.QUESTION_NOT_NEEDED.value,
-            )
-        question = data["question"]
-        if (
-            question.objectivity == "objective"
-            and question.survey_type == "questionnaire"
-        ):
-            raise serializers.ValidationError(
-                detail="An objective response must be link to the assessment, not the participation",
-                code=ErrorCode.NEED_PARTICIPATION_RESPONSE.value,
-            )
-        return data
-
     class Meta:
         model = ParticipationResponse
         fields = RESPONSE_FIELDS + ["participation_id"]
         optional_fields = OPTIONAL_RESPONSE_FIELDS
+
+
+class ParticipationResponseBatchSerializer(serializers.Serializer):
+    participation_id = ParticipationField(source="participation")
+    responses = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=BATCH_MAX_SIZE
+    )
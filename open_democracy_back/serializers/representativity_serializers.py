@@ -18,6 +18,22 @@ class AssessmentRepresentativityCriteriaSerializer(serializers.ModelSerializer):
     representativity_criteria_name = serializers.CharField(
         read_only=True, source="representativity_criteria.name"
     )
+    count_by_response_choice = serializers.SerializerMethodField()
+    respected = serializers.SerializerMethodField()
+
+    def get_representativity_data(self, obj: AssessmentRepresentativity):
+        # computed for all the representativities when serializing a list
+        return self.context.get("representativity_data", {}).get(obj.pk)
+
+    def get_count_by_response_choice(self, obj: AssessmentRepresentativity):
+        if data := self.get_representativity_data(obj):
+            return data["count_by_response_choice"]
+        return obj.count_by_response_choice
+
+    def get_respected(self, obj: AssessmentRepresentativity):
+        if data := self.get_representativity_data(obj):
+            return data["respected"]
+        return obj.respected
 
     class Meta:
         model = AssessmentRepresentativity
@@ -1,16 +1,18 @@
 import base64
-import mimetypes
-import os
-import uuid
-import re
 
 import humanize
 from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
 from django.db.models.fields.files import FieldFile
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SkipField
 
+from open_democracy_back.models.assessment_models import (
+    get_file_metadata,
+    get_unique_file_name,
+)
+
 
 class Base64FileField(serializers.FileField):
     # When the front knows this data among other models properties and PATCHes
@@ -20,6 +22,10 @@ class Base64FileField(serializers.FileField):
         already_ok, _ = super().validate_empty_values(data)
         if already_ok:
             return already_ok, data
+        # files of multipart requests are streamed by django to a temporary file
+        # instead of being decoded in memory
+        if isinstance(data, UploadedFile):
+            return already_ok, data
         if "base_64" not in data and self.context.get("request").method != "GET":
             raise SkipField()
         return already_ok, data
@@ -28,6 +34,10 @@ class Base64FileField(serializers.FileField):
         if data is None:
             return None
 
+        if isinstance(data, UploadedFile):
+            data.name = get_unique_file_name(data.name)
+            return super().to_internal_value(data)
+
         if "base_64" in data and isinstance(data["base_64"], str):
             if "data:" in data["base_64"] and ";base64," in data["base_64"]:
                 _, file_base64 = data["base_64"].split(";base64,")
@@ -39,9 +49,7 @@ class Base64FileField(serializers.FileField):
             except TypeError:
                 raise ValidationError("invalid_file")
 
-            file_name_uid = str(uuid.uuid4())[:12]
-            complete_file_name = f"{file_name_uid}_{data['name']}"
-            res = ContentFile(decoded_file, name=complete_file_name)
+            res = ContentFile(decoded_file, name=get_unique_file_name(data["name"]))
 
             return super().to_internal_value(res)
         self.fail("neither 'base64' nor 'link' found in data")
@@ -53,12 +61,19 @@ class Base64FileField(serializers.FileField):
             full_link = self.context.get("request").build_absolute_uri(instance.url)
         else:
             full_link = instance.url
-        name_without_uuid = re.match("^[^_]*_?(.*)$", instance.name).group(1)
+        # the metadata stored by the model if any, read from the file otherwise
+        document = instance.instance
+        metadata = {
+            field: getattr(document, field, None)
+            for field in ["file_size", "mime_type", "display_name"]
+        }
+        if metadata["file_size"] is None:
+            metadata = get_file_metadata(instance)
         # TODO here
         # return full_link
         return {
-            "name": name_without_uuid,
+            "name": metadata["display_name"],
             "link": full_link,
-            "mime_type": mimetypes.guess_type(instance.name)[0],
-            "size": humanize.naturalsize(os.path.getsize(instance.path)),
+            "mime_type": metadata["mime_type"],
+            "size": humanize.naturalsize(metadata["file_size"]),
         }
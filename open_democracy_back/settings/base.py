@@ -14,6 +14,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os
 import getconf
 import sys
+import tempfile
 
 PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 BASE_DIR = os.path.dirname(PROJECT_DIR)
@@ -126,6 +127,16 @@ if config.getstr("database.engine") == "postgresql":
         }
     }
 
+# Cache shared by all the web workers, its table is created by the migration
+# 0074_create_cache_table, or with `python manage.py createcachetable`
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -194,6 +205,15 @@ STATIC_URL = "/static/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
+# Resumable uploads of assessment documents: the chunks are read from the request
+# and appended to a file of the uploads directory by blocks of
+# DOCUMENT_UPLOAD_BLOCK_SIZE bytes, then the complete file is sent to the storage
+DOCUMENT_UPLOAD_DIR = config.getstr(
+    "uploads.directory", os.path.join(tempfile.gettempdir(), "demometre_uploads")
+)
+DOCUMENT_UPLOAD_BLOCK_SIZE = config.getint("uploads.block_size", 1024 * 1024)
+DOCUMENT_UPLOAD_MAX_SIZE = config.getint("uploads.max_size", 100 * 1024 * 1024)
+
 
 # Wagtail settings
 
@@ -234,5 +254,12 @@ REST_FRAMEWORK = {
 
 AUTH_USER_MODEL = "my_auth.User"
 
+# Engine used to compute the scores of an assessment: "aggregates" reads the question
+# score aggregates maintained on response writes, "queries" runs grouped queries
+# per question type and "vectorized" fetches the responses once and uses NumPy
+SCORING_ENGINE = config.getstr("scoring.engine", "aggregates")
+# Processes computing the scores of many assessments at once
+SCORING_WORKERS = config.getint("scoring.workers", os.cpu_count() or 1)
+
 HIJACK_ALLOW_GET_REQUESTS = True
 LOGIN_REDIRECT_URL = "/"
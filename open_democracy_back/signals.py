@@ -1,9 +1,76 @@
 from django.core.mail import send_mail
-from django.db.models.signals import pre_save
+from django.db.models import Q
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 from django.dispatch import receiver
 from django.conf import settings
 
-from open_democracy_back.models import Assessment
+from my_auth.models import User
+from open_democracy_back.models import (
+    EPCI,
+    Assessment,
+    AssessmentRepresentativity,
+    AssessmentResponse,
+    AssessmentType,
+    Category,
+    ClosedWithScaleCategoryResponse,
+    Criteria,
+    CriteriaDefinition,
+    Definition,
+    Department,
+    Marker,
+    Municipality,
+    MunicipalityOrderByEPCI,
+    NumberRange,
+    Participation,
+    ParticipationResponse,
+    PercentageRange,
+    Pillar,
+    ProfileDefinition,
+    ProfileType,
+    ProfilingQuestion,
+    Question,
+    QuestionRule,
+    QuestionnaireQuestion,
+    Region,
+    RepresentativityCriteria,
+    RepresentativityCriteriaRule,
+    ResponseChoice,
+    Role,
+    Survey,
+    ThematicTag,
+    ZipCode,
+)
+from open_democracy_back.questionnaire_sync import (
+    CONTAINERS_BY_MODEL,
+    TOMBSTONE_MODELS,
+    add_tombstone,
+    get_former_containers,
+    touch_containers,
+)
+from open_democracy_back.representativity_counts import (
+    get_count_key,
+    rebuild_representativity_counts_of_user,
+    update_published_results,
+    update_representativity_counts,
+)
+from open_democracy_back.data_versions import (
+    bump_assessment_data_versions,
+    bump_assessment_data_versions_of_user,
+    bump_locality_revision,
+    bump_survey_content_revision,
+)
+from open_democracy_back.score_aggregates import (
+    get_response_value,
+    rebuild_score_aggregates,
+    rebuild_score_aggregates_of_user,
+    update_score_aggregates,
+)
 
 
 @receiver(pre_save, sender=Assessment)
@@ -22,3 +89,355 @@ def warn_when_assessment_is_closed(sender, instance, **kwargs):
             settings.DEFAULT_FROM_EMAIL,
             ["demometre@democratieouverte.org"],
         )
+
+
+@receiver(pre_delete, sender=ParticipationResponse)
+@receiver(pre_delete, sender=AssessmentResponse)
+def remove_response_from_score_aggregates(sender, instance, **kwargs):
+    update_score_aggregates(get_response_value(instance), None)
+
+
+@receiver(pre_delete, sender=ParticipationResponse)
+def remove_response_from_representativity_counts(sender, instance, **kwargs):
+    update_representativity_counts(get_count_key(instance), None)
+
+
+@receiver(post_save, sender=RepresentativityCriteria)
+def create_representativities_of_criteria(sender, instance, created, **kwargs):
+    if created:
+        AssessmentRepresentativity.objects.bulk_create(
+            [
+                AssessmentRepresentativity(
+                    assessment=assessment, representativity_criteria=instance
+                )
+                for assessment in Assessment.objects.filter(
+                    survey__survey_locality=instance.survey_locality
+                )
+            ]
+        )
+    # the minimum rate may have changed
+    update_published_results(
+        instance.representativities.values_list("assessment_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=RepresentativityCriteriaRule)
+@receiver(post_delete, sender=RepresentativityCriteriaRule)
+def update_published_results_of_rule(sender, instance, **kwargs):
+    update_published_results(
+        AssessmentRepresentativity.objects.filter(
+            representativity_criteria_id=instance.representativity_criteria_id
+        ).values_list("assessment_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=AssessmentRepresentativity)
+@receiver(post_delete, sender=AssessmentRepresentativity)
+def update_published_results_of_representativity(sender, instance, **kwargs):
+    update_published_results([instance.assessment_id])
+
+
+@receiver(post_save, sender=ResponseChoice)
+@receiver(post_delete, sender=ResponseChoice)
+def update_published_results_of_response_choice(sender, instance, **kwargs):
+    # the representativities are checked for each choice of the profiling question
+    update_published_results(
+        AssessmentRepresentativity.objects.filter(
+            representativity_criteria__profiling_question_id=instance.question_id
+        ).values_list("assessment_id", flat=True)
+    )
+
+
+@receiver(pre_save, sender=ResponseChoice)
+def check_if_response_choice_score_changes(sender, instance, **kwargs):
+    # the linearized score is already updated by Score.update_score
+    instance.score_has_changed = (
+        instance.pk is not None
+        and not ResponseChoice.objects.filter(
+            pk=instance.pk, linearized_score=instance.linearized_score
+        ).exists()
+    )
+
+
+@receiver(post_save, sender=ResponseChoice)
+def rebuild_score_aggregates_when_score_changes(sender, instance, **kwargs):
+    if instance.score_has_changed:
+        rebuild_score_aggregates(question_ids=[instance.question_id])
+
+
+@receiver(post_delete, sender=ResponseChoice)
+@receiver(post_delete, sender=Category)
+def rebuild_score_aggregates_of_question_content(sender, instance, **kwargs):
+    rebuild_score_aggregates(question_ids=[instance.question_id])
+
+
+@receiver(pre_save, sender=Question)
+@receiver(pre_save, sender=QuestionnaireQuestion)
+@receiver(pre_save, sender=ProfilingQuestion)
+def check_if_question_accounting_changes(sender, instance, **kwargs):
+    # the criteria, the type or the profiling status of a question change which
+    # responses are accounted and how
+    instance.accounting_has_changed = (
+        instance.pk is not None
+        and not Question._base_manager.filter(
+            pk=instance.pk,
+            criteria_id=instance.criteria_id,
+            type=instance.type,
+            profiling_question=instance.profiling_question,
+        ).exists()
+    )
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=QuestionnaireQuestion)
+@receiver(post_save, sender=ProfilingQuestion)
+def rebuild_score_aggregates_of_question(sender, instance, created, **kwargs):
+    if not created and getattr(instance, "accounting_has_changed", False):
+        rebuild_score_aggregates(question_ids=[instance.pk])
+
+
+@receiver(pre_save, sender=User)
+def check_if_user_accounting_changes(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    # the responses of unknown users are not accounted
+    instance.accounting_has_changed = (
+        not raw
+        and instance.pk is not None
+        and (update_fields is None or "is_unknown_user" in update_fields)
+        and not User.objects.filter(
+            pk=instance.pk, is_unknown_user=instance.is_unknown_user
+        ).exists()
+    )
+
+
+@receiver(post_save, sender=User)
+def rebuild_aggregates_of_user(sender, instance, **kwargs):
+    if getattr(instance, "accounting_has_changed", False):
+        rebuild_score_aggregates_of_user(instance)
+        rebuild_representativity_counts_of_user(instance)
+        bump_assessment_data_versions_of_user(instance)
+
+
+@receiver(pre_delete, sender=User)
+def remember_assessments_of_user_responses(sender, instance, **kwargs):
+    # the participations of the user are deleted with their responses, which
+    # update the aggregates and counts, but its assessment responses are kept
+    # without user and are then no longer accounted
+    instance.assessment_response_assessment_ids = set(
+        instance.assessment_responses.values_list("assessment_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=User)
+def rebuild_aggregates_of_user_responses(sender, instance, **kwargs):
+    assessment_ids = getattr(instance, "assessment_response_assessment_ids", None)
+    if assessment_ids and not instance.is_unknown_user:
+        rebuild_score_aggregates(assessment_ids=assessment_ids)
+        bump_assessment_data_versions(assessment_ids)
+
+
+@receiver(post_save, sender=ParticipationResponse)
+@receiver(post_delete, sender=ParticipationResponse)
+def bump_data_version_of_participation_response(sender, instance, **kwargs):
+    bump_assessment_data_versions(
+        Participation.objects.filter(pk=instance.participation_id).values_list(
+            "assessment_id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=AssessmentResponse)
+@receiver(post_delete, sender=AssessmentResponse)
+def bump_data_version_of_assessment_response(sender, instance, **kwargs):
+    bump_assessment_data_versions([instance.assessment_id])
+
+
+@receiver(m2m_changed, sender=ParticipationResponse.multiple_choice_response.through)
+def bump_data_version_of_participation_multiple_choice_response(
+    sender, instance, action, reverse, **kwargs
+):
+    if not reverse and action.startswith("post_"):
+        bump_data_version_of_participation_response(sender, instance)
+
+
+@receiver(m2m_changed, sender=AssessmentResponse.multiple_choice_response.through)
+def bump_data_version_of_assessment_multiple_choice_response(
+    sender, instance, action, reverse, **kwargs
+):
+    if not reverse and action.startswith("post_"):
+        bump_data_version_of_assessment_response(sender, instance)
+
+
+@receiver(post_save, sender=ClosedWithScaleCategoryResponse)
+@receiver(post_delete, sender=ClosedWithScaleCategoryResponse)
+def bump_data_version_of_closed_with_scale_category_response(
+    sender, instance, **kwargs
+):
+    if instance.participation_response_id:
+        bump_assessment_data_versions(
+            ParticipationResponse.objects.filter(
+                pk=instance.participation_response_id
+            ).values_list("participation__assessment_id", flat=True)
+        )
+    if instance.assessment_response_id:
+        bump_assessment_data_versions(
+            AssessmentResponse.objects.filter(
+                pk=instance.assessment_response_id
+            ).values_list("assessment_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=Participation)
+@receiver(post_delete, sender=Participation)
+def bump_data_version_of_participation(sender, instance, **kwargs):
+    bump_assessment_data_versions([instance.assessment_id])
+
+
+@receiver(m2m_changed, sender=Participation.profiles.through)
+def bump_data_version_of_participation_profiles(
+    sender, instance, action, reverse, **kwargs
+):
+    if not reverse and action.startswith("post_"):
+        bump_data_version_of_participation(sender, instance)
+
+
+SURVEY_CONTENT_MODELS = [
+    Category,
+    Question,
+    QuestionnaireQuestion,
+    ProfilingQuestion,
+    ResponseChoice,
+    PercentageRange,
+    NumberRange,
+    Criteria,
+    Marker,
+    Pillar,
+    Role,
+    # in the survey bundle only
+    Survey,
+    AssessmentType,
+    ThematicTag,
+    Definition,
+    CriteriaDefinition,
+    QuestionRule,
+    ProfileType,
+    # in the profile rules
+    ProfileDefinition,
+]
+
+
+def bump_survey_content_revision_on_change(sender, **kwargs):
+    bump_survey_content_revision()
+
+
+for survey_content_model in SURVEY_CONTENT_MODELS:
+    post_save.connect(
+        bump_survey_content_revision_on_change, sender=survey_content_model
+    )
+    post_delete.connect(
+        bump_survey_content_revision_on_change, sender=survey_content_model
+    )
+
+
+# models of the locality index, surveys included as they tell which locality types
+# are looked for
+LOCALITY_MODELS = [
+    Region,
+    Department,
+    Municipality,
+    ZipCode,
+    EPCI,
+    MunicipalityOrderByEPCI,
+    Survey,
+]
+
+
+def bump_locality_revision_on_change(sender, **kwargs):
+    bump_locality_revision()
+
+
+for locality_model in LOCALITY_MODELS:
+    post_save.connect(bump_locality_revision_on_change, sender=locality_model)
+    post_delete.connect(bump_locality_revision_on_change, sender=locality_model)
+
+
+@receiver(post_save, sender=Municipality)
+def update_assessment_localities_of_municipality(sender, instance, **kwargs):
+    # the population of a department or region is that of its municipalities
+    locality_filter = Q(municipality=instance)
+    if instance.department_id:
+        locality_filter |= Q(department_id=instance.department_id) | Q(
+            region__departments=instance.department_id
+        )
+    Assessment.objects.filter(locality_filter).update_localities()
+
+
+@receiver(post_save, sender=EPCI)
+def update_assessment_localities_of_epci(sender, instance, **kwargs):
+    Assessment.objects.filter(epci=instance).update_localities()
+
+
+@receiver(post_save, sender=Department)
+def update_assessment_localities_of_department(sender, instance, **kwargs):
+    Assessment.objects.filter(department=instance).update_localities()
+
+
+@receiver(post_save, sender=Region)
+def update_assessment_localities_of_region(sender, instance, **kwargs):
+    Assessment.objects.filter(region=instance).update_localities()
+
+
+QUESTIONNAIRE_RELATIONS = [
+    Question.roles.through,
+    Question.profiles.through,
+    Question.assessment_types.through,
+    Criteria.thematic_tags.through,
+    QuestionRule.response_choices.through,
+]
+
+
+def on_questionnaire_relation_change(
+    sender, instance, action, reverse, model, pk_set, **kwargs
+):
+    if not action.startswith("post_"):
+        return
+    # the roles of the questions are in their chart data, the other relations in
+    # the survey bundle
+    bump_survey_content_revision()
+    if not reverse:
+        touch_containers([instance])
+    elif pk_set:
+        touch_containers(model._base_manager.filter(pk__in=pk_set))
+
+
+for questionnaire_relation in QUESTIONNAIRE_RELATIONS:
+    m2m_changed.connect(on_questionnaire_relation_change, sender=questionnaire_relation)
+
+
+@receiver(m2m_changed, sender=ProfileDefinition.response_choices.through)
+def bump_survey_content_revision_of_profile_definition(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_survey_content_revision()
+
+
+def remember_former_containers(sender, instance, raw=False, **kwargs):
+    instance._former_containers = None if raw else get_former_containers(instance)
+
+
+def touch_containers_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        former_containers = getattr(instance, "_former_containers", None)
+        touch_containers([instance], [former_containers] if former_containers else [])
+
+
+def touch_containers_on_delete(sender, instance, **kwargs):
+    touch_containers([instance])
+    if sender in TOMBSTONE_MODELS:
+        add_tombstone(instance)
+
+
+for questionnaire_model in CONTAINERS_BY_MODEL:
+    pre_save.connect(remember_former_containers, sender=questionnaire_model)
+    post_save.connect(touch_containers_on_save, sender=questionnaire_model)
+    post_delete.connect(touch_containers_on_delete, sender=questionnaire_model)
@@ -0,0 +1,109 @@
+"""
+Pre-rendered bundle of all the surveys and their questionnaire questions.
+
+Every participant downloads the same surveys at the start of a session, and
+serializing them takes dozens of queries. The bundle is rendered once per
+revision of the survey content and per language, as JSON and gzipped JSON, and
+shared by the workers through the cache. Each worker also keeps the bundles of
+the current revision in memory, so that serving one only costs the lookup of
+the revision, and revalidating it with its ETag too.
+"""
+import gzip
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from rest_framework.settings import api_settings
+
+from open_democracy_back.data_versions import (
+    ASSESSMENT_DATA_TIMEOUT,
+    get_survey_content_revision,
+)
+from open_democracy_back.models import QuestionnaireQuestion, Survey
+from open_democracy_back.serializers.questionnaire_and_profiling_serializers import (
+    FullSurveySerializer,
+    QuestionnaireQuestionSerializer,
+)
+
+GZIP_COMPRESS_LEVEL = 9
+
+
+class SurveyBundle(NamedTuple):
+    etag: str
+    content: bytes
+    gzipped_content: bytes
+
+
+def get_survey_bundle_data() -> dict:
+    surveys = (
+        Survey.objects.prefetch_related("pillars")
+        .prefetch_related("pillars__markers")
+        .prefetch_related("pillars__markers__criterias")
+        .prefetch_related("pillars__markers__criterias__questions")
+        .prefetch_related("pillars__markers__criterias__thematic_tags")
+        .prefetch_related("pillars__markers__criterias__related_definition_ordered")
+    )
+    questions = (
+        QuestionnaireQuestion.objects.exclude(criteria__marker__pillar__isnull=True)
+        .prefetch_related("profiles")
+        .prefetch_related("criteria")
+        .prefetch_related("criteria__marker")
+        .prefetch_related("criteria__marker__pillar")
+        .prefetch_related("criteria__marker__pillar__survey")
+        .prefetch_related("allows_to_explain")
+        .prefetch_related("assessment_types")
+        .prefetch_related("response_choices")
+        .prefetch_related("categories")
+        .prefetch_related("roles")
+        .prefetch_related("rules")
+        .prefetch_related("explained_by")
+        .order_by(
+            "criteria__marker__pillar__code",
+            "criteria__marker__code",
+            "criteria__code",
+            "code",
+        )
+    )
+    return {
+        "surveys": FullSurveySerializer(surveys, many=True).data,
+        "questions": QuestionnaireQuestionSerializer(questions, many=True).data,
+    }
+
+
+def render_survey_bundle(revision: str, language: str) -> SurveyBundle:
+    with translation.override(language):
+        data = get_survey_bundle_data()
+    # rendered as the API renders its responses
+    content = api_settings.DEFAULT_RENDERER_CLASSES[0]().render(data)
+    return SurveyBundle(
+        etag=f"{revision}-{language}",
+        content=content,
+        gzipped_content=gzip.compress(
+            content, compresslevel=GZIP_COMPRESS_LEVEL, mtime=0
+        ),
+    )
+
+
+@lru_cache(maxsize=len(settings.LANGUAGES))
+def get_compiled_survey_bundle(revision: str, language: str) -> SurveyBundle:
+    return cache.get_or_set(
+        f"survey-bundle:{language}:{revision}",
+        lambda: render_survey_bundle(revision, language),
+        timeout=ASSESSMENT_DATA_TIMEOUT,
+    )
+
+
+def get_survey_bundle_language() -> str:
+    language = translation.get_language() or settings.LANGUAGE_CODE
+    if language not in dict(settings.LANGUAGES):
+        language = settings.LANGUAGE_CODE
+    return language
+
+
+def get_survey_bundle() -> SurveyBundle:
+    """Bundle of the current language, rendered once per survey content revision"""
+    return get_compiled_survey_bundle(
+        get_survey_content_revision(), get_survey_bundle_language()
+    )
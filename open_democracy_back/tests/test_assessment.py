@@ -1,23 +1,56 @@
+import base64
 import datetime
 import os
+import tempfile
+from io import StringIO
 
 from django.conf import settings
 from django.contrib.auth.models import Group
 from django.core import mail
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from open_democracy_back.assessment_roles import (
+    get_assessment_role,
+    preload_assessment_roles,
+)
 from open_democracy_back.factories import (
+    DepartmentFactory,
     AssessmentFactory,
     ParticipationFactory,
     UserFactory,
     MunicipalityFactory,
     AssessmentTypeFactory,
     SurveyFactory,
+    ParticipationResponseFactory,
+    UniqueChoiceQuestionFactory,
+)
+from open_democracy_back.models import (
+    EPCI,
+    Assessment,
+    AssessmentDocument,
+    AssessmentPayment,
+    MunicipalityOrderByEPCI,
+    Participant,
+    RepresentativityCriteria,
+    RepresentativityCriteriaRule,
+    ResponseChoice,
+    Workshop,
+    ZipCode,
+)
+from open_democracy_back.serializers.assessment_serializers import (
+    AssessmentDocumentSerializer,
 )
-from open_democracy_back.models import Assessment
 from open_democracy_back.tests.utils import authenticate
-from open_democracy_back.utils import ManagedAssessmentType
+from open_democracy_back.utils import (
+    LocalityType,
+    ManagedAssessmentType,
+    SurveyLocality,
+)
 
 
 class TestScoring(TestCase):
@@ -38,6 +71,50 @@ class TestScoring(TestCase):
         self.assertEqual(self.get_role(assessment), "initiator")
 
 
+class TestAssessmentRoles(TestCase):
+    def test_roles_are_resolved_once_per_request(self):
+        user = UserFactory()
+        initiated = AssessmentFactory(initiated_by_user=user)
+        expertised = AssessmentFactory()
+        expertised.experts.add(user)
+        participated = ParticipationFactory(user=user).assessment
+        other = AssessmentFactory()
+        request = RequestFactory().get("/")
+        request.user = user
+
+        with self.assertNumQueries(1):
+            preload_assessment_roles(request, [initiated, expertised, participated])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_assessment_role(request, initiated), "initiator")
+            self.assertEqual(get_assessment_role(request, expertised), "expert")
+            self.assertEqual(get_assessment_role(request, participated), "participant")
+        with self.assertNumQueries(1):
+            self.assertEqual(get_assessment_role(request, other), "")
+            self.assertEqual(get_assessment_role(request, other), "")
+
+    @authenticate
+    def test_assessment_patch_resolves_role_once(self):
+        assessment = AssessmentFactory(initiated_by_user=authenticate.user)
+        url = reverse("assessments-detail", args=[assessment.pk])
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.patch(
+                url, {"name": "new name"}, content_type="application/json"
+            )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["details"]["role"], "initiator")
+        self.assertEqual(
+            len(
+                [
+                    query
+                    for query in context.captured_queries
+                    if "open_democracy_back_assessment_experts" in query["sql"]
+                    and "EXISTS" in query["sql"]
+                ]
+            ),
+            1,
+        )
+
+
 class TestAssessmentsEdits(TestCase):
     @authenticate
     def test_assessment_edits(self):
@@ -90,6 +167,9 @@ class TestAssessmentsEdits(TestCase):
             },
             {k: v for k, v in data.items() if k in ["assessment", "category", "name"]},
         )
+        # the file of a multipart request is stored
+        self.assertEqual(data["file"]["name"], "document.pdf")
+        AssessmentDocument.objects.get(pk=data["id"]).file.delete(save=False)
 
         # test editing document name
         document_pk = data["id"]
@@ -107,6 +187,139 @@ class TestAssessmentsEdits(TestCase):
         res = self.client.patch(url, {"name": "0"}, content_type="application/json")
         self.assertEqual(res.status_code, 403)
 
+    @authenticate
+    def test_document_metadata_stored_at_upload(self):
+        assessment = AssessmentFactory.create(initiated_by_user=authenticate.user)
+        path = os.path.join(
+            settings.BASE_DIR, "open_democracy_back", "tests", "document.pdf"
+        )
+        with open(path, "rb") as fh:
+            file_base64 = base64.b64encode(fh.read()).decode()
+        data = self.client.post(
+            reverse("assessment-documents-list"),
+            {
+                "category": "invoices",
+                "name": "my name",
+                "file": {"name": "document.pdf", "base_64": file_base64},
+                "assessment": assessment.pk,
+            },
+            content_type="application/json",
+        ).json()
+        document = AssessmentDocument.objects.get(pk=data["id"])
+        self.assertEqual(document.file_size, os.path.getsize(path))
+        self.assertEqual(document.mime_type, "application/pdf")
+        self.assertEqual(document.display_name, "document.pdf")
+        self.assertEqual(data["file"]["name"], "document.pdf")
+        self.assertEqual(data["file"]["mimeType"], "application/pdf")
+
+        # the file is not read anymore when the document is serialized
+        document.file.delete(save=False)
+        data = self.client.get(
+            reverse("assessment-documents-detail", args=[document.pk])
+        ).json()
+        self.assertEqual(data["file"]["name"], "document.pdf")
+
+    @authenticate
+    def test_resumable_document_upload(self):
+        assessment = AssessmentFactory.create(initiated_by_user=authenticate.user)
+        content = b"0123456789" * 10
+        with tempfile.TemporaryDirectory() as directory, self.settings(
+            MEDIA_ROOT=directory,
+            DOCUMENT_UPLOAD_DIR=os.path.join(directory, "uploads"),
+            DOCUMENT_UPLOAD_BLOCK_SIZE=7,
+        ):
+            res = self.client.post(
+                reverse("assessment-documents-start-upload"),
+                {
+                    "assessment": assessment.pk,
+                    "category": "invoices",
+                    "name": "my name",
+                    "fileName": "file.txt",
+                    "size": len(content),
+                },
+                content_type="application/json",
+            )
+            self.assertEqual(res.status_code, 201)
+            url = reverse("assessment-documents-upload", args=[res.json()["id"]])
+
+            res = self.client.put(
+                url,
+                content[:60],
+                content_type="application/octet-stream",
+                headers={"Upload-Offset": "0"},
+            )
+            self.assertEqual(res.json()["offset"], 60)
+            # a chunk which does not start at the offset is refused
+            res = self.client.put(
+                url,
+                content[50:],
+                content_type="application/octet-stream",
+                headers={"Upload-Offset": "50"},
+            )
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(self.client.get(url).json()["offset"], 60)
+
+            res = self.client.put(
+                url,
+                content[60:],
+                content_type="application/octet-stream",
+                headers={"Upload-Offset": "60"},
+            )
+            self.assertEqual(res.status_code, 201)
+            document = AssessmentDocument.objects.get(pk=res.json()["id"])
+            self.assertEqual(document.file.read(), content)
+            self.assertEqual(res.json()["file"]["name"], "file.txt")
+            self.assertEqual(document.file_size, len(content))
+            self.assertEqual(os.listdir(os.path.join(directory, "uploads")), [])
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    @authenticate
+    def test_document_upload_needs_write_access(self):
+        assessment = AssessmentFactory.create()
+        res = self.client.post(
+            reverse("assessment-documents-start-upload"),
+            {
+                "assessment": assessment.pk,
+                "category": "invoices",
+                "name": "my name",
+                "fileName": "file.txt",
+                "size": 10,
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 403)
+
+    def test_backfill_document_metadata(self):
+        assessment = AssessmentFactory.create()
+        document = AssessmentDocument.objects.create(
+            assessment=assessment,
+            category="invoices",
+            name="my name",
+            file=ContentFile(b"content", name="1234_file.txt"),
+        )
+        AssessmentDocument.objects.filter(pk=document.pk).update(
+            file_size=None, mime_type=None, display_name=""
+        )
+        # read from the file until stored
+        data = AssessmentDocumentSerializer(
+            AssessmentDocument.objects.get(pk=document.pk)
+        ).data
+        self.assertEqual(data["file"]["name"], "file.txt")
+        self.assertEqual(data["file"]["mime_type"], "text/plain")
+        self.assertEqual(data["file"]["size"], "7 Bytes")
+        self.assertFalse(
+            AssessmentDocument.objects.filter(pk=document.pk)
+            .exclude(file_size=None)
+            .exists()
+        )
+
+        call_command("backfill_document_metadata", stdout=StringIO())
+        document.refresh_from_db()
+        self.assertEqual(document.file_size, 7)
+        self.assertEqual(document.mime_type, "text/plain")
+        self.assertEqual(document.display_name, "file.txt")
+        document.file.delete(save=False)
+
     @authenticate
     def test_assessment_detail_access(self):
         # has detail access
@@ -266,3 +479,424 @@ class TestAssessmentCreation(TestCase):
             )
             res = self.client.get(url)
             self.assertEqual(res.json()["id"], assessment.pk)
+
+
+class TestPublishedResults(TestCase):
+    def assertPublishedResults(self, assessment, published_results):
+        assessment.refresh_from_db()
+        self.assertEqual(assessment.published_results, published_results)
+        self.assertEqual(
+            all(
+                representativity.respected
+                for representativity in assessment.representativities.all()
+            ),
+            published_results,
+        )
+
+    @authenticate
+    def test_published_results_follow_profiling_responses_and_rules(self):
+        assessment = AssessmentFactory()
+        profiling_question = UniqueChoiceQuestionFactory(
+            profiling_question=True, criteria=None
+        )
+        first_choice, second_choice, *ignored_choices = list(
+            profiling_question.response_choices.all()
+        )
+        representativity_criteria = RepresentativityCriteria.objects.create(
+            survey_locality=assessment.survey.survey_locality,
+            name="Criteria",
+            profiling_question_id=profiling_question.pk,
+            min_rate=10,
+        )
+        for response_choice in ignored_choices:
+            RepresentativityCriteriaRule.objects.create(
+                representativity_criteria=representativity_criteria,
+                response_choice=response_choice,
+                totally_ignore=True,
+            )
+        # no responses yet
+        self.assertPublishedResults(assessment, False)
+        # created after the criteria, without representativity
+        other_assessment = AssessmentFactory(survey=assessment.survey)
+        self.assertPublishedResults(other_assessment, True)
+
+        participation = ParticipationFactory(
+            user=authenticate.user, assessment=assessment
+        )
+        url = reverse("ParticipationResponse-list")
+        data = {
+            "participationId": participation.pk,
+            "questionId": profiling_question.pk,
+            "uniqueChoiceResponseId": first_choice.pk,
+        }
+        res = self.client.post(url, data, content_type="application/json")
+        self.assertEqual(res.status_code, 201)
+        # nobody responded the second choice
+        self.assertPublishedResults(assessment, False)
+
+        RepresentativityCriteriaRule.objects.create(
+            representativity_criteria=representativity_criteria,
+            response_choice=second_choice,
+            ignore_for_acceptability_threshold=True,
+        )
+        self.assertPublishedResults(assessment, True)
+
+        data["uniqueChoiceResponseId"] = second_choice.pk
+        res = self.client.post(url, data, content_type="application/json")
+        self.assertEqual(res.status_code, 200)
+        self.assertPublishedResults(assessment, False)
+        call_command(
+            "rebuild_representativity_counts", check_only=True, stdout=StringIO()
+        )
+
+        data["uniqueChoiceResponseId"] = first_choice.pk
+        self.client.post(url, data, content_type="application/json")
+        url = reverse("assessments-published")
+        res = self.client.get(url, {"page": 1, "page_size": 1})
+        self.assertEqual(res.data["count"], 2)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIsNotNone(res.data["next"])
+
+        # nobody responded a new choice
+        new_choice = ResponseChoice.objects.create(
+            question=profiling_question, response_choice="New"
+        )
+        self.assertPublishedResults(assessment, False)
+        new_choice.delete()
+        self.assertPublishedResults(assessment, True)
+
+        participation.delete()
+        self.assertPublishedResults(assessment, False)
+        res = self.client.get(url)
+        self.assertEqual(
+            [assessment["id"] for assessment in res.data], [other_assessment.pk]
+        )
+
+    @authenticate
+    def test_published_results_follow_closed_workshops(self):
+        assessment = AssessmentFactory()
+        profiling_question = UniqueChoiceQuestionFactory(
+            profiling_question=True, criteria=None
+        )
+        first_choice, *ignored_choices = list(profiling_question.response_choices.all())
+        representativity_criteria = RepresentativityCriteria.objects.create(
+            survey_locality=assessment.survey.survey_locality,
+            name="Criteria",
+            profiling_question_id=profiling_question.pk,
+            min_rate=10,
+        )
+        for response_choice in ignored_choices:
+            RepresentativityCriteriaRule.objects.create(
+                representativity_criteria=representativity_criteria,
+                response_choice=response_choice,
+                totally_ignore=True,
+            )
+        workshop = Workshop.objects.create(
+            animator=authenticate.user, assessment=assessment
+        )
+        participation = ParticipationFactory(
+            user=None,
+            participant=Participant.objects.create(
+                name="Participant", email="participant@example.com"
+            ),
+            workshop=workshop,
+            assessment=assessment,
+        )
+        ParticipationResponseFactory(
+            participation=participation,
+            question=profiling_question,
+            unique_choice_response=first_choice,
+        )
+        # responses of the workshop participants are accounted once it is closed
+        self.assertPublishedResults(assessment, False)
+
+        url = f"/api/workshops/{workshop.pk}/closed/"
+        res = self.client.patch(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertPublishedResults(assessment, True)
+        res = self.client.get(reverse("assessments-published"))
+        self.assertEqual([assessment["id"] for assessment in res.data], [assessment.pk])
+
+
+class TestAssessmentList(TestCase):
+    def create_assessment(self, user, role):
+        assessment = AssessmentFactory(
+            initiated_by_user=user if role == "initiator" else UserFactory()
+        )
+        expert = UserFactory()
+        assessment.experts.add(expert)
+        if role == "expert":
+            assessment.experts.add(user)
+        ParticipationFactory(
+            assessment=assessment, user=user if role == "participant" else None
+        )
+        Workshop.objects.create(animator=expert, assessment=assessment)
+        AssessmentPayment.objects.create(
+            assessment=assessment, author=expert, amount=100
+        )
+        return assessment
+
+    def create_assessments(self, user, count):
+        profiling_question = UniqueChoiceQuestionFactory(
+            profiling_question=True, criteria=None
+        )
+        assessments = [
+            self.create_assessment(
+                user, ["initiator", "expert", "participant"][index % 3]
+            )
+            for index in range(count)
+        ]
+        RepresentativityCriteria.objects.create(
+            survey_locality=assessments[0].survey.survey_locality,
+            name="Criteria",
+            profiling_question_id=profiling_question.pk,
+            min_rate=10,
+        )
+        return assessments
+
+    def count_list_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return len(context.captured_queries)
+
+    @authenticate
+    def test_list_query_count_does_not_depend_on_its_length(self):
+        url = reverse("assessments-mine")
+        self.create_assessments(authenticate.user, 2)
+        query_count = self.count_list_queries(url)
+        self.create_assessments(authenticate.user, 4)
+        self.assertEqual(self.count_list_queries(url), query_count)
+
+    @authenticate
+    def test_list_has_the_same_data_as_details(self):
+        assessments = self.create_assessments(authenticate.user, 3)
+        res = self.client.get(reverse("assessments-mine"))
+        data_by_id = {assessment["id"]: assessment for assessment in res.json()}
+        for assessment in assessments:
+            assessment_data = data_by_id[assessment.pk]
+            self.assertTrue(assessment_data["representativities"])
+            detail = self.client.get(
+                reverse("assessments-detail", args=[assessment.pk])
+            ).json()
+            # participants do not have access to all the details
+            self.assertEqual({key: assessment_data[key] for key in detail}, detail)
+
+
+class TestAssessmentLocality(TestCase):
+    def setUp(self):
+        self.department = DepartmentFactory(name="Loire", code="42")
+        self.municipality = MunicipalityFactory(
+            department=self.department, name="Saint-Étienne", population=170000
+        )
+        MunicipalityFactory(department=self.department, population=35000)
+
+    def test_locality_fields_of_every_locality_type(self):
+        epci = EPCI.objects.create(name="Saint-Étienne Métropole", population=400000)
+        expected_by_assessment_id = {}
+        for assessment, expected in [
+            (
+                AssessmentFactory(municipality=self.municipality),
+                (170000, self.municipality.code, "Commune Saint-Étienne"),
+            ),
+            (
+                AssessmentFactory(
+                    municipality=None,
+                    locality_type=LocalityType.INTERCOMMUNALITY,
+                    epci=epci,
+                ),
+                (400000, "", "Intercommunalité Saint-Étienne Métropole"),
+            ),
+            (
+                AssessmentFactory(
+                    municipality=None,
+                    locality_type=LocalityType.DEPARTMENT,
+                    department=self.department,
+                ),
+                (205000, "42", "Département Loire (42)"),
+            ),
+            (
+                AssessmentFactory(
+                    municipality=None,
+                    locality_type=LocalityType.REGION,
+                    region=self.department.region,
+                ),
+                (
+                    205000,
+                    self.department.region.code,
+                    f"Région {self.department.region.name}",
+                ),
+            ),
+        ]:
+            expected_by_assessment_id[assessment.pk] = expected
+
+        assessments = list(Assessment.objects.all())
+        # the localities are not fetched
+        with self.assertNumQueries(0):
+            for assessment in assessments:
+                population, code, name = expected_by_assessment_id[assessment.pk]
+                self.assertEqual(assessment.population, population)
+                self.assertEqual(assessment.code, code or None)
+                self.assertEqual(str(assessment), name)
+
+    def test_locality_fields_follow_locality_changes(self):
+        assessment = AssessmentFactory(municipality=self.municipality)
+        department_assessment = AssessmentFactory(
+            municipality=None,
+            locality_type=LocalityType.DEPARTMENT,
+            department=self.department,
+        )
+
+        self.municipality.population = 171000
+        self.municipality.name = "Saint-Étienne (Loire)"
+        self.municipality.save()
+        assessment.refresh_from_db()
+        self.assertEqual(assessment.population, 171000)
+        self.assertEqual(assessment.collectivity_name, "Saint-Étienne (Loire)")
+        department_assessment.refresh_from_db()
+        self.assertEqual(department_assessment.population, 206000)
+
+        other_municipality = MunicipalityFactory(population=1000)
+        assessment.municipality = other_municipality
+        assessment.save(update_fields=["municipality"])
+        assessment = Assessment.objects.get(pk=assessment.pk)
+        self.assertEqual(assessment.population, 1000)
+        self.assertEqual(assessment.code, other_municipality.code)
+
+
+class TestZipCodeSurveys(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SurveyFactory.create(survey_locality=SurveyLocality.DEPARTMENT)
+            self.municipality = MunicipalityFactory.create()
+            self.other_municipality = MunicipalityFactory.create(
+                department=self.municipality.department
+            )
+            ZipCode.objects.create(code="69001", municipality=self.municipality)
+            ZipCode.objects.create(code="69002", municipality=self.municipality)
+            ZipCode.objects.create(code="69001", municipality=self.other_municipality)
+            self.epci = EPCI.objects.create(name="epci", code="1", population=10)
+            for municipality in [self.other_municipality, self.municipality]:
+                MunicipalityOrderByEPCI.objects.create(
+                    epci=self.epci, municipality=municipality
+                )
+
+    def get_localities(self, zip_code):
+        return self.client.get(reverse("zip-code-surveys", args=[zip_code])).json()
+
+    def test_localities_of_zip_code(self):
+        data = self.get_localities("69001")
+        self.assertEqual(
+            [municipality["id"] for municipality in data["municipality"]],
+            [self.municipality.pk, self.other_municipality.pk],
+        )
+        self.assertEqual(data["municipality"][0]["zipCodes"], ["69001", "69002"])
+        self.assertEqual(
+            data["intercommunality"],
+            [
+                {
+                    "id": self.epci.pk,
+                    "name": "epci",
+                    "population": 10,
+                    "zipCodes": [["69001"], ["69001", "69002"]],
+                    "localityType": "intercommunality",
+                }
+            ],
+        )
+        department = self.municipality.department
+        self.assertEqual(
+            data["department"],
+            [
+                {
+                    "id": department.pk,
+                    "code": department.code,
+                    "name": department.name,
+                    "localityType": "department",
+                }
+            ],
+        )
+        # no survey for regions
+        self.assertNotIn("region", data)
+        self.assertEqual(
+            self.get_localities("69002")["intercommunality"][0]["id"], self.epci.pk
+        )
+
+    def test_localities_are_not_queried(self):
+        self.get_localities("69001")
+        # only the revision of the localities is read
+        with self.assertNumQueries(1):
+            self.get_localities("69001")
+
+    def test_index_is_rebuilt_when_localities_change(self):
+        self.assertEqual(self.get_localities("69003")["municipality"], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            ZipCode.objects.create(code="69003", municipality=self.municipality)
+        self.assertEqual(
+            self.get_localities("69003")["municipality"][0]["zipCodes"],
+            ["69001", "69002", "69003"],
+        )
+
+
+class TestLocalityAutocomplete(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.department = DepartmentFactory.create(name="Loire")
+            self.saint_etienne = MunicipalityFactory.create(
+                name="Saint-Étienne", population=170000, department=self.department
+            )
+            self.etival = MunicipalityFactory.create(
+                name="Étival", population=800, department=self.department
+            )
+            self.saint_chamond = MunicipalityFactory.create(
+                name="Saint-Chamond", population=35000, department=self.department
+            )
+            self.epci = EPCI.objects.create(
+                name="Saint-Étienne Métropole", code="1", population=400000
+            )
+
+    def autocomplete(self, query, **params):
+        res = self.client.get(
+            reverse("localities-autocomplete"), {"q": query, **params}
+        )
+        self.assertEqual(res.status_code, 200)
+        return [(locality["localityType"], locality["id"]) for locality in res.json()]
+
+    def test_accents_are_ignored_and_most_populated_first(self):
+        self.assertEqual(
+            self.autocomplete("saint-e"),
+            [
+                ("intercommunality", self.epci.pk),
+                ("municipality", self.saint_etienne.pk),
+            ],
+        )
+        # words of the names match too
+        self.assertEqual(
+            self.autocomplete("ÉTI"),
+            [
+                ("intercommunality", self.epci.pk),
+                ("municipality", self.saint_etienne.pk),
+                ("municipality", self.etival.pk),
+            ],
+        )
+        self.assertEqual(
+            self.autocomplete("saint", limit=2),
+            [
+                ("intercommunality", self.epci.pk),
+                ("municipality", self.saint_etienne.pk),
+            ],
+        )
+        self.assertEqual(self.autocomplete(" - "), [])
+
+    def test_departments_only_with_a_survey(self):
+        self.assertEqual(self.autocomplete("loire"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            SurveyFactory.create(survey_locality=SurveyLocality.DEPARTMENT)
+        self.assertEqual(
+            self.autocomplete("loire"), [("department", self.department.pk)]
+        )
+
+    def test_incorrect_limit(self):
+        res = self.client.get(
+            reverse("localities-autocomplete"), {"q": "saint", "limit": "a"}
+        )
+        self.assertEqual(res.status_code, 400)
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from open_democracy_back.models import Assessment
+
+
+class TestBenchmarkScoring(TestCase):
+    def test_benchmark_is_compared_to_baseline(self):
+        assessment_count = Assessment.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "baseline.json")
+            call_command(
+                "benchmark_scoring",
+                responses=[50],
+                repetitions=2,
+                output=output,
+                stdout=StringIO(),
+            )
+            # generated data is rolled back
+            self.assertEqual(Assessment.objects.count(), assessment_count)
+
+            with open(output) as baseline_file:
+                baseline = json.load(baseline_file)
+            measures = baseline["scales"]["50"]["measures"]
+            self.assertIn("scores:queries", measures)
+            self.assertIn("chart_data:closed_with_scale", measures)
+            self.assertIn("representativity:respected", measures)
+
+            for measure in measures.values():
+                measure["queries"] = 0
+            with open(output, "w") as baseline_file:
+                json.dump(baseline, baseline_file)
+            with self.assertRaises(CommandError):
+                call_command(
+                    "benchmark_scoring",
+                    responses=[50],
+                    repetitions=2,
+                    baseline=output,
+                    stdout=StringIO(),
+                )
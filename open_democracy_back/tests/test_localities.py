@@ -0,0 +1,153 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from open_democracy_back.data_versions import get_locality_revision
+from open_democracy_back.models import (
+    EPCI,
+    Department,
+    Municipality,
+    MunicipalityOrderByEPCI,
+    Region,
+)
+
+REGIONS = [{"code": "84", "nom": "Auvergne-Rhône-Alpes"}]
+DEPARTMENTS = [{"code": "42", "nom": "Loire", "region": "84"}]
+MUNICIPALITIES = [
+    {
+        "code": "42218",
+        "nom": "Saint-Étienne",
+        "departement": "42",
+        "population": 170000,
+        "codesPostaux": ["42000", "42100"],
+    },
+    {
+        "code": "42207",
+        "nom": "Saint-Chamond",
+        "departement": "42",
+        "population": 35000,
+        "codesPostaux": ["42400"],
+    },
+]
+EPCIS = [
+    {
+        "code": "244200770",
+        "nom": "Saint-Étienne Métropole",
+        "populationTotale": 400000,
+        "membres": [{"code": "42218"}, {"code": "42207"}],
+    }
+]
+
+
+class TestLoadLocalities(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_json(self, name, rows):
+        path = os.path.join(self.directory.name, f"{name}.json.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump(rows, file)
+        return path
+
+    def load(self, **files):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "load_localities",
+                **{name: self.write_json(name, rows) for name, rows in files.items()},
+                stdout=StringIO(),
+            )
+
+    def get_members(self, epci):
+        return list(
+            MunicipalityOrderByEPCI.objects.filter(epci=epci)
+            .order_by("sort_order")
+            .values_list("municipality__code", flat=True)
+        )
+
+    def test_full_load(self):
+        revision = get_locality_revision()
+        self.load(
+            regions=REGIONS,
+            departments=DEPARTMENTS,
+            municipalities=MUNICIPALITIES,
+            epcis=EPCIS,
+        )
+        department = Department.objects.get(code="42")
+        self.assertEqual(department.region, Region.objects.get(code="84"))
+        municipality = Municipality.objects.get(code="42218")
+        self.assertEqual(municipality.department, department)
+        self.assertEqual(municipality.population, 170000)
+        self.assertEqual(
+            sorted(municipality.zip_codes.values_list("code", flat=True)),
+            ["42000", "42100"],
+        )
+        epci = EPCI.objects.get(code="244200770")
+        self.assertEqual(epci.population, 400000)
+        self.assertEqual(self.get_members(epci), ["42218", "42207"])
+        # the locality index is rebuilt
+        self.assertNotEqual(get_locality_revision(), revision)
+
+    def test_incremental_update(self):
+        self.load(
+            regions=REGIONS,
+            departments=DEPARTMENTS,
+            municipalities=MUNICIPALITIES,
+            epcis=EPCIS,
+        )
+        municipality = Municipality.objects.get(code="42218")
+        # EPCIs first loaded without their code are found by name
+        EPCI.objects.update(code="")
+
+        self.load(
+            municipalities=[
+                {**MUNICIPALITIES[0], "population": 171000, "codesPostaux": ["42000"]},
+                {
+                    "code": "42095",
+                    "nom": "Firminy",
+                    "departement": "42",
+                    "population": 17000,
+                    "codesPostaux": ["42700"],
+                },
+            ],
+            epcis=[
+                {
+                    **EPCIS[0],
+                    "membres": [{"code": "42095"}, {"code": "42218"}],
+                }
+            ],
+        )
+        municipality.refresh_from_db()
+        self.assertEqual(municipality.population, 171000)
+        self.assertEqual(
+            list(municipality.zip_codes.values_list("code", flat=True)), ["42000"]
+        )
+        self.assertEqual(Municipality.objects.count(), 3)
+        epci = EPCI.objects.get()
+        self.assertEqual(epci.code, "244200770")
+        self.assertEqual(self.get_members(epci), ["42095", "42218"])
+
+    def test_csv_and_dry_run(self):
+        self.load(regions=REGIONS, departments=DEPARTMENTS)
+        path = os.path.join(self.directory.name, "communes.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(
+                "code,nom,departement,population,codesPostaux\n"
+                "42218,Saint-Étienne,42,170000,42000;42100\n"
+            )
+        call_command(
+            "load_localities", municipalities=path, dry_run=True, stdout=StringIO()
+        )
+        self.assertFalse(Municipality.objects.exists())
+
+        call_command("load_localities", municipalities=path, stdout=StringIO())
+        municipality = Municipality.objects.get()
+        self.assertEqual(municipality.population, 170000)
+        self.assertEqual(municipality.zip_codes.count(), 2)
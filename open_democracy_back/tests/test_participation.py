@@ -0,0 +1,493 @@
+import re
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from open_democracy_back.factories import (
+    BooleanQuestionFactory,
+    CategoryFactory,
+    ClosedWithScaleQuestionFactory,
+    MultipleChoiceQuestionFactory,
+    NumberQuestionFactory,
+    ParticipationFactory,
+    ParticipationResponseFactory,
+    RoleFactory,
+    UniqueChoiceQuestionFactory,
+)
+from open_democracy_back.models import (
+    AssessmentResponse,
+    ParticipationResponse,
+    ProfileDefinition,
+    ProfileType,
+    RepresentativityCount,
+    RepresentativityCriteria,
+)
+from open_democracy_back.bulk_profiles import recompute_profiles
+from open_democracy_back.profile_rules import assign_profiles
+from open_democracy_back.serializers.animator_serializers import (
+    WorkshopParticipationResponseSerializer,
+)
+from open_democracy_back.tests.utils import authenticate
+from open_democracy_back.utils import BooleanOperator, QuestionObjectivity
+
+
+class TestProfileRules(TestCase):
+    def setUp(self):
+        self.unique_choice_question = UniqueChoiceQuestionFactory(
+            profiling_question=True, criteria=None
+        )
+        self.multiple_choice_question = MultipleChoiceQuestionFactory(
+            profiling_question=True, criteria=None
+        )
+        self.boolean_question = BooleanQuestionFactory(
+            profiling_question=True, criteria=None
+        )
+        self.number_question = NumberQuestionFactory(
+            profiling_question=True, criteria=None
+        )
+        self.unique_choices = list(self.unique_choice_question.response_choices.all())
+        self.multiple_choices = list(
+            self.multiple_choice_question.response_choices.all()
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.young = self.create_profile_type(
+                BooleanOperator.AND,
+                [
+                    (self.unique_choice_question, {}, [self.unique_choices[0]]),
+                    (self.boolean_question, {"boolean_response": True}, []),
+                ],
+            )
+            self.commuter = self.create_profile_type(
+                BooleanOperator.OR,
+                [
+                    (self.multiple_choice_question, {}, [self.multiple_choices[2]]),
+                    (
+                        self.number_question,
+                        {"numerical_operator": ">=", "float_value": 10},
+                        [],
+                    ),
+                ],
+            )
+            self.senior = self.create_profile_type(
+                BooleanOperator.AND,
+                [(self.unique_choice_question, {}, [self.unique_choices[1]])],
+            )
+
+    def create_profile_type(self, intersection_operator, rules):
+        profile_type = ProfileType.objects.create(
+            name=f"Profile {ProfileType.objects.count()}",
+            rules_intersection_operator=intersection_operator,
+        )
+        for question, values, response_choices in rules:
+            rule = ProfileDefinition.objects.create(
+                profile_type=profile_type, conditional_question=question, **values
+            )
+            rule.response_choices.set(response_choices)
+        return profile_type
+
+    def create_participation(self, **kwargs):
+        participation = ParticipationFactory(**kwargs)
+        ParticipationResponseFactory(
+            participation=participation,
+            question=self.unique_choice_question,
+            unique_choice_response=self.unique_choices[0],
+        )
+        ParticipationResponseFactory(
+            participation=participation,
+            question=self.boolean_question,
+            boolean_response=True,
+        )
+        ParticipationResponseFactory(
+            participation=participation,
+            question=self.number_question,
+            number_response=3,
+        )
+        ParticipationResponseFactory(
+            participation=participation,
+            question=self.multiple_choice_question,
+            multiple_choice_response=self.multiple_choices[1:3],
+        )
+        return participation
+
+    @authenticate
+    def test_profiles_are_assigned_when_profiling_is_completed(self):
+        participation = self.create_participation(user=authenticate.user)
+        res = self.client.patch(
+            f"/api/participations/{participation.pk}/questions/completed/",
+            {"profiling_question": True},
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(set(participation.profiles.all()), {self.young, self.commuter})
+
+    def test_query_count_does_not_depend_on_the_rules(self):
+        assign_profiles(self.create_participation())
+        participation = self.create_participation()
+        with CaptureQueriesContext(connection) as context:
+            assign_profiles(participation)
+        query_count = len(context.captured_queries)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                self.create_profile_type(
+                    BooleanOperator.OR,
+                    [
+                        (self.boolean_question, {"boolean_response": True}, []),
+                        (self.unique_choice_question, {}, self.unique_choices),
+                    ],
+                )
+        assign_profiles(self.create_participation())
+        participation = self.create_participation()
+        with CaptureQueriesContext(connection) as context:
+            assign_profiles(participation)
+        self.assertEqual(len(context.captured_queries), query_count)
+        self.assertEqual(participation.profiles.count(), 7)
+
+    def test_rules_follow_their_changes(self):
+        participation = self.create_participation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.senior.rules.get().response_choices.add(self.unique_choices[0])
+        assign_profiles(participation)
+        self.assertIn(self.senior, participation.profiles.all())
+
+    def test_recompute_profiles(self):
+        participations = [
+            self.create_participation(is_profiling_questions_completed=True)
+            for _ in range(3)
+        ]
+        for participation in participations:
+            participation.profiles.add(self.senior)
+        uncompleted_participation = self.create_participation()
+        uncompleted_participation.profiles.add(self.senior)
+
+        out = StringIO()
+        call_command(
+            "recompute_profiles", chunk_size=2, workers=1, stdout=out, stderr=StringIO()
+        )
+        self.assertIn("6 added, 3 removed", out.getvalue())
+        for participation in participations:
+            self.assertEqual(
+                set(participation.profiles.all()), {self.young, self.commuter}
+            )
+        self.assertEqual(set(uncompleted_participation.profiles.all()), {self.senior})
+
+        # nothing left to change
+        self.assertEqual(recompute_profiles([participations[0].pk]).added, 0)
+
+    def test_recompute_profiles_query_count_does_not_depend_on_participations(self):
+        participation_ids = [
+            self.create_participation(is_profiling_questions_completed=True).pk
+            for _ in range(4)
+        ]
+        recompute_profiles(participation_ids[:1], dry_run=True)
+        with CaptureQueriesContext(connection) as context:
+            recompute_profiles(participation_ids[:1], dry_run=True)
+        query_count = len(context.captured_queries)
+        with CaptureQueriesContext(connection) as context:
+            recompute_profiles(participation_ids, dry_run=True)
+        self.assertEqual(len(context.captured_queries), query_count)
+
+
+class TestResponseBatch(TestCase):
+    def post_batch(self, url, data):
+        res = self.client.post(url, data, content_type="application/json")
+        self.assertEqual(res.status_code, 200)
+        return res.json()["results"]
+
+    @authenticate
+    def test_batch_of_participation_responses(self):
+        participation = ParticipationFactory(user=authenticate.user)
+        unique_choice_question = UniqueChoiceQuestionFactory()
+        multiple_choice_question = MultipleChoiceQuestionFactory()
+        boolean_question = BooleanQuestionFactory()
+        closed_with_scale_question = ClosedWithScaleQuestionFactory()
+        other_role_question = BooleanQuestionFactory()
+        other_role_question.roles.add(RoleFactory())
+        objective_question = BooleanQuestionFactory(
+            objectivity=QuestionObjectivity.OBJECTIVE
+        )
+        unique_choices = list(unique_choice_question.response_choices.all())
+        multiple_choices = list(multiple_choice_question.response_choices.all())
+        scale_choices = list(closed_with_scale_question.response_choices.all())
+        categories = list(closed_with_scale_question.categories.all())
+
+        url = "/api/participation-responses/batch/"
+        results = self.post_batch(
+            url,
+            {
+                "participationId": participation.pk,
+                "responses": [
+                    {
+                        "questionId": unique_choice_question.pk,
+                        "uniqueChoiceResponseId": unique_choices[0].pk,
+                    },
+                    {
+                        "questionId": multiple_choice_question.pk,
+                        "multipleChoiceResponseIds": [
+                            multiple_choices[0].pk,
+                            multiple_choices[1].pk,
+                        ],
+                    },
+                    {"questionId": boolean_question.pk, "booleanResponse": True},
+                    {
+                        "questionId": closed_with_scale_question.pk,
+                        "closedWithScaleResponseCategories": [
+                            {"categoryId": category.pk, "responseChoiceId": choice.pk}
+                            for category, choice in zip(categories, scale_choices)
+                        ],
+                    },
+                    {"questionId": other_role_question.pk, "booleanResponse": True},
+                    {"questionId": objective_question.pk, "booleanResponse": True},
+                    {"questionId": boolean_question.pk, "booleanResponse": False},
+                    {"questionId": boolean_question.pk, "percentageResponse": 200},
+                ],
+            },
+        )
+        self.assertEqual(
+            [result["status"] for result in results], [201] * 4 + [400] * 4
+        )
+        self.assertEqual(
+            [result["messageCode"] for result in results[4:]],
+            [
+                "question_not_needed",
+                "need_participation_response",
+                "duplicate_response",
+                "invalid",
+            ],
+        )
+        self.assertEqual(
+            results[1]["response"]["multipleChoiceResponseIds"],
+            [multiple_choices[0].pk, multiple_choices[1].pk],
+        )
+        self.assertEqual(participation.responses.count(), 4)
+        call_command("rebuild_score_aggregates", check_only=True, stdout=StringIO())
+
+        results = self.post_batch(
+            url,
+            {
+                "participationId": participation.pk,
+                "responses": [
+                    {
+                        "questionId": unique_choice_question.pk,
+                        "uniqueChoiceResponseId": unique_choices[1].pk,
+                    },
+                    {
+                        "questionId": multiple_choice_question.pk,
+                        "multipleChoiceResponseIds": [multiple_choices[2].pk],
+                    },
+                    {
+                        "questionId": closed_with_scale_question.pk,
+                        "closedWithScaleResponseCategories": [
+                            {
+                                "categoryId": categories[0].pk,
+                                "responseChoiceId": scale_choices[3].pk,
+                            }
+                        ],
+                    },
+                ],
+            },
+        )
+        self.assertEqual([result["status"] for result in results], [200] * 3)
+        responses = ParticipationResponse.objects.filter(participation=participation)
+        self.assertEqual(
+            responses.get(question=unique_choice_question).unique_choice_response,
+            unique_choices[1],
+        )
+        self.assertEqual(
+            list(
+                responses.get(
+                    question=multiple_choice_question
+                ).multiple_choice_response.all()
+            ),
+            [multiple_choices[2]],
+        )
+        self.assertEqual(
+            {
+                category_response.category_id: category_response.response_choice_id
+                for category_response in responses.get(
+                    question=closed_with_scale_question
+                ).closed_with_scale_response_categories.all()
+            },
+            {
+                categories[0].pk: scale_choices[3].pk,
+                **{
+                    category.pk: choice.pk
+                    for category, choice in zip(categories[1:], scale_choices[1:])
+                },
+            },
+        )
+        call_command("rebuild_score_aggregates", check_only=True, stdout=StringIO())
+
+    @authenticate
+    def test_single_response_is_upserted(self):
+        participation = ParticipationFactory(user=authenticate.user)
+        question = BooleanQuestionFactory()
+        data = {
+            "participationId": participation.pk,
+            "questionId": question.pk,
+            "booleanResponse": True,
+        }
+        ids = []
+        for expected_status, boolean_response in [(201, True), (200, False)]:
+            data["booleanResponse"] = boolean_response
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(
+                    "/api/participation-responses/",
+                    data,
+                    content_type="application/json",
+                )
+            self.assertEqual(res.status_code, expected_status)
+            self.assertEqual(res.json()["booleanResponse"], boolean_response)
+            ids.append(res.json()["id"])
+            table = '"open_democracy_back_participationresponse" '
+            writes = [
+                query["sql"]
+                for query in context.captured_queries
+                if query["sql"].startswith((f"INSERT INTO {table}", f"UPDATE {table}"))
+            ]
+            self.assertEqual(len(writes), 1)
+            self.assertIn("ON CONFLICT", writes[0])
+        self.assertEqual(ids[0], ids[1])
+
+        res = self.client.post(
+            "/api/participation-responses/",
+            {**data, "percentageResponse": 200},
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 400)
+
+    @authenticate
+    def test_batch_query_count_does_not_depend_on_the_responses(self):
+        participation = ParticipationFactory(user=authenticate.user)
+        questions = BooleanQuestionFactory.create_batch(8)
+        query_counts = []
+        for batch_questions in [questions[:2], questions[2:]]:
+            with CaptureQueriesContext(connection) as context:
+                self.post_batch(
+                    "/api/participation-responses/batch/",
+                    {
+                        "participationId": participation.pk,
+                        "responses": [
+                            {"questionId": question.pk, "booleanResponse": True}
+                            for question in batch_questions
+                        ],
+                    },
+                )
+            query_counts.append(len(context.captured_queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    @authenticate
+    def test_batch_updates_representativity_counts(self):
+        participation = ParticipationFactory(user=authenticate.user)
+        profiling_question = UniqueChoiceQuestionFactory(
+            profiling_question=True, criteria=None
+        )
+        first_choice, second_choice, *_ = profiling_question.response_choices.all()
+        RepresentativityCriteria.objects.create(
+            survey_locality=participation.assessment.survey.survey_locality,
+            name="Criteria",
+            profiling_question_id=profiling_question.pk,
+            min_rate=10,
+        )
+        for choice in [first_choice, second_choice]:
+            self.post_batch(
+                "/api/participation-responses/batch/",
+                {
+                    "participationId": participation.pk,
+                    "responses": [
+                        {
+                            "questionId": profiling_question.pk,
+                            "uniqueChoiceResponseId": choice.pk,
+                        }
+                    ],
+                },
+            )
+        self.assertEqual(
+            dict(RepresentativityCount.objects.values_list("response_choice", "count")),
+            {first_choice.pk: 0, second_choice.pk: 1},
+        )
+        call_command(
+            "rebuild_representativity_counts", check_only=True, stdout=StringIO()
+        )
+
+    @authenticate
+    def test_batch_of_assessment_responses(self):
+        participation = ParticipationFactory(user=authenticate.user)
+        objective_question = BooleanQuestionFactory(
+            objectivity=QuestionObjectivity.OBJECTIVE
+        )
+        subjective_question = BooleanQuestionFactory()
+        results = self.post_batch(
+            "/api/assessment-responses/batch/",
+            {
+                "assessmentId": participation.assessment_id,
+                "participationId": participation.pk,
+                "responses": [
+                    {"questionId": objective_question.pk, "booleanResponse": True},
+                    {"questionId": subjective_question.pk, "booleanResponse": True},
+                ],
+            },
+        )
+        self.assertEqual([result["status"] for result in results], [201, 400])
+        self.assertEqual(results[1]["messageCode"], "need_assessment_response")
+        response = AssessmentResponse.objects.get(
+            assessment=participation.assessment, question=objective_question
+        )
+        self.assertEqual(response.answered_by, authenticate.user)
+        self.assertTrue(response.boolean_response)
+
+
+class TestClosedWithScaleCategoryResponses(TestCase):
+    def test_category_responses_are_written_set_wise(self):
+        question = ClosedWithScaleQuestionFactory()
+        categories = list(question.categories.all())
+        categories += CategoryFactory.create_batch(6, question=question)
+        first_choice, second_choice, *_ = question.response_choices.all()
+        participation = ParticipationFactory()
+
+        def save(response, categories_choices):
+            serializer = WorkshopParticipationResponseSerializer(
+                response,
+                data={
+                    "participation_id": participation.pk,
+                    "question_id": question.pk,
+                    "closed_with_scale_response_categories": [
+                        {"category_id": category.pk, "response_choice_id": choice.pk}
+                        for category, choice in categories_choices
+                    ],
+                },
+            )
+            serializer.is_valid(raise_exception=True)
+            with CaptureQueriesContext(connection) as context:
+                response = serializer.save()
+            category_queries = [
+                query
+                for query in context.captured_queries
+                if re.match(
+                    r'(SELECT .* FROM|INSERT INTO|UPDATE) "\w+_closedwithscalecategoryresponse"',
+                    query["sql"],
+                )
+            ]
+            self.assertLessEqual(len(category_queries), 3)
+            return response
+
+        response = save(None, [(category, first_choice) for category in categories])
+        response = save(
+            response,
+            [(categories[0], second_choice), (categories[1], first_choice)],
+        )
+        self.assertEqual(
+            dict(
+                response.closed_with_scale_response_categories.values_list(
+                    "category_id", "response_choice_id"
+                )
+            ),
+            {
+                category.pk: (second_choice if index == 0 else first_choice).pk
+                for index, category in enumerate(categories)
+            },
+        )
@@ -1,9 +1,18 @@
+import gzip
+import json
+
 from django.db import connection
+from django.utils import timezone
 from django.test import TestCase
 from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from open_democracy_back.factories import QuestionFactory, CriteriaFactory
+from open_democracy_back.factories import (
+    CriteriaFactory,
+    QuestionFactory,
+    ResponseChoiceFactory,
+)
+from open_democracy_back.models import Question
 
 
 class TestQuestionnaireViews(TestCase):
@@ -14,4 +23,103 @@ class TestQuestionnaireViews(TestCase):
             QuestionFactory.create(criteria=criteria)
         with CaptureQueriesContext(connection) as queries:
             self.client.get(url)
-        self.assertLessEqual(len(queries), 25)
+        # the rendering of the bundle, without its storage in the cache
+        rendering_queries = [
+            query
+            for query in queries
+            if "django_cache" not in query["sql"] and "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertLessEqual(len(rendering_queries), 25)
+
+    def test_survey_bundle_is_revalidated_and_gzipped(self):
+        url = reverse("surveys-all")
+        criteria = CriteriaFactory.create()
+        question = QuestionFactory.create(criteria=criteria)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("no-cache", res.headers["Cache-Control"])
+        data = json.loads(res.content)
+        self.assertEqual(
+            [question["id"] for question in data["questions"]], [question.pk]
+        )
+
+        # served from memory, only the survey content revision is looked up
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).content, res.content)
+        with self.assertNumQueries(1):
+            res_not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=res.headers["ETag"]
+            )
+        self.assertEqual(res_not_modified.status_code, 304)
+
+        res_gzip = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(res_gzip.headers["Content-Encoding"], "gzip")
+        self.assertNotEqual(res_gzip.headers["ETag"], res.headers["ETag"])
+        self.assertEqual(gzip.decompress(res_gzip.content), res.content)
+
+        res_en = self.client.get(url, HTTP_ACCEPT_LANGUAGE="en")
+        self.assertNotEqual(res_en.headers["ETag"], res.headers["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            question.mandatory = True
+            question.save()
+        res_changed = self.client.get(url, HTTP_IF_NONE_MATCH=res.headers["ETag"])
+        self.assertEqual(res_changed.status_code, 200)
+        self.assertTrue(json.loads(res_changed.content)["questions"][0]["mandatory"])
+
+
+class TestQuestionnaireSync(TestCase):
+    def setUp(self):
+        criteria = CriteriaFactory.create()
+        self.questions = QuestionFactory.create_batch(3, criteria=criteria)
+        self.criteria = criteria
+        self.since = timezone.now().isoformat()
+
+    def sync(self, url):
+        res = self.client.get(url, {"since": self.since})
+        self.assertEqual(res.status_code, 200)
+        return res.json()
+
+    def test_only_changes_since_the_date_are_listed(self):
+        url = reverse("QuestionnaireQuestion-list")
+        self.assertEqual(len(self.client.get(url).json()), 3)
+        data = self.sync(url)
+        self.assertEqual(data["results"], [])
+        self.assertEqual(data["deletedIds"], [])
+        self.assertTrue(data["timestamp"])
+
+        question, deleted_question, profiling_question = self.questions
+        ResponseChoiceFactory.create(question=question)
+        deleted_question_id = deleted_question.pk
+        deleted_question.delete()
+        Question.objects.get(pk=profiling_question.pk).save()
+        Question.objects.filter(pk=profiling_question.pk).update(
+            profiling_question=True
+        )
+
+        data = self.sync(url)
+        self.assertEqual([result["id"] for result in data["results"]], [question.pk])
+        self.assertEqual(len(data["results"][0]["responseChoices"]), 1)
+        self.assertEqual(
+            data["deletedIds"], sorted([deleted_question_id, profiling_question.pk])
+        )
+
+    def test_containers_are_listed_when_their_content_changes(self):
+        self.questions[0].delete()
+        criteria_data = self.sync("/api/criterias/")["results"]
+        self.assertEqual(
+            [criteria["id"] for criteria in criteria_data], [self.criteria.pk]
+        )
+        self.assertEqual(
+            sorted(criteria_data[0]["questionIds"]),
+            [question.pk for question in self.questions[1:]],
+        )
+        self.assertEqual(len(self.sync(reverse("surveys-list"))["results"]), 1)
+        # the marker and the pillar do not contain the questions
+        self.assertEqual(self.sync("/api/markers/")["results"], [])
+        self.assertEqual(self.sync("/api/pillars/")["results"], [])
+
+    def test_incorrect_since(self):
+        res = self.client.get("/api/pillars/", {"since": "yesterday"})
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.json()["messageCode"], "incorrect_since")
@@ -1,6 +1,11 @@
+import csv
+import json
+from io import StringIO
 from statistics import mean
 
-from django.test import TestCase
+from django.core.management import call_command, CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
 from open_democracy_back.factories import (
     QuestionFactory,
@@ -12,11 +17,19 @@ from open_democracy_back.factories import (
     CategoryFactory,
     ClosedWithScaleCategoryResponseFactory,
     NumberRangeFactory,
+    CriteriaFactory,
+    ParticipationFactory,
+    UserFactory,
+    RoleFactory,
 )
 from open_democracy_back.models import (
     ParticipationResponse,
     SCORE_MAP,
     AssessmentResponse,
+    QuestionScoreAggregate,
+    ProfileType,
+    Pillar,
+    Question,
 )
 from open_democracy_back.scoring import (
     get_score_of_boolean_question,
@@ -26,7 +39,12 @@ from open_democracy_back.scoring import (
     get_score_of_percentage_question,
     get_score_of_closed_with_scale_question,
     get_score_of_number_question,
+    get_scores_by_assessment_pk,
 )
+from open_democracy_back.score_aggregates import rebuild_score_aggregates
+from open_democracy_back.score_rollup import get_scores_by_question_scores
+from open_democracy_back.scoring_plan import IntervalScores, get_scoring_plan
+from open_democracy_back.tests.utils import authenticate
 from open_democracy_back.utils import QuestionType, QuestionObjectivity
 
 
@@ -387,3 +405,615 @@ class TestScoring(TestCase):
                 score=response_range.linearized_score,
             ),
         )
+
+
+def create_assessment_with_all_question_types():
+    """
+    Create an assessment with subjective and objective responses to every scored
+    question type, spread over two criterias of the same marker.
+    """
+    assessment = AssessmentFactory()
+    criteria = CriteriaFactory()
+    other_criteria = CriteriaFactory(marker=criteria.marker)
+    boolean_only_criteria = CriteriaFactory()
+
+    for value in [True, False, True]:
+        ParticipationResponseFactory(
+            boolean_response=value,
+            assessment=assessment,
+            question=QuestionFactory(
+                type=QuestionType.BOOLEAN, criteria=boolean_only_criteria
+            ),
+        )
+    boolean_question = QuestionFactory(type=QuestionType.BOOLEAN, criteria=criteria)
+    for value in [True, True, False]:
+        ParticipationResponseFactory(
+            boolean_response=value, assessment=assessment, question=boolean_question
+        )
+
+    unique_choice_question = QuestionFactory(
+        type=QuestionType.UNIQUE_CHOICE, criteria=criteria
+    )
+    choices = [
+        ResponseChoiceFactory(question=unique_choice_question, associated_score=score)
+        for score in [1, 2, 3, 4]
+    ]
+    for choice in choices[1:]:
+        ParticipationResponseFactory(
+            unique_choice_response=choice,
+            assessment=assessment,
+            question=unique_choice_question,
+        )
+
+    multiple_choice_question = QuestionFactory(
+        type=QuestionType.MULTIPLE_CHOICE, criteria=other_criteria
+    )
+    choices = [
+        ResponseChoiceFactory(question=multiple_choice_question, associated_score=score)
+        for score in [1, 2, 3, 4]
+    ]
+    ParticipationResponseFactory(
+        multiple_choice_response=choices[:2],
+        assessment=assessment,
+        question=multiple_choice_question,
+    )
+    ParticipationResponseFactory(
+        multiple_choice_response=[choices[3]],
+        assessment=assessment,
+        question=multiple_choice_question,
+    )
+
+    closed_with_scale_question = QuestionFactory(
+        type=QuestionType.CLOSED_WITH_SCALE, criteria=other_criteria
+    )
+    choices = [
+        ResponseChoiceFactory(
+            question=closed_with_scale_question, associated_score=score
+        )
+        for score in [1, 2, 3, 4]
+    ]
+    categories = CategoryFactory.create_batch(2, question=closed_with_scale_question)
+    for response_choices in [choices[:2], choices[2:]]:
+        response = ParticipationResponseFactory(
+            assessment=assessment, question=closed_with_scale_question
+        )
+        for category, response_choice in zip(categories, response_choices):
+            ClosedWithScaleCategoryResponseFactory(
+                participation_response=response,
+                category=category,
+                response_choice=response_choice,
+            )
+
+    percentage_question = QuestionFactory(
+        type=QuestionType.PERCENTAGE,
+        objectivity=QuestionObjectivity.OBJECTIVE,
+        criteria=criteria,
+    )
+    PercentageRangeFactory(
+        question=percentage_question, lower_bound=0, upper_bound=50, associated_score=2
+    )
+    PercentageRangeFactory(
+        question=percentage_question,
+        lower_bound=51,
+        upper_bound=100,
+        associated_score=4,
+    )
+    AssessmentResponseFactory(
+        percentage_response=70, assessment=assessment, question=percentage_question
+    )
+
+    number_question = QuestionFactory(
+        type=QuestionType.NUMBER,
+        objectivity=QuestionObjectivity.OBJECTIVE,
+        criteria=other_criteria,
+    )
+    NumberRangeFactory(
+        question=number_question, lower_bound=None, upper_bound=10, associated_score=1
+    )
+    NumberRangeFactory(
+        question=number_question, lower_bound=10.1, upper_bound=None, associated_score=3
+    )
+    AssessmentResponseFactory(
+        number_response=4.2, assessment=assessment, question=number_question
+    )
+    # factories do not maintain the aggregates as the responses views do
+    rebuild_score_aggregates(assessment_ids=[assessment.pk])
+    return assessment
+
+
+class ScoresTestCase(TestCase):
+    def assertScoresEqual(self, scores, expected_scores):
+        self.assertEqual(scores.keys(), expected_scores.keys())
+        for key, expected in expected_scores.items():
+            self.assertEqual(scores[key].keys(), expected.keys(), key)
+            for item_id, expected_score in expected.items():
+                if expected_score is None:
+                    self.assertIsNone(scores[key][item_id])
+                else:
+                    self.assertAlmostEqual(scores[key][item_id], expected_score)
+
+
+class TestScoringEngines(ScoresTestCase):
+    def test_vectorized_engine_returns_same_scores_as_queries_engine(self):
+        assessment = create_assessment_with_all_question_types()
+        with override_settings(SCORING_ENGINE="queries"):
+            expected_scores = get_scores_by_assessment_pk(assessment.pk)
+        with override_settings(SCORING_ENGINE="vectorized"):
+            scores = get_scores_by_assessment_pk(assessment.pk)
+
+        self.assertEqual(len(expected_scores["by_question_id"]), 9)
+        # criterias with only boolean questions have no score
+        self.assertIn(None, expected_scores["by_criteria_id"].values())
+        self.assertScoresEqual(scores, expected_scores)
+
+    def test_vectorized_engine_without_responses(self):
+        assessment = AssessmentFactory()
+        with override_settings(SCORING_ENGINE="vectorized"):
+            scores = get_scores_by_assessment_pk(assessment.pk)
+        self.assertDictEqual(
+            scores,
+            {
+                "by_question_id": {},
+                "by_criteria_id": {},
+                "by_marker_id": {},
+                "by_pillar_id": {},
+            },
+        )
+
+
+class TestScoreAggregates(ScoresTestCase):
+    def assertAggregateEqual(self, assessment, question, value_sum, response_count):
+        aggregate = QuestionScoreAggregate.objects.get(
+            assessment=assessment, question=question
+        )
+        self.assertAlmostEqual(aggregate.value_sum, value_sum)
+        self.assertEqual(aggregate.response_count, response_count)
+
+    def test_rebuild_score_aggregates_command(self):
+        assessment = create_assessment_with_all_question_types()
+        QuestionScoreAggregate.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_score_aggregates", check_only=True, stdout=StringIO())
+
+        call_command(
+            "rebuild_score_aggregates", assessment=[assessment.pk], stdout=StringIO()
+        )
+        with override_settings(SCORING_ENGINE="queries"):
+            expected_scores = get_scores_by_assessment_pk(assessment.pk)
+        with override_settings(SCORING_ENGINE="aggregates"):
+            scores = get_scores_by_assessment_pk(assessment.pk)
+        self.assertScoresEqual(scores, expected_scores)
+
+    @authenticate
+    def test_score_aggregates_are_updated_on_response_writes(self):
+        participation = ParticipationFactory(user=authenticate.user)
+        assessment = participation.assessment
+        question = QuestionFactory(type=QuestionType.UNIQUE_CHOICE)
+        first_choice, second_choice = [
+            ResponseChoiceFactory(question=question, associated_score=score)
+            for score in [2, 4]
+        ]
+        ParticipationResponseFactory(
+            unique_choice_response=first_choice,
+            assessment=assessment,
+            question=question,
+        )
+        call_command(
+            "rebuild_score_aggregates", assessment=[assessment.pk], stdout=StringIO()
+        )
+        self.assertAggregateEqual(assessment, question, SCORE_MAP[2], 1)
+
+        url = reverse("ParticipationResponse-list")
+        data = {
+            "participationId": participation.pk,
+            "questionId": question.pk,
+            "uniqueChoiceResponseId": first_choice.pk,
+        }
+        res = self.client.post(url, data, content_type="application/json")
+        self.assertEqual(res.status_code, 201)
+        self.assertAggregateEqual(assessment, question, 2 * SCORE_MAP[2], 2)
+
+        data["uniqueChoiceResponseId"] = second_choice.pk
+        res = self.client.post(url, data, content_type="application/json")
+        self.assertEqual(res.status_code, 200)
+        self.assertAggregateEqual(assessment, question, SCORE_MAP[2] + SCORE_MAP[4], 2)
+
+        data["hasPassed"] = True
+        self.client.post(url, data, content_type="application/json")
+        self.assertAggregateEqual(assessment, question, SCORE_MAP[2], 1)
+
+        ParticipationResponse.objects.filter(question=question).delete()
+        self.assertAggregateEqual(assessment, question, 0, 0)
+
+        # the linearized score of choices is read again when it changes
+        data["hasPassed"] = False
+        self.client.post(url, data, content_type="application/json")
+        second_choice.associated_score = 1
+        second_choice.save()
+        self.assertAggregateEqual(assessment, question, SCORE_MAP[1], 1)
+        call_command("rebuild_score_aggregates", check_only=True, stdout=StringIO())
+
+    def test_score_aggregates_follow_the_users_becoming_known_or_unknown(self):
+        question = QuestionFactory(type=QuestionType.BOOLEAN)
+        objective_question = QuestionFactory(
+            type=QuestionType.BOOLEAN, objectivity=QuestionObjectivity.OBJECTIVE
+        )
+        response = ParticipationResponseFactory(
+            boolean_response=True, question=question
+        )
+        assessment = response.participation.assessment
+        user = response.participation.user
+        AssessmentResponseFactory(
+            boolean_response=True,
+            assessment=assessment,
+            question=objective_question,
+            answered_by=user,
+        )
+        rebuild_score_aggregates(assessment_ids=[assessment.pk])
+        self.assertAggregateEqual(assessment, question, 1, 1)
+
+        user.is_unknown_user = True
+        user.save()
+        self.assertFalse(
+            question.score_aggregates.filter(response_count__gt=0).exists()
+        )
+        self.assertFalse(
+            objective_question.score_aggregates.filter(response_count__gt=0).exists()
+        )
+        user.is_unknown_user = False
+        user.save()
+        self.assertAggregateEqual(assessment, objective_question, 1, 1)
+
+        # the assessment responses of a deleted user are kept without it
+        user.delete()
+        self.assertFalse(
+            objective_question.score_aggregates.filter(response_count__gt=0).exists()
+        )
+        call_command("rebuild_score_aggregates", check_only=True, stdout=StringIO())
+
+    def test_rebuild_response_aggregates_command(self):
+        response = ParticipationResponseFactory(boolean_response=True)
+        assessment = response.participation.assessment
+        QuestionScoreAggregate.objects.all().delete()
+        call_command(
+            "rebuild_response_aggregates",
+            user=[response.participation.user_id],
+            stdout=StringIO(),
+        )
+        self.assertAggregateEqual(assessment, response.question, 1, 1)
+        call_command("rebuild_response_aggregates", stdout=StringIO())
+        call_command("rebuild_score_aggregates", check_only=True, stdout=StringIO())
+        call_command(
+            "rebuild_representativity_counts", check_only=True, stdout=StringIO()
+        )
+
+    def test_score_aggregates_are_rebuilt_when_the_accounting_changes(self):
+        question = QuestionFactory(type=QuestionType.BOOLEAN)
+        response = ParticipationResponseFactory(
+            boolean_response=True, question=question
+        )
+        assessment = response.participation.assessment
+        call_command(
+            "rebuild_score_aggregates", assessment=[assessment.pk], stdout=StringIO()
+        )
+        self.assertAggregateEqual(assessment, question, 1, 1)
+        # a wrong aggregate is kept when the question text changes
+        QuestionScoreAggregate.objects.update(value_sum=2)
+        question.name = "Other name"
+        question.save()
+        self.assertAggregateEqual(assessment, question, 2, 1)
+
+        question.criteria = None
+        question.save()
+        self.assertFalse(QuestionScoreAggregate.objects.exists())
+
+
+class TestAssessmentScoreView(TestCase):
+    def test_scores_are_cached_until_a_response_changes(self):
+        question = QuestionFactory(type=QuestionType.BOOLEAN)
+        assessment = AssessmentFactory()
+        url = f"/api/assessments/{assessment.pk}/scores/"
+        with self.captureOnCommitCallbacks(execute=True):
+            ParticipationResponseFactory(
+                boolean_response=True, assessment=assessment, question=question
+            )
+            rebuild_score_aggregates(assessment_ids=[assessment.pk])
+
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["by_question_id"], {question.pk: SCORE_MAP[2]})
+        etag = res.headers["ETag"]
+        # only cache reads
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+        self.assertEqual(res.data["by_question_id"], {question.pk: SCORE_MAP[2]})
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ParticipationResponseFactory(
+                boolean_response=False, assessment=assessment, question=question
+            )
+            ParticipationResponseFactory(
+                boolean_response=False, assessment=assessment, question=question
+            )
+            rebuild_score_aggregates(assessment_ids=[assessment.pk])
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers["ETag"], etag)
+        self.assertEqual(res.data["by_question_id"], {question.pk: SCORE_MAP[1]})
+
+
+class TestAssessmentChartDataView(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assessment = create_assessment_with_all_question_types()
+            Pillar.objects.update(survey=self.assessment.survey)
+            roles = [
+                participation.role
+                for participation in self.assessment.participations.all()
+            ]
+            self.questions = list(Question.objects.all())
+            for question in self.questions:
+                question.roles.set(roles)
+
+    def assertChartDataIsTheSameAsOneQuestionAtATime(self):
+        url = f"/api/assessments/{self.assessment.pk}/chart-data/"
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            set(res.data.keys()), {question.pk for question in self.questions}
+        )
+        for question in self.questions:
+            expected = self.client.get(
+                f"/api/assessments/{self.assessment.pk}/questions/{question.pk}/chart-data/"
+            ).data
+            self.assertEqual(res.data[question.pk], expected, question.type)
+        return res.data
+
+    def test_chart_data_is_the_same_as_one_question_at_a_time(self):
+        url = f"/api/assessments/{self.assessment.pk}/chart-data/"
+        self.assertChartDataIsTheSameAsOneQuestionAtATime()
+
+        # only cache reads
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+    def test_chart_data_of_roles_without_responses(self):
+        role = RoleFactory()
+        with self.captureOnCommitCallbacks(execute=True):
+            for question in self.questions:
+                question.roles.add(role)
+        data = self.assertChartDataIsTheSameAsOneQuestionAtATime()
+        for question in self.questions:
+            if question.type in [
+                QuestionType.UNIQUE_CHOICE,
+                QuestionType.MULTIPLE_CHOICE,
+            ]:
+                for value in data[question.pk]["data"]["value"].values():
+                    self.assertEqual(value[role.name], {"value": 0})
+
+    def test_chart_data_of_a_pillar(self):
+        question = self.questions[0]
+        pillar_id = question.criteria.marker.pillar_id
+        res = self.client.get(
+            f"/api/assessments/{self.assessment.pk}/chart-data/?pillar={pillar_id}"
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            set(res.data.keys()),
+            {
+                question.pk
+                for question in self.questions
+                if question.criteria.marker.pillar_id == pillar_id
+            },
+        )
+
+        res = self.client.get(
+            f"/api/assessments/{self.assessment.pk}/chart-data/?pillar=first"
+        )
+        self.assertEqual(res.status_code, 400)
+
+
+class TestScoreRollup(TestCase):
+    def test_boolean_questions_are_not_counted_in_criteria_denominator(self):
+        boolean, unique_choice = QuestionType.BOOLEAN, QuestionType.UNIQUE_CHOICE
+        scores = get_scores_by_question_scores(
+            [
+                (boolean, 1, (10, 100, 1000), 1.0),
+                (unique_choice, 2, (10, 100, 1000), 0.5),
+                (unique_choice, 3, (10, 100, 1000), 0.25),
+                (boolean, 4, (11, 100, 1000), 1.0),
+                (unique_choice, 5, (12, 101, 1000), 0.5),
+                (unique_choice, 6, (None, None, None), 0.5),
+            ]
+        )
+        self.assertEqual(
+            scores["by_question_id"], {1: 1.0, 2: 0.5, 3: 0.25, 4: 1.0, 5: 0.5, 6: 0.5}
+        )
+        self.assertEqual(scores["by_criteria_id"], {10: 0.875, 11: None, 12: 0.5})
+        self.assertEqual(scores["by_marker_id"], {100: 0.875, 101: 0.5})
+        self.assertEqual(scores["by_pillar_id"], {1000: 0.6875})
+
+
+class TestScoresByGroup(ScoresTestCase):
+    def test_single_group_has_the_scores_of_the_assessment(self):
+        assessment = create_assessment_with_all_question_types()
+        scores_by_medium = get_scores_by_assessment_pk(assessment.pk, "medium")
+        self.assertEqual(list(scores_by_medium), ["online"])
+        with override_settings(SCORING_ENGINE="queries"):
+            expected_scores = get_scores_by_assessment_pk(assessment.pk)
+        self.assertScoresEqual(scores_by_medium["online"], expected_scores)
+
+    def test_scores_by_role_and_profile(self):
+        assessment = AssessmentFactory()
+        citizen, elected = RoleFactory(), RoleFactory()
+        first_profile = ProfileType.objects.create(name="first")
+        second_profile = ProfileType.objects.create(name="second")
+        subjective_question = QuestionFactory(type=QuestionType.BOOLEAN)
+        objective_question = QuestionFactory(
+            type=QuestionType.BOOLEAN, objectivity=QuestionObjectivity.OBJECTIVE
+        )
+        for role, profiles, value in [
+            (citizen, [first_profile], True),
+            (citizen, [first_profile, second_profile], True),
+            (elected, [second_profile], False),
+        ]:
+            participation = ParticipationFactory(assessment=assessment, role=role)
+            participation.profiles.set(profiles)
+            ParticipationResponseFactory(
+                participation=participation,
+                question=subjective_question,
+                boolean_response=value,
+            )
+        AssessmentResponseFactory(
+            assessment=assessment, question=objective_question, boolean_response=True
+        )
+
+        scores_by_role = get_scores_by_assessment_pk(assessment.pk, "role")
+        self.assertEqual(
+            {
+                role_id: scores["by_question_id"]
+                for role_id, scores in scores_by_role.items()
+            },
+            {
+                citizen.pk: {
+                    subjective_question.pk: SCORE_MAP[2],
+                    objective_question.pk: SCORE_MAP[2],
+                },
+                elected.pk: {
+                    subjective_question.pk: SCORE_MAP[1],
+                    objective_question.pk: SCORE_MAP[2],
+                },
+            },
+        )
+        scores_by_profile = get_scores_by_assessment_pk(assessment.pk, "profile")
+        self.assertEqual(
+            scores_by_profile[first_profile.pk]["by_question_id"][
+                subjective_question.pk
+            ],
+            SCORE_MAP[2],
+        )
+        # one true and one false response
+        self.assertEqual(
+            scores_by_profile[second_profile.pk]["by_question_id"][
+                subjective_question.pk
+            ],
+            SCORE_MAP[2],
+        )
+
+        res = self.client.get(f"/api/assessments/{assessment.pk}/scores/?group_by=role")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(set(res.data), {citizen.pk, elected.pk})
+        res = self.client.get(
+            f"/api/assessments/{assessment.pk}/scores/?group_by=color"
+        )
+        self.assertEqual(res.status_code, 400)
+
+
+@override_settings(SCORING_WORKERS=1)
+class TestBulkScoring(TestCase):
+    def test_compute_all_scores_command(self):
+        assessment = create_assessment_with_all_question_types()
+        other_assessment = AssessmentFactory()
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command(
+            "compute_all_scores",
+            ids=[other_assessment.pk, assessment.pk],
+            workers=1,
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+        lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            [line["assessment_id"] for line in lines],
+            [assessment.pk, other_assessment.pk],
+        )
+        expected_scores = get_scores_by_assessment_pk(assessment.pk)
+        self.assertEqual(
+            lines[0]["by_question_id"],
+            {
+                str(question_id): score
+                for question_id, score in expected_scores["by_question_id"].items()
+            },
+        )
+        self.assertGreaterEqual(lines[0]["duration"], 0)
+        self.assertIn(f"Assessment {assessment.pk}:", stderr.getvalue())
+
+    def test_bulk_scores_endpoint_is_staff_only(self):
+        assessment = create_assessment_with_all_question_types()
+        AssessmentFactory()
+        url = f"/api/assessments/scores/?ids={assessment.pk}&output=csv"
+        user = UserFactory()
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        rows = list(
+            csv.DictReader(b"".join(res.streaming_content).decode().splitlines())
+        )
+        expected_scores = get_scores_by_assessment_pk(assessment.pk)
+        self.assertEqual({int(row["assessment_id"]) for row in rows}, {assessment.pk})
+        self.assertEqual(
+            {
+                int(row["pillar_id"]): float(row["score"]) if row["score"] else None
+                for row in rows
+                if row["pillar_id"]
+            },
+            expected_scores["by_pillar_id"],
+        )
+
+        res = self.client.get("/api/assessments/scores/?output=xml")
+        self.assertEqual(res.status_code, 400)
+
+
+class TestScoringPlan(TestCase):
+    def test_interval_scores_use_first_range_containing_value(self):
+        interval_scores = IntervalScores(
+            [(None, 10, 0.0), (5, 20, 0.5), (20, None, 1.0), (30, 40, None)]
+        )
+        for value, score in [
+            (-100, 0.0),
+            (5, 0.0),
+            (10, 0.0),
+            (10.5, 0.5),
+            (20, 0.5),
+            (25, 1.0),
+            (35, 1.0),
+        ]:
+            self.assertEqual(interval_scores.score(value), score, value)
+        self.assertIsNone(IntervalScores([(0, 10, 1.0)]).score(11))
+        self.assertIsNone(IntervalScores([(0, 10, None)]).score(5))
+        self.assertIsNone(IntervalScores([]).score(5))
+
+    def test_scoring_plan_is_compiled_once_per_content_revision(self):
+        assessment = create_assessment_with_all_question_types()
+        survey_id = assessment.survey_id
+        question = QuestionFactory(type=QuestionType.UNIQUE_CHOICE)
+        question.criteria.marker.pillar.survey_id = survey_id
+        question.criteria.marker.pillar.save()
+        response_choice = ResponseChoiceFactory(question=question, associated_score=1)
+
+        plan = get_scoring_plan(survey_id, [question.pk])
+        self.assertEqual(
+            plan.linearized_score_by_response_choice_id[response_choice.pk],
+            SCORE_MAP[1],
+        )
+        # only the content revision is read
+        with self.assertNumQueries(1):
+            self.assertIs(get_scoring_plan(survey_id, [question.pk]), plan)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response_choice.associated_score = 3
+            response_choice.save()
+        plan = get_scoring_plan(survey_id, [question.pk])
+        self.assertEqual(
+            plan.linearized_score_by_response_choice_id[response_choice.pk],
+            SCORE_MAP[3],
+        )
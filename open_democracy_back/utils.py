@@ -1,3 +1,6 @@
+import importlib.util
+import sys
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -105,3 +108,19 @@ class SurveyLocality(models.TextChoices):
     CITY = "city", _("Commune/EPCI")
     DEPARTMENT = "department", _("Département")
     REGION = "region", _("Région")
+
+
+def lazy_import(name: str):
+    """
+    Module only imported on first attribute access, to keep heavy modules out of
+    the startup of the web workers.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,389 @@
+"""
+Single-pass scoring engine.
+
+All the accounted responses of an assessment are fetched with a few flat
+`values_list` scans of the response tables, loaded into NumPy arrays, and
+question, criteria, marker and pillar scores are computed with vectorized
+group-bys, using the scoring plan of the survey for everything about questions.
+The result is the same as `scoring.get_scores_by_assessment_pk` with the
+"queries" engine.
+Scores by group of participations (role, profile, ...) are computed from the same
+scan, by masking the responses of each group.
+"""
+from __future__ import annotations
+
+import copy
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Tuple
+
+from open_democracy_back.models import (
+    SCORE_MAP,
+    Assessment,
+    AssessmentResponse,
+    ClosedWithScaleCategoryResponse,
+    Participation,
+    ParticipationResponse,
+)
+from open_democracy_back.score_rollup import get_scores_by_question_scores
+from open_democracy_back.scoring_plan import (
+    RANGE_MODEL_BY_QUESTION_TYPE,
+    ScoringPlan,
+    get_scoring_plan,
+)
+from open_democracy_back.utils import (
+    QuestionType,
+    QUESTION_TYPE_WITH_SCORE,
+    lazy_import,
+)
+
+np = lazy_import("numpy")
+
+SCALAR_FIELDS = (
+    "id",
+    "question_id",
+    "boolean_response",
+    "unique_choice_response_id",
+    "percentage_response",
+    "number_response",
+)
+
+# response model, foreign key to the response on the multiple choice through model
+# and on ClosedWithScaleCategoryResponse
+RESPONSE_TABLES = [
+    (ParticipationResponse, "participationresponse", "participation_response"),
+    (AssessmentResponse, "assessmentresponse", "assessment_response"),
+]
+
+# field of the participations defining the groups of their responses, a
+# participation is in several groups if it has several profiles
+PARTICIPATION_FIELD_BY_GROUP_BY = {
+    "role": "role_id",
+    "profile": "profiles",
+    "workshop": "workshop_id",
+    "medium": "medium",
+}
+
+
+def get_linearized_scores(plan: ScoringPlan, response_choice_ids) -> np.ndarray:
+    return plan.linearized_scores_of(
+        np.array(
+            [
+                -1 if choice_id is None else choice_id
+                for choice_id in response_choice_ids
+            ],
+            dtype=np.int64,
+        )
+    )
+
+
+class ResponseArrays:
+    """Column arrays of the accounted responses of one response table."""
+
+    def __init__(self, rows: List[tuple], plan: ScoringPlan):
+        columns = list(zip(*rows)) if rows else [()] * len(SCALAR_FIELDS)
+        self.id = np.array(columns[0], dtype=np.int64)
+        self.question_id = np.array(columns[1], dtype=np.int64)
+        self.type = (
+            plan.type[plan.index_of(self.question_id)]
+            if rows
+            else np.array([], dtype=object)
+        )
+        self.boolean = np.array(columns[2], dtype=float)
+        self.unique_choice_score = get_linearized_scores(plan, columns[3])
+        self.value_by_type = {
+            QuestionType.PERCENTAGE.value: np.array(columns[4], dtype=float),
+            QuestionType.NUMBER.value: np.array(columns[5], dtype=float),
+        }
+        self.sort()
+
+    def sort(self):
+        # responses ids are unique, sort them once to map through rows to questions
+        order = np.argsort(self.id)
+        self.sorted_id = self.id[order]
+        self.sorted_question_id = self.question_id[order]
+        self.sorted_type = self.type[order]
+
+    def subset(self, mask: np.ndarray) -> "ResponseArrays":
+        subset = copy.copy(self)
+        for name in ("id", "question_id", "type", "boolean", "unique_choice_score"):
+            setattr(subset, name, getattr(self, name)[mask])
+        subset.value_by_type = {
+            question_type: values[mask]
+            for question_type, values in self.value_by_type.items()
+        }
+        subset.sort()
+        return subset
+
+    def indexes_of(self, response_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Indexes of the responses in the sorted arrays, and which ones are found"""
+        if not len(self.sorted_id):
+            return (
+                np.zeros(len(response_ids), dtype=np.int64),
+                np.zeros(len(response_ids), dtype=bool),
+            )
+        indexes = np.minimum(
+            np.searchsorted(self.sorted_id, response_ids), len(self.sorted_id) - 1
+        )
+        return indexes, self.sorted_id[indexes] == response_ids
+
+
+def group_mean(keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    if not len(keys):
+        return keys, values
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return unique_keys, np.bincount(inverse, weights=values) / np.bincount(inverse)
+
+
+def group_max(keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    if not len(keys):
+        return keys, values
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    maximums = np.full(len(unique_keys), -np.inf)
+    np.maximum.at(maximums, inverse, values)
+    return unique_keys, maximums
+
+
+def get_boolean_scores(responses: ResponseArrays):
+    mask = responses.type == QuestionType.BOOLEAN.value
+    question_ids, averages = group_mean(
+        responses.question_id[mask], (responses.boolean[mask] == 1).astype(float)
+    )
+    return question_ids, np.where(averages >= 0.5, SCORE_MAP[2], SCORE_MAP[1])
+
+
+def get_unique_choice_scores(responses: ResponseArrays):
+    mask = (responses.type == QuestionType.UNIQUE_CHOICE.value) & ~np.isnan(
+        responses.unique_choice_score
+    )
+    return group_mean(responses.question_id[mask], responses.unique_choice_score[mask])
+
+
+def get_scores_of_scores_by_response(
+    responses: ResponseArrays,
+    through_rows: List[tuple],
+    question_type: str,
+    aggregate,
+    plan: ScoringPlan,
+):
+    """
+    Through rows are (response_id, response_choice_id): each response score is the
+    aggregate of the scores of its rows, each question score the mean of its
+    responses scores. Rows of other responses are ignored.
+    """
+    response_ids = np.array([row[0] for row in through_rows], dtype=np.int64)
+    scores = get_linearized_scores(plan, [row[1] for row in through_rows])
+    indexes, mask = responses.indexes_of(response_ids)
+    mask &= ~np.isnan(scores)
+    mask[mask] = responses.sorted_type[indexes[mask]] == question_type
+    response_ids, response_scores = aggregate(response_ids[mask], scores[mask])
+    return group_mean(
+        responses.sorted_question_id[responses.indexes_of(response_ids)[0]],
+        response_scores,
+    )
+
+
+def get_interval_scores(
+    responses: ResponseArrays, question_type: str, plan: ScoringPlan
+):
+    values = responses.value_by_type[question_type]
+    mask = (responses.type == question_type) & ~np.isnan(values)
+    question_ids, averages = group_mean(responses.question_id[mask], values[mask])
+    scored_question_ids, scores = [], []
+    for question_id, average in zip(question_ids.tolist(), averages.tolist()):
+        score = plan.interval_score(question_id, average)
+        if score is not None:
+            scored_question_ids.append(question_id)
+            scores.append(score)
+    return np.array(scored_question_ids, dtype=np.int64), np.array(scores, dtype=float)
+
+
+def get_through_rows(
+    queryset, through_field: str, category_field: str
+) -> Tuple[List[tuple], List[tuple]]:
+    """
+    (response_id, response_choice_id) rows of the multiple choice and closed with
+    scale responses of a queryset. `through_field` and `category_field` are the
+    names of the foreign key to the response on the multiple choice through model
+    and on `ClosedWithScaleCategoryResponse`.
+    """
+    response_ids = queryset.values("id")
+    multiple_choice_rows = list(
+        queryset.model.multiple_choice_response.through.objects.filter(
+            **{f"{through_field}__in": response_ids}
+        ).values_list(f"{through_field}_id", "responsechoice_id")
+    )
+    closed_with_scale_rows = list(
+        ClosedWithScaleCategoryResponse.objects.filter(
+            **{f"{category_field}__in": response_ids}
+        ).values_list(f"{category_field}_id", "response_choice_id")
+    )
+    return multiple_choice_rows, closed_with_scale_rows
+
+
+def get_question_scores_of_responses(
+    responses: ResponseArrays,
+    multiple_choice_rows: List[tuple],
+    closed_with_scale_rows: List[tuple],
+    plan: ScoringPlan,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Scores of every question answered in the responses, by question type"""
+    scores_by_type = {
+        QuestionType.BOOLEAN.value: get_boolean_scores(responses),
+        QuestionType.UNIQUE_CHOICE.value: get_unique_choice_scores(responses),
+        QuestionType.MULTIPLE_CHOICE.value: get_scores_of_scores_by_response(
+            responses,
+            multiple_choice_rows,
+            QuestionType.MULTIPLE_CHOICE.value,
+            group_max,
+            plan,
+        ),
+        QuestionType.CLOSED_WITH_SCALE.value: get_scores_of_scores_by_response(
+            responses,
+            closed_with_scale_rows,
+            QuestionType.CLOSED_WITH_SCALE.value,
+            group_mean,
+            plan,
+        ),
+    }
+    for question_type in RANGE_MODEL_BY_QUESTION_TYPE:
+        scores_by_type[question_type] = get_interval_scores(
+            responses, question_type, plan
+        )
+    return scores_by_type
+
+
+def get_question_scores_of_table(
+    queryset,
+    rows: List[tuple],
+    through_field: str,
+    category_field: str,
+    plan: ScoringPlan,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Scores of every question answered in one response table, by question type"""
+    return get_question_scores_of_responses(
+        ResponseArrays(rows, plan),
+        *get_through_rows(queryset, through_field, category_field),
+        plan,
+    )
+
+
+def iter_question_scores(question_scores_by_table, plan: ScoringPlan):
+    for question_type in QUESTION_TYPE_WITH_SCORE:
+        for question_scores_by_type in question_scores_by_table:
+            question_ids, question_scores = question_scores_by_type[question_type.value]
+            for question_id, score in zip(
+                question_ids.tolist(), question_scores.tolist()
+            ):
+                yield (
+                    question_type.value,
+                    question_id,
+                    plan.hierarchy_by_question_id[question_id],
+                    score,
+                )
+
+
+def get_scores_by_assessment_pk_vectorized(
+    assessment_pk: int,
+) -> Dict[str, Dict[str, float]]:
+    survey_id = (
+        Assessment.objects.filter(pk=assessment_pk)
+        .values_list("survey_id", flat=True)
+        .first()
+    )
+    querysets = [
+        model.objects.accounted_in_assessment(assessment_pk)
+        for model, _, _ in RESPONSE_TABLES
+    ]
+    rows_by_table = [
+        list(queryset.values_list(*SCALAR_FIELDS)) for queryset in querysets
+    ]
+    plan = get_scoring_plan(
+        survey_id, {row[1] for rows in rows_by_table for row in rows}
+    )
+    question_scores_by_table = [
+        get_question_scores_of_table(
+            queryset, rows, through_field, category_field, plan
+        )
+        for queryset, rows, (_, through_field, category_field) in zip(
+            querysets, rows_by_table, RESPONSE_TABLES
+        )
+    ]
+    return get_scores_by_question_scores(
+        iter_question_scores(question_scores_by_table, plan)
+    )
+
+
+def get_scores_by_group_of_assessment_pk(
+    assessment_pk: int, group_by: str
+) -> Dict[Any, Dict[str, Dict[str, float]]]:
+    """
+    Scores of an assessment for each group of participations, e.g. for each role.
+    The responses are scanned once, the scores of a group are computed from the
+    responses of its participations and from all the assessment responses, that
+    are objective and so the same for every group.
+    """
+    survey_id = (
+        Assessment.objects.filter(pk=assessment_pk)
+        .values_list("survey_id", flat=True)
+        .first()
+    )
+    participation_ids_by_group: DefaultDict[Any, List[int]] = defaultdict(list)
+    for participation_id, group in Participation.objects.filter(
+        assessment_id=assessment_pk
+    ).values_list("id", PARTICIPATION_FIELD_BY_GROUP_BY[group_by]):
+        if group is not None:
+            participation_ids_by_group[group].append(participation_id)
+
+    (
+        (_, participation_through_field, participation_category_field),
+        (_, assessment_through_field, assessment_category_field),
+    ) = RESPONSE_TABLES
+    participation_responses = ParticipationResponse.objects.accounted_in_assessment(
+        assessment_pk
+    )
+    assessment_responses = AssessmentResponse.objects.accounted_in_assessment(
+        assessment_pk
+    )
+    participation_rows = list(
+        participation_responses.values_list(*SCALAR_FIELDS, "participation_id")
+    )
+    assessment_rows = list(assessment_responses.values_list(*SCALAR_FIELDS))
+    plan = get_scoring_plan(
+        survey_id,
+        {row[1] for rows in (participation_rows, assessment_rows) for row in rows},
+    )
+
+    assessment_question_scores = get_question_scores_of_table(
+        assessment_responses,
+        assessment_rows,
+        assessment_through_field,
+        assessment_category_field,
+        plan,
+    )
+    responses = ResponseArrays(participation_rows, plan)
+    participation_through_rows = get_through_rows(
+        participation_responses,
+        participation_through_field,
+        participation_category_field,
+    )
+    response_participation_id = np.array(
+        [row[-1] for row in participation_rows], dtype=np.int64
+    )
+    return {
+        group: get_scores_by_question_scores(
+            iter_question_scores(
+                [
+                    get_question_scores_of_responses(
+                        responses.subset(
+                            np.isin(response_participation_id, participation_ids)
+                        ),
+                        *participation_through_rows,
+                        plan,
+                    ),
+                    assessment_question_scores,
+                ],
+                plan,
+            )
+        )
+        for group, participation_ids in participation_ids_by_group.items()
+    }
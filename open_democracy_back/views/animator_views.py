@@ -18,6 +18,10 @@ from open_democracy_back.models.participation_models import (
     ParticipationResponse,
 )
 from open_democracy_back.permissions import IsWorkshopExpert
+from open_democracy_back.representativity_counts import (
+    rebuild_representativity_counts,
+)
+from open_democracy_back.score_aggregates import rebuild_score_aggregates
 from open_democracy_back.serializers.animator_serializers import (
     FullWorkshopSerializer,
     WorkshopParticipationResponseSerializer,
@@ -218,5 +222,13 @@ class CloseWorkshopView(APIView):
                     participation.save()
                     # TODO : what append if there is a participation with this user and this assessment (like this it breaks)
 
+            # responses of participations with a user are now accounted in the scores
+            # and in the representativities
+            assessment_ids = set(
+                workshop.participations.values_list("assessment_id", flat=True)
+            )
+            rebuild_score_aggregates(assessment_ids=assessment_ids)
+            rebuild_representativity_counts(assessment_ids=assessment_ids)
+
             serializer = WorkshopSerializer(workshop)
             return RestResponse(serializer.data, status=status.HTTP_200_OK)
@@ -1,29 +1,56 @@
 import logging
+import os
 from datetime import date
-from typing import Dict
+from typing import Any, Dict
 
 from django.db import transaction
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import api_view, action
-from rest_framework.exceptions import APIException
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import APIException, PermissionDenied
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.response import Response as RestResponse
 from rest_framework.views import APIView
 
 from my_auth.models import User
-from open_democracy_back.chart_data import CHART_DATA_FN_BY_QUESTION_TYPE
+from open_democracy_back.assessment_roles import get_assessment_role, has_details_access
+from open_democracy_back.bulk_scoring import (
+    CONTENT_TYPE_BY_FORMAT,
+    LINES_FN_BY_FORMAT,
+    iter_assessments_scores,
+)
+from open_democracy_back.chart_data import (
+    CHART_DATA_FN_BY_QUESTION_TYPE,
+    get_chart_data_of_assessment,
+)
+from open_democracy_back.data_versions import (
+    get_assessment_data_etag,
+    get_or_set_assessment_data,
+)
+from open_democracy_back.document_uploads import (
+    append_upload_chunk,
+    complete_upload,
+    delete_upload,
+    get_upload_offset,
+    write_upload_chunk,
+)
 from open_democracy_back.exceptions import ErrorCode, ValidationFieldError
-from open_democracy_back.mixins.update_or_create_mixin import UpdateOrCreateModelMixin
+from open_democracy_back.locality_index import get_locality_index
+from open_democracy_back.mixins.response_batch_mixin import ResponseBatchModelMixin
 from open_democracy_back.models import (
     Assessment,
     Participation,
     Question,
     AssessmentDocument,
+    AssessmentDocumentUpload,
     Region,
     Survey,
     Department,
@@ -44,27 +71,35 @@ from open_democracy_back.permissions import (
     HasWriteAccessOnAssessment,
     HasAssessmentWriteAccessForUpdate,
 )
+from open_democracy_back.response_batches import save_response_batch
 from open_democracy_back.scoring import (
     get_scores_by_assessment_pk,
 )
 from open_democracy_back.serializers.assessment_serializers import (
+    AssessmentResponseBatchSerializer,
     AssessmentResponseSerializer,
     AssessmentSerializer,
-    EpciSerializer,
-    MunicipalitySerializer,
     AssessmentDocumentSerializer,
-    get_assessment_role,
-    has_details_access,
+    AssessmentDocumentUploadSerializer,
     AssessmentNoDetailSerializer,
     AssessmentSerializerForUpdate,
-    RegionSerializer,
-    DepartmentSerializer,
+    annotate_assessments_for_list,
 )
 from open_democracy_back.serializers.user_serializers import UserSerializer
 from open_democracy_back.utils import ManagedAssessmentType, SurveyLocality
+from open_democracy_back.vectorized_scoring import PARTICIPATION_FIELD_BY_GROUP_BY
 
 logger = logging.getLogger(__name__)
 
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+class PublishedAssessmentsPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
 
 def consent_condition_of_sales(assessment, conditions_of_sale_consent):
     if conditions_of_sale_consent is True:
@@ -90,8 +125,7 @@ class AssessmentsView(
 
     def get_serializer_class(self):
         obj: Assessment = self.get_object()
-        user = self.request.user
-        role = get_assessment_role(obj, user)
+        role = get_assessment_role(self.request, obj)
         detail_access = has_details_access(role)
         if detail_access:
             if self.action == "partial_update":
@@ -136,10 +170,22 @@ class AssessmentsView(
 
     @action(detail=False, methods=["GET"])
     def published(self, request):
-        assessments = Assessment.objects.filter(initialization_date__lte=timezone.now())
-        assessments = [
-            assessment for assessment in assessments if assessment.published_results
-        ]
+        assessments = Assessment.objects.filter(
+            initialization_date__lte=timezone.now(), published_results=True
+        ).order_by("-initialization_date", "-pk")
+        # the list is paginated when a page is requested
+        if "page" in request.GET:
+            paginator = PublishedAssessmentsPagination()
+            page = paginator.paginate_queryset(
+                annotate_assessments_for_list(assessments),
+                request,
+                view=self,
+            )
+            return paginator.get_paginated_response(
+                self.serializer_class(
+                    page, context=self.get_serializer_context(), many=True
+                ).data
+            )
         return RestResponse(
             status=200,
             data=self.serializer_class(
@@ -147,6 +193,36 @@ class AssessmentsView(
             ).data,
         )
 
+    @action(detail=False, methods=["GET"], permission_classes=[IsAdminUser])
+    def scores(self, request):
+        # "format" is used by the content negotiation of rest framework
+        output_format = request.GET.get("output", "jsonl")
+        if output_format not in LINES_FN_BY_FORMAT:
+            raise ValidationFieldError(
+                "output",
+                detail=f"Output must be one of {', '.join(LINES_FN_BY_FORMAT)}",
+                code=ErrorCode.INCORRECT_OUTPUT_FORMAT.value,
+            )
+        assessment_ids = Assessment.objects.order_by("id").values_list("id", flat=True)
+        if request.GET.get("ids"):
+            try:
+                ids = [int(id) for id in request.GET["ids"].split(",")]
+            except ValueError:
+                raise ValidationFieldError(
+                    "ids",
+                    detail="Ids must be comma-separated integers",
+                    code=ErrorCode.INCORRECT_IDS.value,
+                )
+            assessment_ids = assessment_ids.filter(id__in=ids)
+        # computed in the process of the request, the process pool being for the
+        # compute_all_scores command
+        return StreamingHttpResponse(
+            LINES_FN_BY_FORMAT[output_format](
+                iter_assessments_scores(list(assessment_ids), workers=1)
+            ),
+            content_type=CONTENT_TYPE_BY_FORMAT[output_format],
+        )
+
     @action(
         detail=True,
         methods=["POST"],
@@ -264,49 +340,35 @@ class AssessmentsView(
 
 
 class ZipCodeSurveysView(mixins.ListModelMixin, viewsets.GenericViewSet):
-    serializer_class_municipality = MunicipalitySerializer
-    serializer_class_epci = EpciSerializer
-
     def list(self, request, zip_code: str):
-        municipalities = self.serializer_class_municipality(
-            Municipality.objects.filter(zip_codes__code=zip_code).distinct(), many=True
-        )
-        epcis = self.serializer_class_epci(
-            EPCI.objects.filter(
-                related_municipalities_ordered__municipality__zip_codes__code=zip_code
-            ).distinct(),
-            many=True,
-        )
-
-        to_return = {
-            LocalityType.MUNICIPALITY: municipalities.data,
-            LocalityType.INTERCOMMUNALITY: epcis.data,
-        }
-
-        # only include departements and region if corresponding surveys exist
-        if Survey.objects.filter(survey_locality=SurveyLocality.DEPARTMENT).exists():
-            departments = DepartmentSerializer(
-                Department.objects.filter(
-                    municipalities__zip_codes__code=zip_code
-                ).distinct(),
-                many=True,
-            )
-            to_return[LocalityType.DEPARTMENT] = departments.data
-
-        if Survey.objects.filter(survey_locality=SurveyLocality.REGION).exists():
-            regions = RegionSerializer(
-                Region.objects.filter(
-                    departments__municipalities__zip_codes__code=zip_code
-                ).distinct(),
-                many=True,
+        # read from the locality index, the localities are not queried
+        return Response(get_locality_index().get_localities(zip_code))
+
+
+class LocalityAutocompleteView(APIView):
+    """
+    Localities whose name starts with `q`, accents ignored, most populated first.
+    A word of the name may also start with `q`.
+    """
+
+    def get(self, request):
+        try:
+            limit = int(request.GET.get("limit", AUTOCOMPLETE_DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= AUTOCOMPLETE_MAX_LIMIT:
+            raise ValidationFieldError(
+                "limit",
+                detail=f"Limit must be between 1 and {AUTOCOMPLETE_MAX_LIMIT}",
+                code=ErrorCode.INCORRECT_LIMIT.value,
             )
-            to_return[LocalityType.REGION] = regions.data
-
-        return Response(to_return)
+        return Response(
+            get_locality_index().autocomplete(request.GET.get("q", ""), limit)
+        )
 
 
 class AssessmentResponseView(
-    mixins.ListModelMixin, UpdateOrCreateModelMixin, viewsets.GenericViewSet
+    mixins.ListModelMixin, ResponseBatchModelMixin, viewsets.GenericViewSet
 ):
     permission_classes = [IsAuthenticated]
     serializer_class = AssessmentResponseSerializer
@@ -318,12 +380,6 @@ class AssessmentResponseView(
             ),
         )
 
-    def get_or_update_object(self, request):
-        return AssessmentResponse.objects.get(
-            assessment_id=request.data.get("assessment_id"),
-            question_id=request.data.get("question_id"),
-        )
-
     @action(
         detail=False,
         methods=["GET"],
@@ -334,6 +390,22 @@ class AssessmentResponseView(
         query = assessment.responses.all()
         return RestResponse(self.get_serializer_class()(query, many=True).data)
 
+    def save_batch(self, data):
+        batch_serializer = AssessmentResponseBatchSerializer(
+            data=data, context=self.get_serializer_context()
+        )
+        batch_serializer.is_valid(raise_exception=True)
+        assessment = batch_serializer.validated_data["assessment"]
+        return save_response_batch(
+            AssessmentResponse,
+            {"assessment_id": assessment.pk},
+            assessment.pk,
+            batch_serializer.validated_data["responses"],
+            batch_serializer.get_eligible_questions(),
+            self.get_serializer_class(),
+            extra_values={"answered_by_id": self.request.user.id},
+        )
+
 
 class ExpertView(mixins.ListModelMixin, viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
@@ -379,10 +451,25 @@ class CompletedQuestionsInitializationView(APIView):
 
 
 class AssessmentScoreView(APIView):
-    # Cache page everyday
-    @method_decorator(cache_page(60 * 60 * 24))
+    # Scores are cached until a response of the assessment changes, clients
+    # revalidate them with the ETag
+    @method_decorator(cache_control(no_cache=True))
+    @method_decorator(
+        etag(lambda request, assessment_id: get_assessment_data_etag(assessment_id))
+    )
     def get(self, request, assessment_id):
-        scores: Dict[str, Dict[str, float]] = get_scores_by_assessment_pk(assessment_id)
+        group_by = request.GET.get("group_by")
+        if group_by and group_by not in PARTICIPATION_FIELD_BY_GROUP_BY:
+            raise ValidationFieldError(
+                "group_by",
+                detail=f"Group by must be one of {', '.join(PARTICIPATION_FIELD_BY_GROUP_BY)}",
+                code=ErrorCode.INCORRECT_GROUP_BY.value,
+            )
+        scores: Dict[str, Any] = get_or_set_assessment_data(
+            assessment_id,
+            f"scores-by-{group_by}" if group_by else "scores",
+            lambda: get_scores_by_assessment_pk(assessment_id, group_by),
+        )
         return RestResponse(scores, status=status.HTTP_200_OK)
 
 
@@ -405,6 +492,40 @@ def get_chart_data(request, assessment_id, question_id):
     )
 
 
+class AssessmentChartDataView(APIView):
+    # Chart data of all the questions, or of the questions of a pillar, cached like
+    # the scores
+    @method_decorator(cache_control(no_cache=True))
+    @method_decorator(
+        etag(lambda request, assessment_id: get_assessment_data_etag(assessment_id))
+    )
+    def get(self, request, assessment_id):
+        pillar_id = request.GET.get("pillar")
+        if pillar_id is not None:
+            if not pillar_id.isdigit():
+                raise ValidationFieldError(
+                    "pillar",
+                    detail="Pillar must be an id",
+                    code=ErrorCode.INCORRECT_PILLAR.value,
+                )
+            pillar_id = int(pillar_id)
+        data = get_or_set_assessment_data(
+            assessment_id,
+            f"chart-data-{pillar_id or 'all'}",
+            lambda: get_chart_data_of_assessment(assessment_id, pillar_id),
+        )
+        return RestResponse(data, status=status.HTTP_200_OK)
+
+
+def raise_incorrect_upload_chunk(upload: AssessmentDocumentUpload, offset: int):
+    raise ValidationFieldError(
+        "upload_offset",
+        detail=f"The chunk must start at byte {offset} and end before "
+        f"byte {upload.size}",
+        code=ErrorCode.INCORRECT_UPLOAD_CHUNK.value,
+    )
+
+
 class AssessmentDocumentView(
     viewsets.GenericViewSet,
     mixins.CreateModelMixin,
@@ -415,3 +536,82 @@ class AssessmentDocumentView(
     permission_classes = [IsAuthenticated, HasWriteAccessOnAssessment]
     serializer_class = AssessmentDocumentSerializer
     queryset = AssessmentDocument.objects.all()
+
+    @action(detail=False, methods=["post"], url_path="uploads")
+    def start_upload(self, request):
+        """Start the resumable upload of a document, sent in chunks afterwards"""
+        serializer = AssessmentDocumentUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not has_details_access(
+            get_assessment_role(request, serializer.validated_data["assessment"])
+        ):
+            raise PermissionDenied()
+        serializer.save(user=request.user)
+        return RestResponse(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False,
+        methods=["get", "put", "delete"],
+        url_path=r"uploads/(?P<upload_id>[0-9a-f-]+)",
+    )
+    def upload(self, request, upload_id):
+        """
+        GET gives the offset to resume an upload from, PUT appends to the upload
+        the chunk in the body of the request, starting at the offset given in the
+        Upload-Offset header, and creates the document with the last chunk, DELETE
+        cancels the upload.
+        """
+        with transaction.atomic():
+            upload = get_object_or_404(
+                AssessmentDocumentUpload.objects.select_for_update(),
+                pk=upload_id,
+                user=request.user,
+            )
+            if request.method == "DELETE":
+                delete_upload(upload)
+                return RestResponse(status=status.HTTP_204_NO_CONTENT)
+
+            offset = get_upload_offset(upload)
+            if request.method == "GET":
+                return RestResponse(
+                    AssessmentDocumentUploadSerializer(upload).data,
+                    status=status.HTTP_200_OK,
+                )
+
+            try:
+                chunk_offset = int(request.headers["Upload-Offset"])
+                length = int(request.headers["Content-Length"])
+            except (KeyError, ValueError):
+                chunk_offset = length = -1
+            if chunk_offset != offset or not 0 < length <= upload.size - offset:
+                raise_incorrect_upload_chunk(upload, offset)
+
+        # read from the request stream without locking the upload, the body is not
+        # loaded in memory
+        part_path = write_upload_chunk(upload, request.stream, length)
+        try:
+            with transaction.atomic():
+                upload = get_object_or_404(
+                    AssessmentDocumentUpload.objects.select_for_update(),
+                    pk=upload_id,
+                    user=request.user,
+                )
+                # another chunk was appended meanwhile
+                if get_upload_offset(upload) != offset:
+                    raise_incorrect_upload_chunk(upload, upload.offset)
+                append_upload_chunk(upload, part_path)
+                if upload.offset < upload.size:
+                    return RestResponse(
+                        AssessmentDocumentUploadSerializer(upload).data,
+                        status=status.HTTP_200_OK,
+                    )
+                document = complete_upload(upload)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        return RestResponse(
+            AssessmentDocumentSerializer(
+                document, context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_201_CREATED,
+        )
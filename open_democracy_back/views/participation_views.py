@@ -1,6 +1,3 @@
-from abc import ABC, abstractmethod
-import operator
-
 from django.utils import timezone
 from django.db.models import QuerySet
 from rest_framework import mixins, viewsets, status
@@ -10,127 +7,21 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response as RestResponse
 
+from open_democracy_back.mixins.response_batch_mixin import ResponseBatchModelMixin
 from open_democracy_back.mixins.update_or_create_mixin import UpdateOrCreateModelMixin
 from open_democracy_back.models.participation_models import (
     Participation,
     ParticipationResponse,
-    Response,
-)
-from open_democracy_back.models.questionnaire_and_profiling_models import (
-    BooleanOperator,
-    ProfileDefinition,
-    ProfileType,
 )
-
+from open_democracy_back.models.questionnaire_and_profiling_models import Question
+from open_democracy_back.profile_rules import assign_profiles
+from open_democracy_back.response_batches import save_response_batch
 from open_democracy_back.serializers.participation_serializers import (
     ParticipationSerializer,
+    ParticipationResponseBatchSerializer,
     ParticipationResponseSerializer,
 )
-from open_democracy_back.utils import SerializerContext, QuestionType
-
-NUMERICAL_OPERATOR_CONVERSION = {
-    "<": operator.lt,
-    ">": operator.gt,
-    "<=": operator.le,
-    ">=": operator.ge,
-    "!=": operator.ne,
-    "=": operator.eq,
-}
-
-
-class QuestionStrategy(ABC):
-    @abstractmethod
-    def does_respect_rule(self, rule: ProfileDefinition, response: Response):
-        pass
-
-
-class UniqueChoiceStrategy(QuestionStrategy):
-    def does_respect_rule(self, rule: ProfileDefinition, response: Response):
-        return response.unique_choice_response in rule.response_choices.all()
-
-
-class MultipleChoiceStrategy(QuestionStrategy):
-    def does_respect_rule(self, rule: ProfileDefinition, response: Response):
-        return any(
-            [
-                response in rule.response_choices.all()
-                for response in response.multiple_choice_response.all()
-            ]
-        )
-
-
-class BooleanStrategy(QuestionStrategy):
-    def does_respect_rule(self, rule: ProfileDefinition, response: Response):
-        return response.boolean_response == rule.boolean_response
-
-
-class PercentageStrategy(QuestionStrategy):
-    def does_respect_rule(self, rule: ProfileDefinition, response: Response):
-        return NUMERICAL_OPERATOR_CONVERSION[rule.numerical_operator](
-            response.percentage_response, rule.numerical_value
-        )
-
-
-class NumberStrategy(QuestionStrategy):
-    def does_respect_rule(self, rule: ProfileDefinition, response: Response):
-        return NUMERICAL_OPERATOR_CONVERSION[rule.numerical_operator](
-            response.number_response, rule.float_value
-        )
-
-
-RULES_STRATEGY = {
-    QuestionType.UNIQUE_CHOICE.value: UniqueChoiceStrategy(),  # type: ignore
-    QuestionType.MULTIPLE_CHOICE.value: MultipleChoiceStrategy(),  # type: ignore
-    QuestionType.BOOLEAN.value: BooleanStrategy(),  # type: ignore
-    QuestionType.PERCENTAGE.value: PercentageStrategy(),  # type: ignore
-    QuestionType.NUMBER.value: NumberStrategy(),  # type: ignore
-}
-
-
-class RuleContext:
-    def __init__(self, rule: ProfileDefinition) -> None:
-        self._strategy = RULES_STRATEGY[rule.type]
-        self.rule = rule
-
-    def does_respect_rule(self, response: Response) -> bool:
-        if not response:
-            return False
-        return self._strategy.does_respect_rule(self.rule, response)
-
-
-def isProfileRelevant(profileType, profilingQuestionResponses):
-    if profileType.rules_intersection_operator == BooleanOperator.AND.value:
-        return all(
-            [
-                RuleContext(rule).does_respect_rule(
-                    profilingQuestionResponses.filter(
-                        question=rule.conditional_question
-                    ).first(),
-                )
-                for rule in profileType.rules.all()
-            ]
-        )
-    if profileType.rules_intersection_operator == BooleanOperator.OR.value:
-        return any(
-            [
-                RuleContext(rule).does_respect_rule(
-                    profilingQuestionResponses.filter(
-                        question=rule.conditional_question
-                    ).first(),
-                )
-                for rule in profileType.rules.all()
-            ]
-        )
-
-
-def assignProfilesToParticipation(participation):
-    profilingQuestionResponses = participation.responses.filter(
-        question__profiling_question=True
-    )
-    profileTypes = ProfileType.objects.all()
-    for profileType in profileTypes:
-        if isProfileRelevant(profileType, profilingQuestionResponses):
-            participation.profiles.add(profileType)
+from open_democracy_back.utils import SerializerContext
 
 
 class ParticipationView(
@@ -168,7 +59,7 @@ class ParticipationView(
         return RestResponse(self.get_serializer_class()(instance).data)
 
 
-class ParticipationResponseView(UpdateOrCreateModelMixin, viewsets.GenericViewSet):
+class ParticipationResponseView(ResponseBatchModelMixin, viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = ParticipationResponseSerializer
 
@@ -186,12 +77,6 @@ class ParticipationResponseView(UpdateOrCreateModelMixin, viewsets.GenericViewSe
 
         return query
 
-    def get_or_update_object(self, request):
-        return self.get_queryset().get(
-            participation_id=request.data.get("participation_id"),
-            question_id=request.data.get("question_id"),
-        )
-
     @action(
         detail=False,
         methods=["GET"],
@@ -211,6 +96,23 @@ class ParticipationResponseView(UpdateOrCreateModelMixin, viewsets.GenericViewSe
             query = query.filter(question__profiling_question=is_profiling_question)
         return RestResponse(self.get_serializer_class()(query, many=True).data)
 
+    def save_batch(self, data):
+        batch_serializer = ParticipationResponseBatchSerializer(
+            data=data, context=self.get_serializer_context()
+        )
+        batch_serializer.is_valid(raise_exception=True)
+        participation = batch_serializer.validated_data["participation"]
+        return save_response_batch(
+            ParticipationResponse,
+            {"participation_id": participation.pk},
+            participation.assessment_id,
+            batch_serializer.validated_data["responses"],
+            Question.objects.filter_by_role(participation.role_id).filter_by_population(
+                participation.assessment.population or 0
+            ),
+            self.get_serializer_class(),
+        )
+
 
 class CompletedQuestionsParticipationView(SerializerContext, APIView):
     permission_classes = [IsAuthenticated]
@@ -222,7 +124,7 @@ class CompletedQuestionsParticipationView(SerializerContext, APIView):
         if request.data.get("profiling_question"):
             participation.is_profiling_questions_completed = True
             participation.save()
-            assignProfilesToParticipation(participation)
+            assign_profiles(participation)
         elif participation.is_profiling_questions_completed and pillard_id:
             participation_pillar_completed = (
                 participation.participationpillarcompleted_set.get(pillar=pillard_id)
@@ -1,8 +1,16 @@
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
 from rest_framework import mixins, viewsets
 from rest_framework.decorators import action
-from rest_framework.response import Response
 
+from open_democracy_back.mixins.delta_sync_mixin import DeltaSyncListModelMixin
 from open_democracy_back.models import Survey
+from open_democracy_back.survey_bundle import get_survey_bundle
 from open_democracy_back.models.questionnaire_and_profiling_models import (
     Criteria,
     Marker,
@@ -23,6 +31,7 @@ from open_democracy_back.serializers.questionnaire_and_profiling_serializers imp
 class SurveyView(
     # mixins.RetrieveModelMixin,
     # mixins.ListModelMixin,
+    DeltaSyncListModelMixin,
     viewsets.ModelViewSet,
 ):
     serializer_class = FullSurveySerializer
@@ -41,46 +50,29 @@ class SurveyView(
         methods=["GET"],
     )
     def all(self, request, *args, **kwargs):
-        surveys = self.get_queryset()
-        survey_serializer = self.get_serializer(
-            surveys, many=True, context=self.get_serializer_context()
-        )
-
-        questions = (
-            QuestionnaireQuestion.objects.exclude(criteria__marker__pillar__isnull=True)
-            .prefetch_related("profiles")
-            .prefetch_related("criteria")
-            .prefetch_related("criteria__marker")
-            .prefetch_related("criteria__marker__pillar")
-            .prefetch_related("criteria__marker__pillar__survey")
-            .prefetch_related("allows_to_explain")
-            .prefetch_related("assessment_types")
-            .prefetch_related("response_choices")
-            .prefetch_related("categories")
-            .prefetch_related("roles")
-            .prefetch_related("rules")
-            .prefetch_related("explained_by")
-            .order_by(
-                "criteria__marker__pillar__code",
-                "criteria__marker__code",
-                "criteria__code",
-                "code",
+        # the same for every participant, pre-rendered once per revision of the
+        # survey content, clients revalidate it with the ETag
+        bundle = get_survey_bundle()
+        gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+        # gzipped and plain bundles are different representations
+        bundle_etag = quote_etag(f"{bundle.etag}-gzip" if gzipped else bundle.etag)
+        response = get_conditional_response(request, etag=bundle_etag)
+        if response is None:
+            response = HttpResponse(
+                bundle.gzipped_content if gzipped else bundle.content,
+                content_type="application/json",
             )
-        )
-        question_serializer = QuestionnaireQuestionSerializer(
-            questions, many=True, context=self.get_serializer_context()
-        )
-        return Response(
-            {
-                "surveys": survey_serializer.data,
-                "questions": question_serializer.data,
-            }
-        )
+            if gzipped:
+                response.headers["Content-Encoding"] = "gzip"
+        response.headers["ETag"] = bundle_etag
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ["Accept-Encoding", "Accept-Language"])
+        return response
 
 
 class PillarView(
     mixins.RetrieveModelMixin,
-    mixins.ListModelMixin,
+    DeltaSyncListModelMixin,
     viewsets.GenericViewSet,
 ):
     serializer_class = PillarSerializer
@@ -89,7 +81,7 @@ class PillarView(
 
 class MarkerView(
     mixins.RetrieveModelMixin,
-    mixins.ListModelMixin,
+    DeltaSyncListModelMixin,
     viewsets.GenericViewSet,
 ):
     serializer_class = MarkerSerializer
@@ -98,7 +90,7 @@ class MarkerView(
 
 class CriteriaView(
     mixins.RetrieveModelMixin,
-    mixins.ListModelMixin,
+    DeltaSyncListModelMixin,
     viewsets.GenericViewSet,
 ):
     serializer_class = CriteriaSerializer
@@ -107,7 +99,7 @@ class CriteriaView(
 
 class QuestionnaireQuestionView(
     mixins.RetrieveModelMixin,
-    mixins.ListModelMixin,
+    DeltaSyncListModelMixin,
     viewsets.GenericViewSet,
 ):
     serializer_class = QuestionnaireQuestionSerializer
@@ -10,8 +10,16 @@ from open_democracy_back.forms import (
 )
 from django.db.models import Q
 from django.views.generic.edit import BaseDeleteView
+from wagtail.admin import messages
+
+from open_democracy_back.bulk_profiles import (
+    CHUNK_SIZE,
+    get_participations_to_recompute,
+    iter_recomputed_profiles,
+)
 
 from open_democracy_back.models import (
+    Assessment,
     ProfileType,
     ProfilingQuestion,
     Question,
@@ -344,6 +352,51 @@ def duplicates_survey_view(request, pk):
     )
 
 
+def recompute_profiles(request, participations, name, index_url):
+    if request.method == "POST":
+        done = added = removed = 0
+        for diff in iter_recomputed_profiles(participations, CHUNK_SIZE, workers=1):
+            done += diff.participations
+            added += diff.added
+            removed += diff.removed
+        messages.success(
+            request,
+            f"Profils de {done} participations recalculés : "
+            f"{added} ajoutés, {removed} retirés",
+        )
+        return redirect(index_url)
+
+    return render(
+        request,
+        "admin/recompute_profiles.html",
+        {
+            "name": name,
+            "participation_count": participations.count(),
+            "index_url": index_url,
+        },
+    )
+
+
+def survey_recompute_profiles_view(request, pk):
+    survey = Survey.objects.get(id=pk)
+    return recompute_profiles(
+        request,
+        get_participations_to_recompute(survey_id=survey.id),
+        f"du questionnaire {survey.name}",
+        "/admin/open_democracy_back/survey/",
+    )
+
+
+def assessment_recompute_profiles_view(request, pk):
+    assessment = Assessment.objects.get(id=pk)
+    return recompute_profiles(
+        request,
+        get_participations_to_recompute(assessment_id=assessment.id),
+        f"de l'évaluation {assessment}",
+        "/admin/open_democracy_back/assessment/",
+    )
+
+
 class QuestionRuleView(BaseDeleteView):
     model = QuestionRule
 
@@ -55,6 +55,8 @@ from open_democracy_back.views.wagtail_rule_views import (
     ProfileDefinitionView,
     representativity_criteria_refining_view,
     duplicates_survey_view,
+    survey_recompute_profiles_view,
+    assessment_recompute_profiles_view,
 )
 
 
@@ -110,6 +112,16 @@ class SurveyButtonHelper(ButtonHelper):
             "title": text,
         }
 
+    def recompute_profiles_button(self, obj):
+        text = "Recalculer les profils"
+        url = "/admin/survey/" + str(obj.id) + "/recompute-profiles/"
+        return {
+            "url": url,
+            "label": text,
+            "classname": self.finalise_classname(self.view_button_classnames),
+            "title": text,
+        }
+
     def get_buttons_for_obj(
         self, obj, exclude=None, classnames_add=None, classnames_exclude=None
     ):
@@ -122,6 +134,31 @@ class SurveyButtonHelper(ButtonHelper):
         )
         if "view" not in (exclude or []):
             btns.append(self.view_button(obj))
+            btns.append(self.recompute_profiles_button(obj))
+        return btns
+
+
+class AssessmentButtonHelper(ButtonHelper):
+    view_button_classnames = ["button-small", "icon", "icon-cogs"]
+
+    def recompute_profiles_button(self, obj):
+        text = "Recalculer les profils"
+        url = "/admin/assessment/" + str(obj.id) + "/recompute-profiles/"
+        return {
+            "url": url,
+            "label": text,
+            "classname": self.finalise_classname(self.view_button_classnames),
+            "title": text,
+        }
+
+    def get_buttons_for_obj(
+        self, obj, exclude=None, classnames_add=None, classnames_exclude=None
+    ):
+        btns = super().get_buttons_for_obj(
+            obj, exclude, classnames_add, classnames_exclude
+        )
+        if "view" not in (exclude or []):
+            btns.append(self.recompute_profiles_button(obj))
         return btns
 
 
@@ -151,6 +188,11 @@ def snippet_listing_buttons(snippet, user, next_url=None):
             "/admin/survey/" + str(snippet.id) + "/duplicates/",
             priority=10,
         )
+        yield wagtailsnippets_widgets.SnippetListingButton(
+            "Recalculer les profils",
+            "/admin/survey/" + str(snippet.id) + "/recompute-profiles/",
+            priority=20,
+        )
 
 
 @hooks.register("insert_editor_js", order=100)
@@ -409,7 +451,8 @@ class AssessmentModelAdmin(ModelAdmin):
     menu_label = "Évaluation"
     menu_icon = "date"
     add_to_settings_menu = False
-    search_fields = ("municipality__name", "epci__name")
+    search_fields = ("locality_name",)
+    button_helper_class = AssessmentButtonHelper
     form_view_extra_js = ["js/assessments.js"]
 
 
@@ -427,8 +470,7 @@ class ParticipationModelAdmin(ModelAdmin):
     add_to_settings_menu = False
     search_fields = (
         "user__username",
-        "assessment__municipality__name",
-        "assessment__epci__name",
+        "assessment__locality_name",
     )
     permission_helper_class = CanNotEditPermissionHelper
 
@@ -574,6 +616,17 @@ def register_custom_admin_views():
             duplicates_survey_view,
             name="duplicates-survey",
         ),
+        # Profiles
+        path(
+            "survey/<int:pk>/recompute-profiles/",
+            survey_recompute_profiles_view,
+            name="survey-recompute-profiles",
+        ),
+        path(
+            "assessment/<int:pk>/recompute-profiles/",
+            assessment_recompute_profiles_view,
+            name="assessment-recompute-profiles",
+        ),
     ]
 
 